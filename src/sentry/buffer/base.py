@@ -1,11 +1,23 @@
 import logging
+from collections import defaultdict
 
+from django.db import connections, router
 from django.db.models import F
+from django.db.models.signals import post_save
 
 from sentry.signals import buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr
+from sentry.utils import metrics
 from sentry.utils.services import Service
 
+BULK_UPDATE_QUERY = """
+    UPDATE {table}
+    SET {assignments}
+    FROM (VALUES %s) AS data ({columns})
+    WHERE {table}.{pk} = data.{pk}
+    RETURNING {table}.{pk}
+"""
+
 
 class BufferMount(type):
     def __new__(cls, name, bases, attrs):
@@ -102,3 +114,134 @@ class Buffer(Service, metaclass=BufferMount):
             created=created,
             sender=model,
         )
+
+    def process_batch(self, batch):
+        """
+        Processes many buffered increments at once. ``batch`` is a sequence of
+        ``(model, columns, filters, extra, signal_only)`` tuples, as they would
+        be passed to ``process``.
+
+        Increments that address a row by primary key are applied with a single
+        ``UPDATE ... FROM (VALUES ...)`` statement per model and set of columns,
+        everything else (and rows that turn out not to exist) falls back to
+        ``process`` one by one.
+        """
+        remaining = []
+        bulk = defaultdict(list)
+        for item in batch:
+            model, columns, filters, extra, signal_only = item
+            pk = self._get_bulk_pk(model, filters, signal_only)
+            if pk is None:
+                remaining.append(item)
+            else:
+                bulk[(model, tuple(sorted(columns)), tuple(sorted(extra or ())))].append((pk, item))
+
+        for (model, columns, extra_columns), items in bulk.items():
+            updated = self._bulk_update(model, columns, extra_columns, items)
+            if updated is None:
+                remaining.extend(item for _, item in items)
+                continue
+
+            for pk, (model, columns, filters, extra, signal_only) in items:
+                if pk not in updated:
+                    remaining.append((model, columns, filters, extra, signal_only))
+                    continue
+                buffer_incr_complete.send_robust(
+                    model=model,
+                    columns=columns,
+                    filters=filters,
+                    extra=extra,
+                    created=False,
+                    sender=model,
+                )
+
+        for model, columns, filters, extra, signal_only in remaining:
+            Buffer.process(self, model, columns, filters, extra, signal_only)
+
+    def _get_bulk_pk(self, model, filters, signal_only):
+        if signal_only or len(filters) != 1:
+            return None
+        name, value = next(iter(filters.items()))
+        if name not in ("pk", "id", model._meta.pk.name):
+            return None
+        if not isinstance(value, int):
+            return None
+        return value
+
+    def _bulk_update(self, model, columns, extra_columns, items):
+        """
+        Applies the increments in ``items`` to ``model`` with a single
+        statement. Returns the set of primary keys that were updated, or
+        ``None`` if the database does not support it.
+        """
+        from sentry.models import Group
+
+        using = router.db_for_write(model)
+        connection = connections[using]
+        if connection.vendor != "postgresql":
+            return None
+
+        from psycopg2.extras import execute_values
+
+        qn = connection.ops.quote_name
+        meta = model._meta
+        table = qn(meta.db_table)
+        pk = qn(meta.pk.column)
+        incr_fields = [meta.get_field(name) for name in columns]
+        extra_fields = [meta.get_field(name) for name in extra_columns]
+
+        assignments = [
+            "{col} = {table}.{col} + data.{col}".format(table=table, col=qn(f.column))
+            for f in incr_fields
+        ] + ["{col} = data.{col}".format(col=qn(f.column)) for f in extra_fields]
+
+        # This is the bulk equivalent of ``ScoreClause`` in ``process``, it
+        # has to see the row's previous ``times_seen``.
+        if model is Group and "times_seen" in columns and "last_seen" in extra_columns:
+            assignments.append(
+                "{score} = log({table}.{times_seen} + data.{times_seen}) * 600"
+                " + floor(extract(epoch from data.{last_seen}))".format(
+                    table=table,
+                    score=qn(meta.get_field("score").column),
+                    times_seen=qn(meta.get_field("times_seen").column),
+                    last_seen=qn(meta.get_field("last_seen").column),
+                )
+            )
+
+        template = "({})".format(
+            ", ".join(
+                [f"%s::{meta.pk.rel_db_type(connection)}"]
+                + [f"%s::{f.cast_db_type(connection)}" for f in incr_fields + extra_fields]
+            )
+        )
+        query = BULK_UPDATE_QUERY.format(
+            table=table,
+            pk=pk,
+            assignments=", ".join(assignments),
+            columns=", ".join([pk] + [qn(f.column) for f in incr_fields + extra_fields]),
+        )
+
+        rows = []
+        # Lock rows in a stable order so concurrent flushers don't deadlock.
+        for row_pk, (_, row_columns, _, row_extra, _) in sorted(items, key=lambda i: i[0]):
+            rows.append(
+                [row_pk]
+                + [row_columns[f.name] for f in incr_fields]
+                + [f.get_db_prep_save(row_extra[f.name], connection) for f in extra_fields]
+            )
+
+        with metrics.timer("buffer.bulk-update", tags={"model": model.__name__}):
+            with connection.cursor() as cursor:
+                updated = {
+                    row[0] for row in execute_values(cursor, query, rows, template, fetch=True)
+                }
+
+        metrics.timing("buffer.bulk-update.size", len(rows), tags={"model": model.__name__})
+
+        if model is Group and updated:
+            # ``process`` goes through ``Group.update`` so the cached group
+            # picks up the change, do the same for every updated row here.
+            for group in Group.objects.filter(id__in=updated):
+                post_save.send(sender=Group, instance=group, created=False)
+
+        return updated
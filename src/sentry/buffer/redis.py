@@ -1,7 +1,10 @@
+import atexit
+import os
 import pickle
 import threading
 from datetime import datetime
-from time import time
+from time import sleep, time
+from uuid import uuid4
 
 from django.db import models
 from django.utils import timezone
@@ -14,7 +17,11 @@ from sentry.utils import json, metrics
 from sentry.utils.compat import crc32
 from sentry.utils.hashlib import md5_text
 from sentry.utils.imports import import_string
-from sentry.utils.redis import get_cluster_from_options
+from sentry.utils.redis import get_cluster_from_options, load_script
+
+lease_pending = load_script("buffer/lease_pending.lua")
+complete_pending = load_script("buffer/complete_pending.lua")
+delete_lock = load_script("utils/locking/delete_lock.lua")
 
 _local_buffers = None
 _local_buffers_lock = threading.Lock()
@@ -47,16 +54,87 @@ class PendingBuffer:
         return rv
 
 
+class LocalBufferEntry:
+    """
+    Increments for a single buffer key that have been merged in process
+    memory and not yet written to Redis.
+    """
+
+    __slots__ = ("model", "filters", "columns", "extra", "signal_only")
+
+    def __init__(self, model, filters):
+        self.model = model
+        self.filters = filters
+        self.columns = {}
+        self.extra = {}
+        self.signal_only = False
+
+    def merge(self, columns, extra=None, signal_only=None):
+        for column, amount in columns.items():
+            self.columns[column] = self.columns.get(column, 0) + amount
+        if extra:
+            # extra values are last write wins, same as the ``hset`` in Redis
+            self.extra.update(extra)
+        if signal_only is True:
+            self.signal_only = True
+
+
 class RedisBuffer(Buffer):
     key_expire = 60 * 60  # 1 hour
     pending_key = "b:p"
 
-    def __init__(self, pending_partitions=1, incr_batch_size=2, **options):
+    def __init__(
+        self,
+        pending_partitions=1,
+        incr_batch_size=2,
+        local_buffer_size=0,
+        local_buffer_flush_interval=1.0,
+        pending_lease_duration=300,
+        pending_lease_batch_size=1000,
+        pending_lease_limit=100000,
+        **options,
+    ):
+        """
+        ``local_buffer_size`` enables coalescing of increments in process
+        memory: up to that many distinct keys are merged locally and written
+        to Redis in bulk once the size is reached, ``local_buffer_flush_interval``
+        seconds have passed, or the process shuts down. ``0`` disables it and
+        every ``incr`` is written straight to Redis. Increments that fail to
+        be written are merged back and retried with the next flush.
+
+        The shutdown flush runs from ``atexit`` and is skipped by processes
+        that exit through ``os._exit``, such as Celery prefork pool workers.
+        Those lose the increments of up to ``local_buffer_flush_interval``
+        seconds, so keep the interval short where that matters.
+
+        ``process_pending`` leases pending keys in chunks of
+        ``pending_lease_batch_size`` (and at most ``pending_lease_limit`` keys
+        per host and run) for ``pending_lease_duration`` seconds. Keys whose
+        lease expires before they were processed are picked up again.
+        """
         self.cluster, options = get_cluster_from_options("SENTRY_BUFFER_OPTIONS", options)
         self.pending_partitions = pending_partitions
         self.incr_batch_size = incr_batch_size
+        self.local_buffer_size = local_buffer_size
+        self.local_buffer_flush_interval = local_buffer_flush_interval
+        self.pending_lease_duration = pending_lease_duration
+        self.pending_lease_batch_size = pending_lease_batch_size
+        self.pending_lease_limit = pending_lease_limit
         assert self.pending_partitions > 0
         assert self.incr_batch_size > 0
+        assert self.local_buffer_size >= 0
+        assert self.local_buffer_flush_interval > 0
+        assert self.pending_lease_duration > 0
+        assert self.pending_lease_batch_size > 0
+        assert self.pending_lease_limit > 0
+
+        self._local_buffer = {}
+        self._local_buffer_lock = threading.Lock()
+        self._local_buffer_last_flush = time()
+        self._local_buffer_flusher_pid = None
+
+        if self.local_buffer_size:
+            atexit.register(self.flush_local_buffer, reason="shutdown")
 
     def validate(self):
         try:
@@ -157,10 +235,19 @@ class RedisBuffer(Buffer):
             pipe.hget(key, f"i+{col}")
         results = pipe.execute()
 
-        return {
+        values = {
             col: (int(results[i]) if results[i] is not None else 0) for i, col in enumerate(columns)
         }
 
+        # include increments that have not been flushed from the local buffer yet
+        with self._local_buffer_lock:
+            entry = self._local_buffer.get(key)
+            if entry is not None:
+                for col in columns:
+                    values[col] += entry.columns.get(col, 0)
+
+        return values
+
     def incr(self, model, columns, filters, extra=None, signal_only=None, return_incr_results=True):
         """
         Increment the key by doing the following:
@@ -170,17 +257,38 @@ class RedisBuffer(Buffer):
             - Perform a set (last write wins) on extra
             - Perform a set on signal_only (only if True)
         - Add hashmap key to pending flushes
-        """
 
-        # TODO(dcramer): longer term we'd rather not have to serialize values
-        # here (unless it's to JSON)
+        If the local buffer is enabled the increment is merged in memory
+        first and only written to Redis when the local buffer is flushed.
+        """
         key = self._make_key(model, filters)
-        pending_key = self._make_pending_key_from_key(key)
+
+        metrics.incr(
+            "buffer.incr",
+            skip_internal=True,
+            tags={"module": model.__module__, "model": model.__name__},
+        )
+
+        if self.local_buffer_size:
+            self._incr_local(key, model, columns, filters, extra, signal_only)
+            return
+
         # We can't use conn.map() due to wanting to support multiple pending
         # keys (one per Redis partition)
         conn = self.cluster.get_local_client_for_key(key)
 
         pipe = conn.pipeline()
+        self._write_incr(pipe, key, model, columns, filters, extra, signal_only)
+        pipe.execute()
+
+    def _write_incr(self, pipe, key, model, columns, filters, extra=None, signal_only=None):
+        """
+        Adds the commands for a single buffer increment to ``pipe``.
+        """
+        # TODO(dcramer): longer term we'd rather not have to serialize values
+        # here (unless it's to JSON)
+        pending_key = self._make_pending_key_from_key(key)
+
         pipe.hsetnx(key, "m", f"{model.__module__}.{model.__name__}")
         # TODO(dcramer): once this goes live in production, we can kill the pickle path
         # (this is to ensure a zero downtime deploy where we can transition event processing)
@@ -204,13 +312,127 @@ class RedisBuffer(Buffer):
 
         pipe.expire(key, self.key_expire)
         pipe.zadd(pending_key, {key: time()})
-        pipe.execute()
 
-        metrics.incr(
-            "buffer.incr",
-            skip_internal=True,
-            tags={"module": model.__module__, "model": model.__name__},
-        )
+    def _incr_local(self, key, model, columns, filters, extra=None, signal_only=None):
+        self._ensure_local_buffer_flusher()
+
+        with self._local_buffer_lock:
+            entry = self._local_buffer.get(key)
+            if entry is None:
+                entry = self._local_buffer[key] = LocalBufferEntry(model, filters)
+                metrics.incr("buffer.local.miss", skip_internal=True)
+            else:
+                metrics.incr("buffer.local.hit", skip_internal=True)
+            entry.merge(columns, extra, signal_only)
+
+            if len(self._local_buffer) >= self.local_buffer_size:
+                reason = "size"
+            elif time() - self._local_buffer_last_flush >= self.local_buffer_flush_interval:
+                reason = "interval"
+            else:
+                return
+            entries = self._swap_local_buffer()
+
+        self._flush_entries(entries, reason)
+
+    def _swap_local_buffer(self):
+        # must be called while holding ``_local_buffer_lock``
+        entries = self._local_buffer
+        self._local_buffer = {}
+        self._local_buffer_last_flush = time()
+        return entries
+
+    def _ensure_local_buffer_flusher(self):
+        """
+        Starts a daemon thread that periodically flushes the local buffer so
+        that increments do not linger when a process stops receiving events.
+        The thread is (re)started lazily per process as threads do not survive
+        a fork.
+        """
+        pid = os.getpid()
+        if self._local_buffer_flusher_pid == pid:
+            return
+
+        with self._local_buffer_lock:
+            if self._local_buffer_flusher_pid == pid:
+                return
+            # anything inherited from the parent process is the parent's to flush
+            self._local_buffer = {}
+            self._local_buffer_flusher_pid = pid
+
+        def run():
+            while True:
+                sleep(self.local_buffer_flush_interval)
+                try:
+                    self.flush_local_buffer(reason="interval")
+                except Exception:
+                    self.logger.exception("buffer.local.flush-failed")
+
+        thread = threading.Thread(target=run, name="sentry.buffer.local-flusher", daemon=True)
+        thread.start()
+
+    def flush_local_buffer(self, reason="manual"):
+        """
+        Writes all locally merged increments to Redis.
+        """
+        with self._local_buffer_lock:
+            if not self._local_buffer:
+                return
+            entries = self._swap_local_buffer()
+
+        self._flush_entries(entries, reason)
+
+    def _flush_entries(self, entries, reason):
+        # Group keys by the host they live on so that each host receives a
+        # single pipeline, and the pending key ends up on the same host as
+        # the hash (just like ``incr`` does with ``get_local_client_for_key``).
+        router = self.cluster.get_router()
+        keys_by_host = {}
+        for key in entries:
+            keys_by_host.setdefault(router.get_host_for_key(key), []).append(key)
+
+        with metrics.timer("buffer.local.flush", tags={"reason": reason}):
+            for host_id, keys in keys_by_host.items():
+                try:
+                    pipe = self.cluster.get_local_client(host_id).pipeline()
+                    for key in keys:
+                        entry = entries[key]
+                        self._write_incr(
+                            pipe,
+                            key,
+                            entry.model,
+                            entry.columns,
+                            entry.filters,
+                            entry.extra,
+                            entry.signal_only,
+                        )
+                    pipe.execute()
+                except Exception:
+                    self.logger.exception(
+                        "buffer.local.flush-failed", extra={"host_id": host_id, "reason": reason}
+                    )
+                    self._restore_entries({key: entries[key] for key in keys}, reason)
+
+        metrics.timing("buffer.local.flush-size", len(entries), tags={"reason": reason})
+
+    def _restore_entries(self, entries, reason):
+        """
+        Merges entries that could not be written back into the local buffer,
+        so that they are retried with the next flush. There is no next flush
+        on shutdown, in which case the entries are dropped.
+        """
+        if reason == "shutdown":
+            metrics.incr("buffer.local.dropped", amount=len(entries), skip_internal=True)
+            return
+
+        metrics.incr("buffer.local.restored", amount=len(entries), skip_internal=True)
+        with self._local_buffer_lock:
+            for key, entry in entries.items():
+                newer = self._local_buffer.get(key)
+                if newer is not None:
+                    # extra values of newer increments win
+                    entry.merge(newer.columns, newer.extra, newer.signal_only)
+                self._local_buffer[key] = entry
 
     def process_pending(self, partition=None):
         if partition is None and self.pending_partitions > 1:
@@ -233,25 +455,56 @@ class RedisBuffer(Buffer):
 
         try:
             keycount = 0
-            with self.cluster.all() as conn:
-                results = conn.zrange(pending_key, 0, -1)
-
-            with self.cluster.all() as conn:
-                for host_id, keys in results.value.items():
+            oldest = None
+            now = time()
+            for host_id in self.cluster.hosts:
+                conn = self.cluster.get_local_client(host_id)
+                host_keycount = 0
+                while host_keycount < self.pending_lease_limit:
+                    # Leased keys stay in the pending set with a score in the
+                    # future, so concurrent or later runs only see the keys
+                    # that are not being worked on.
+                    result = lease_pending(
+                        conn,
+                        [pending_key],
+                        [
+                            now,
+                            now + self.pending_lease_duration,
+                            min(
+                                self.pending_lease_batch_size,
+                                self.pending_lease_limit - host_keycount,
+                            ),
+                        ],
+                    )
+                    host_oldest, keys = result[0], result[1:]
+                    if host_oldest is not None:
+                        host_oldest = float(host_oldest)
+                        if oldest is None or host_oldest < oldest:
+                            oldest = host_oldest
                     if not keys:
-                        continue
-                    keycount += len(keys)
+                        break
+
+                    host_keycount += len(keys)
                     for key in keys:
                         pending_buffer.append(key.decode("utf-8"))
                         if pending_buffer.full():
                             process_incr.apply_async(kwargs={"batch_keys": pending_buffer.flush()})
-                    conn.target([host_id]).zrem(pending_key, *keys)
+
+                    if len(keys) < self.pending_lease_batch_size:
+                        break
+
+                keycount += host_keycount
 
             # queue up remainder of pending keys
             if not pending_buffer.empty():
                 process_incr.apply_async(kwargs={"batch_keys": pending_buffer.flush()})
 
             metrics.timing("buffer.pending-size", keycount)
+            metrics.gauge(
+                "buffer.pending-lag",
+                now - oldest if oldest is not None else 0,
+                tags={"partition": str(partition)},
+            )
         finally:
             client.delete(lock_key)
 
@@ -262,68 +515,155 @@ class RedisBuffer(Buffer):
         if key is not None:
             batch_keys = [key]
 
-        for key in batch_keys:
-            self._process_single_incr(key)
+        if len(batch_keys) == 1:
+            self._process_single_incr(batch_keys[0])
+        else:
+            self._process_batch(batch_keys)
 
     def _process(self, model, columns, filters, extra=None, signal_only=None):
         return super().process(model, columns, filters, extra, signal_only)
 
     def _process_single_incr(self, key):
-        client = self.cluster.get_routing_client()
-        lock_key = self._make_lock_key(key)
-        # prevent a stampede due to the way we use celery etas + duplicate
-        # tasks
-        if not client.set(lock_key, "1", nx=True, ex=10):
-            metrics.incr("buffer.revoked", tags={"reason": "locked"}, skip_internal=False)
-            self.logger.debug("buffer.revoked.locked", extra={"redis_key": key})
-            return
+        def apply(batch):
+            for item in batch:
+                self._process(*item)
 
-        pending_key = self._make_pending_key_from_key(key)
+        self._process_keys([key], apply)
 
-        try:
-            conn = self.cluster.get_local_client_for_key(key)
-            pipe = conn.pipeline()
-            pipe.hgetall(key)
-            pipe.zrem(pending_key, key)
-            pipe.delete(key)
-            values = pipe.execute()[0]
-
-            # XXX(python3): In python2 this isn't as important since redis will
-            # return string tyes (be it, byte strings), but in py3 we get bytes
-            # back, and really we just want to deal with keys as strings.
-            values = {force_text(k): v for k, v in values.items()}
-
-            if not values:
-                metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
-                self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
-                return
+    def _process_batch(self, keys):
+        self._process_keys(keys, self.process_batch)
 
-            # XXX(py3): Note that ``import_string`` explicitly wants a str in
-            # python2, so we'll decode (for python3) and then translate back to
-            # a byte string (in python2) for import_string.
-            model = import_string(str(values.pop("m").decode("utf-8")))
-
-            if values["f"].startswith(b"{"):
-                filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
-            else:
-                # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                filters = pickle.loads(values.pop("f"))
-
-            incr_values = {}
-            extra_values = {}
-            signal_only = None
-            for k, v in values.items():
-                if k.startswith("i+"):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith("e+"):
-                    if v.startswith(b"["):
-                        extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
+    def _process_keys(self, keys, apply):
+        """
+        Locks and reads buffer keys with one round trip per host, applies the
+        values with ``apply`` (``process_batch`` for batches) and only then
+        removes the keys.
+
+        Locks are held for the duration of a lease and carry a token of this
+        flusher, which is checked when a key is completed. If ``apply`` fails
+        the keys stay leased in the pending set, and are retried once the
+        lease expired.
+        """
+        token = uuid4().hex
+        router = self.cluster.get_router()
+        keys_by_host = {}
+        for key in keys:
+            keys_by_host.setdefault(router.get_host_for_key(key), []).append(key)
+
+        # Locks are placed on the host of their key so that ``complete_pending``
+        # can check them. Keys are removed from here once their lock is
+        # released.
+        locked_keys_by_host = {}
+        try:
+            for host_id, host_keys in keys_by_host.items():
+                pipe = self.cluster.get_local_client(host_id).pipeline()
+                for key in host_keys:
+                    pipe.set(
+                        self._make_lock_key(key), token, nx=True, ex=self.pending_lease_duration
+                    )
+
+                locked_keys_by_host[host_id] = []
+                for key, locked in zip(host_keys, pipe.execute()):
+                    if locked:
+                        locked_keys_by_host[host_id].append(key)
                     else:
-                        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                        extra_values[k[2:]] = pickle.loads(v)
-                elif k == "s":
-                    signal_only = bool(int(v))  # Should be 1 if set
-
-            self._process(model, incr_values, filters, extra_values, signal_only)
+                        # prevent a stampede due to the way we use celery etas +
+                        # duplicate tasks
+                        metrics.incr(
+                            "buffer.revoked", tags={"reason": "locked"}, skip_internal=False
+                        )
+                        self.logger.debug("buffer.revoked.locked", extra={"redis_key": key})
+
+            batch = []
+            applied = {}
+            for host_id, host_keys in locked_keys_by_host.items():
+                pipe = self.cluster.get_local_client(host_id).pipeline()
+                for key in host_keys:
+                    pipe.hgetall(key)
+
+                for key, values in zip(host_keys, pipe.execute()):
+                    # counters as ``field, amount`` arguments for ``complete_pending``
+                    applied[key] = [
+                        arg
+                        for field, value in values.items()
+                        if field.startswith(b"i+")
+                        for arg in (field, value)
+                    ]
+                    item = self._load_item(key, values)
+                    if item is not None:
+                        batch.append(item)
+
+            apply(batch)
+
+            for host_id, host_keys in locked_keys_by_host.items():
+                pipe = self.cluster.get_local_client(host_id).pipeline()
+                for key in host_keys:
+                    complete_pending(
+                        pipe,
+                        [key, self._make_pending_key_from_key(key), self._make_lock_key(key)],
+                        [token, *applied[key]],
+                    )
+                results = pipe.execute()
+                locked_keys_by_host[host_id] = []
+
+                expired = results.count(-1)
+                if expired:
+                    # Another flusher may have applied these keys again.
+                    metrics.incr(
+                        "buffer.revoked",
+                        amount=expired,
+                        tags={"reason": "lock_expired"},
+                        skip_internal=False,
+                    )
         finally:
-            client.delete(lock_key)
+            for host_id, host_keys in locked_keys_by_host.items():
+                if not host_keys:
+                    continue
+                pipe = self.cluster.get_local_client(host_id).pipeline()
+                for key in host_keys:
+                    delete_lock(pipe, [self._make_lock_key(key)], [token])
+                # locks that expired in the meantime may belong to another flusher
+                pipe.execute(raise_on_error=False)
+
+    def _load_item(self, key, values):
+        """
+        Decodes the buffered hash for ``key`` into the arguments for
+        ``process``, or returns ``None`` if there is nothing to process.
+        """
+        # XXX(python3): In python2 this isn't as important since redis will
+        # return string tyes (be it, byte strings), but in py3 we get bytes
+        # back, and really we just want to deal with keys as strings.
+        values = {force_text(k): v for k, v in values.items()}
+
+        if not values:
+            metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
+            self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
+            return None
+
+        # XXX(py3): Note that ``import_string`` explicitly wants a str in
+        # python2, so we'll decode (for python3) and then translate back to
+        # a byte string (in python2) for import_string.
+        model = import_string(str(values.pop("m").decode("utf-8")))
+
+        if values["f"].startswith(b"{"):
+            filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
+        else:
+            # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+            filters = pickle.loads(values.pop("f"))
+
+        incr_values = {}
+        extra_values = {}
+        signal_only = None
+        for k, v in values.items():
+            if k.startswith("i+"):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith("e+"):
+                if v.startswith(b"["):
+                    extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
+                else:
+                    # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+                    extra_values[k[2:]] = pickle.loads(v)
+            elif k == "s":
+                signal_only = bool(int(v))  # Should be 1 if set
+
+        return model, incr_values, filters, extra_values, signal_only
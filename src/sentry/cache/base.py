@@ -32,6 +32,14 @@ class BaseCache(local):
     def set(self, key, value, timeout, version=None, raw=False):
         raise NotImplementedError
 
+    def set_many(self, items, timeout, version=None, raw=False):
+        """
+        Sets multiple values at once, ``items`` is a sequence of ``(key,
+        value)`` pairs. Backends can override this to batch the writes.
+        """
+        for key, value in items:
+            self.set(key, value, timeout, version=version, raw=raw)
+
     def delete(self, key, version=None):
         raise NotImplementedError
 
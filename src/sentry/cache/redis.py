@@ -16,16 +16,25 @@ class CommonRedisCache(BaseCache):
         self.client = client
         BaseCache.__init__(self, **options)
 
-    def set(self, key, value, timeout, version=None, raw=False):
+    def _set(self, client, key, value, timeout, version=None, raw=False):
         key = self.make_key(key, version=version)
         v = json.dumps(value) if not raw else value
         if len(v) > self.max_size:
             raise ValueTooLarge(f"Cache key too large: {key!r} {len(v)!r}")
         if timeout:
-            self.client.setex(key, int(timeout), v)
+            client.setex(key, int(timeout), v)
         else:
-            self.client.set(key, v)
+            client.set(key, v)
+
+    def set(self, key, value, timeout, version=None, raw=False):
+        self._set(self.client, key, value, timeout, version=version, raw=raw)
+        self._mark_transaction("set")
 
+    def set_many(self, items, timeout, version=None, raw=False):
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items:
+            self._set(pipe, key, value, timeout, version=version, raw=raw)
+        pipe.execute()
         self._mark_transaction("set")
 
     def delete(self, key, version=None):
@@ -51,6 +60,14 @@ class RbCache(CommonRedisCache):
         client = cluster.get_routing_client()
         CommonRedisCache.__init__(self, client, **options)
 
+    def set_many(self, items, timeout, version=None, raw=False):
+        # Routing clients do not support pipelines, ``map`` batches the
+        # commands per host instead.
+        with self.client.map() as client:
+            for key, value in items:
+                self._set(client, key, value, timeout, version=version, raw=raw)
+        self._mark_transaction("set")
+
 
 # Confusing legacy name for RbCache.  We don't actually have a pure redis cache
 RedisCache = RbCache
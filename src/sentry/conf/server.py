@@ -1312,6 +1312,10 @@ SENTRY_RELAY_TASK_APM_SAMPLING = 0
 # sample rate for ingest consumer processing functions
 SENTRY_INGEST_CONSUMER_APM_SAMPLING = 0
 
+# Number of events of an ingest consumer batch that are written to the
+# processing store at once.
+SENTRY_INGEST_CONSUMER_STORE_BATCH_SIZE = 100
+
 # sample rate for Apple App Store Connect tasks transactions
 SENTRY_APPCONNECT_APM_SAMPLING = SENTRY_BACKEND_APM_SAMPLING
 
@@ -1475,6 +1479,16 @@ SENTRY_SNUBA_CACHE_TTL_SECONDS = 60
 SENTRY_NODESTORE = "sentry.nodestore.django.DjangoNodeStorage"
 SENTRY_NODESTORE_OPTIONS = {}
 
+# Size in bytes of the in-process LRU cache of node payloads in front of the
+# node storage backend. 0 disables it. Every process has its own cache and
+# there is no invalidation across processes: a node deleted or overwritten by
+# another process can still be served for up to SENTRY_NODESTORE_LOCAL_CACHE_TTL
+# seconds.
+SENTRY_NODESTORE_LOCAL_CACHE_BYTES = 0
+# How long nodes, and nodes known to not exist, are kept in that cache.
+SENTRY_NODESTORE_LOCAL_CACHE_TTL = 60
+SENTRY_NODESTORE_LOCAL_CACHE_MISS_TTL = 5
+
 # Tag storage backend
 SENTRY_TAGSTORE = os.environ.get("SENTRY_TAGSTORE", "sentry.tagstore.snuba.SnubaTagStorage")
 SENTRY_TAGSTORE_OPTIONS = {}
@@ -1518,6 +1532,10 @@ SENTRY_METRICS_SKIP_INTERNAL_PREFIXES = []  # Order this by most frequent prefix
 SENTRY_METRICS_INDEXER = "sentry.sentry_metrics.indexer.postgres.postgres_v2.PostgresIndexer"
 SENTRY_METRICS_INDEXER_OPTIONS = {}
 SENTRY_METRICS_INDEXER_CACHE_TTL = 3600 * 2
+# Number of strings held by the node-local shared memory cache that sits in
+# front of the indexer cache, 0 disables it. Every entry takes 32 bytes.
+SENTRY_METRICS_INDEXER_SHARED_CACHE_SLOTS = 0
+SENTRY_METRICS_INDEXER_SHARED_CACHE_TTL = 600
 
 SENTRY_METRICS_INDEXER_SPANNER_OPTIONS = {}
 
@@ -1591,6 +1609,13 @@ SENTRY_SOURCE_FETCH_SOCKET_TIMEOUT = 2
 # Maximum content length for source files before we abort fetching
 SENTRY_SOURCE_FETCH_MAX_SIZE = 40 * 1024 * 1024
 
+# Maximum size of the parsed source maps each process keeps in memory across
+# events, 0 disables it. The size is counted in bytes of the fetched source
+# maps and minified sources, and a parsed source map can take several times
+# that in memory. Every worker process has its own cache, so the memory used
+# on a host is a multiple of this.
+SENTRY_SOURCEMAP_PARSED_CACHE_SIZE = 0
+
 # Maximum content length for cache value.  Currently used only to avoid
 # pointless compression of sourcemaps and other release files because we
 # silently fail to cache the compressed result anyway.  Defaults to None which
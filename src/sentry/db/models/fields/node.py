@@ -129,19 +129,17 @@ class NodeData(MutableMapping):
             self.data["_ref"] = ref
             self.data["_ref_version"] = self.ref_version
 
-    def save(self, subkeys=None):
+    def get_subkeys_to_save(self, subkeys=None):
         """
-        Write current data back to nodestore.
-
-        :param subkeys: Additional JSON payloads to attach to nodestore value,
-            currently only {"unprocessed": {...}} is added for reprocessing.
-            See documentation of nodestore.
+        Returns the payload that ``save`` writes to nodestore, in the format
+        accepted by ``nodestore.set_subkeys``, or ``None`` if there is nothing
+        to save. Use this to write many nodes with ``nodestore.set_multi``.
         """
 
         # We never loaded any data for reading or writing, so there
         # is nothing to save.
         if self._node_data is None:
-            return
+            return None
 
         # We can't put our wrappers into the nodestore, so we need to
         # ensure that the data is converted into a plain old dict
@@ -151,8 +149,19 @@ class NodeData(MutableMapping):
 
         subkeys = subkeys or {}
         subkeys[None] = to_write
+        return subkeys
 
-        nodestore.set_subkeys(self.id, subkeys)
+    def save(self, subkeys=None):
+        """
+        Write current data back to nodestore.
+
+        :param subkeys: Additional JSON payloads to attach to nodestore value,
+            currently only {"unprocessed": {...}} is added for reprocessing.
+            See documentation of nodestore.
+        """
+        subkeys = self.get_subkeys_to_save(subkeys)
+        if subkeys is not None:
+            nodestore.set_subkeys(self.id, subkeys)
 
 
 class NodeField(GzippedDictField):
@@ -24,6 +24,7 @@ from sentry import (
     eventstream,
     eventtypes,
     features,
+    nodestore,
     options,
     quotas,
     reprocessing2,
@@ -1048,6 +1049,7 @@ def _tsdb_record_all_metrics(jobs):
 @metrics.wraps("save_event.nodestore_save_many")
 def _nodestore_save_many(jobs):
     inserted_time = datetime.utcnow().replace(tzinfo=UTC).timestamp()
+    items = {}
     for job in jobs:
         # Write the event to Nodestore
         subkeys = {}
@@ -1063,7 +1065,11 @@ def _nodestore_save_many(jobs):
                 subkeys["unprocessed"] = unprocessed
 
         job["event"].data["nodestore_insert"] = inserted_time
-        job["event"].data.save(subkeys=subkeys)
+        subkeys = job["event"].data.get_subkeys_to_save(subkeys=subkeys)
+        if subkeys is not None:
+            items[job["event"].data.id] = subkeys
+
+    nodestore.set_multi(items)
 
 
 @metrics.wraps("save_event.eventstream_insert_many")
@@ -1,5 +1,5 @@
 from datetime import timedelta
-from typing import Any, Optional
+from typing import Any, Optional, Sequence
 
 import sentry_sdk
 
@@ -40,6 +40,17 @@ class EventProcessingStore:
             self.inner.set(key, event, self.timeout)
             return key
 
+    def store_many(self, events: Sequence[Event]) -> Sequence[str]:
+        """
+        Stores multiple events with a single batched write, and returns their
+        keys in the same order.
+        """
+        with sentry_sdk.start_span(op="eventstore.processing.store_many") as span:
+            span.set_data("num_events", len(events))
+            items = [(cache_key_for_event(event), event) for event in events]
+            self.inner.set_many(items, self.timeout)
+            return [key for key, _ in items]
+
     def get(self, key: str, unprocessed: bool = False) -> Optional[Event]:
         with sentry_sdk.start_span(op="eventstore.processing.get"):
             if unprocessed:
@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 
 from sentry import options
 from sentry.grouping.component import GroupingComponent
@@ -23,6 +24,10 @@ from sentry.utils.safe import get_path
 
 HASH_RE = re.compile(r"^[0-9a-f]{32}$")
 
+# Number of parsed fingerprinting configs that are cached per process, keyed
+# by the project option they are parsed from.
+FINGERPRINTING_CONFIGS_CACHE_SIZE = 500
+
 # Synthetic exceptions should be marked by the SDK, but
 # are also detected here as a fallback
 _synthetic_exception_type_re = re.compile(
@@ -172,12 +177,18 @@ def load_default_grouping_config():
 
 
 def get_fingerprinting_config_for_project(project):
-    from sentry.grouping.fingerprinting import FingerprintingRules, InvalidFingerprintingConfig
+    from sentry.grouping.fingerprinting import FingerprintingRules
 
     rules = project.get_option("sentry:fingerprinting_rules")
     if not rules:
         return FingerprintingRules([])
 
+    return _get_fingerprinting_config(rules)
+
+
+@lru_cache(maxsize=FINGERPRINTING_CONFIGS_CACHE_SIZE)
+def _get_fingerprinting_config(rules):
+    from sentry.grouping.fingerprinting import FingerprintingRules, InvalidFingerprintingConfig
     from sentry.utils.cache import cache
     from sentry.utils.hashlib import md5_text
 
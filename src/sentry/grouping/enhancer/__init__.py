@@ -1,6 +1,8 @@
 import base64
 import os
 import zlib
+from functools import lru_cache
+from hashlib import md5
 
 import msgpack
 from parsimonious.exceptions import ParseError
@@ -8,10 +10,12 @@ from parsimonious.grammar import Grammar, NodeVisitor
 
 from sentry import projectoptions
 from sentry.grouping.component import GroupingComponent
+from sentry.utils import metrics
 from sentry.utils.strings import unescape_string
 
 from .actions import Action, FlagAction, VarAction
 from .exceptions import InvalidEnhancerConfig
+from .index import get_rule_index
 from .matchers import (
     CalleeMatch,
     CallerMatch,
@@ -70,6 +74,9 @@ _        = space*
 VERSIONS = [1, 2]
 LATEST_VERSION = VERSIONS[-1]
 
+# Number of parsed configs that are cached per process, see ``Enhancements.loads``.
+CACHED_CONFIGS = 500
+
 
 class StacktraceState:
     def __init__(self):
@@ -105,16 +112,31 @@ class Enhancements:
 
     def __init__(self, rules, version=None, bases=None, id=None):
         self.id = id
-        self.rules = rules
+        # Parsed configs are shared between callers (see ``loads``), so rules
+        # and bases are stored as tuples.
+        self.rules = tuple(rules)
         if version is None:
             version = LATEST_VERSION
         self.version = version
         if bases is None:
-            bases = []
-        self.bases = bases
+            bases = ()
+        self.bases = tuple(bases)
+
+        self._modifier_rules = tuple(rule for rule in self.iter_rules() if rule.is_modifier)
+        self._updater_rules = tuple(rule for rule in self.iter_rules() if rule.is_updater)
 
-        self._modifier_rules = [rule for rule in self.iter_rules() if rule.is_modifier]
-        self._updater_rules = [rule for rule in self.iter_rules() if rule.is_updater]
+    def _get_rule_indexes(self):
+        """Returns the indexes of the modifier and updater rules, which are
+        shared by all instances of the same config in this process.
+        """
+        indexes = getattr(self, "_rule_indexes", None)
+        if indexes is None:
+            key = md5(msgpack.dumps(self._to_config_structure())).hexdigest()
+            indexes = self._rule_indexes = (
+                get_rule_index(f"{key}:modifier", self._modifier_rules),
+                get_rule_index(f"{key}:updater", self._updater_rules),
+            )
+        return indexes
 
     def apply_modifications_to_frame(self, frames, platform, exception_data):
         """This applies the frame modifications to the frames itself.  This
@@ -125,9 +147,11 @@ class Enhancements:
 
         match_frames = [create_match_frame(frame, platform) for frame in frames]
 
-        for rule in self._modifier_rules:
+        modifier_index, _ = self._get_rule_indexes()
+        candidates = modifier_index.get_candidates(match_frames)
+        for rule, frame_indices in zip(self._modifier_rules, candidates):
             for idx, action in rule.get_matching_frame_actions(
-                match_frames, platform, exception_data, cache
+                match_frames, platform, exception_data, cache, frame_indices
             ):
                 action.apply_modifications_to_frame(frames, match_frames, idx, rule=rule)
 
@@ -138,11 +162,13 @@ class Enhancements:
         match_frames = [create_match_frame(frame, platform) for frame in frames]
 
         stacktrace_state = StacktraceState()
+        _, updater_index = self._get_rule_indexes()
+        candidates = updater_index.get_candidates(match_frames)
         # Apply direct frame actions and update the stack state alongside
-        for rule in self._updater_rules:
+        for rule, frame_indices in zip(self._updater_rules, candidates):
 
             for idx, action in rule.get_matching_frame_actions(
-                match_frames, platform, exception_data, cache
+                match_frames, platform, exception_data, cache, frame_indices
             ):
                 action.update_frame_components_contributions(components, frames, idx, rule=rule)
                 action.modify_stacktrace_state(stacktrace_state, rule)
@@ -205,7 +231,7 @@ class Enhancements:
     def as_dict(self, with_rules=False):
         rv = {
             "id": self.id,
-            "bases": self.bases,
+            "bases": list(self.bases),
             "latest": projectoptions.lookup_well_known_key(
                 "sentry:grouping_enhancements_base"
             ).get_default(epoch=projectoptions.LATEST_EPOCH)
@@ -218,7 +244,7 @@ class Enhancements:
     def _to_config_structure(self):
         return [
             self.version,
-            self.bases,
+            list(self.bases),
             [x._to_config_structure(self.version) for x in self.rules],
         ]
 
@@ -249,33 +275,25 @@ class Enhancements:
 
     @classmethod
     def loads(cls, data):
+        """Loads a config serialized with ``dumps``.
+
+        Parsed configs are cached per process and shared between callers.
+        """
         if isinstance(data, str):
             data = data.encode("ascii", "ignore")
-        padded = data + b"=" * (4 - (len(data) % 4))
-        try:
-            return cls._from_config_structure(
-                msgpack.loads(zlib.decompress(base64.urlsafe_b64decode(padded)), raw=False)
-            )
-        except (LookupError, AttributeError, TypeError, ValueError) as e:
-            raise ValueError("invalid stack trace rule config: %s" % e)
+        return _loads(data)
 
     @classmethod
     def from_config_string(self, s, bases=None, id=None):
-        try:
-            tree = enhancements_grammar.parse(s)
-        except ParseError as e:
-            context = e.text[e.pos : e.pos + 33]
-            if len(context) == 33:
-                context = context[:-1] + "..."
-            raise InvalidEnhancerConfig(
-                f'Invalid syntax near "{context}" (line {e.line()}, column {e.column()})'
-            )
-        return EnhancmentsVisitor(bases, id).visit(tree)
+        """Parses the text format of enhancement rules. Like with ``loads``,
+        the result is cached and shared.
+        """
+        return _from_config_string(s, tuple(bases) if bases is not None else None, id)
 
 
 class Rule:
     def __init__(self, matchers, actions):
-        self.matchers = matchers
+        self.matchers = tuple(matchers)
 
         self._exception_matchers = []
         self._other_matchers = []
@@ -285,7 +303,7 @@ class Rule:
             else:
                 self._other_matchers.append(matcher)
 
-        self.actions = actions
+        self.actions = tuple(actions)
         self._is_updater = any(action.is_updater for action in actions)
         self._is_modifier = any(action.is_modifier for action in actions)
 
@@ -312,13 +330,23 @@ class Rule:
             matchers[matcher.key] = matcher.pattern
         return {"match": matchers, "actions": [str(x) for x in self.actions]}
 
-    def get_matching_frame_actions(self, frames, platform, exception_data=None, cache=None):
+    def get_matching_frame_actions(
+        self, frames, platform, exception_data=None, cache=None, frame_indices=None
+    ):
         """Given a frame returns all the matching actions based on this rule.
         If the rule does not match `None` is returned.
+
+        `frame_indices` restricts matching to the frames at these positions,
+        by default all frames are checked.
         """
         if not self.matchers:
             return []
 
+        if frame_indices is None:
+            frame_indices = range(len(frames))
+        elif not frame_indices:
+            return []
+
         # 1 - Check if exception matchers match
         for m in self._exception_matchers:
             if not m.matches_frame(frames, None, platform, exception_data, cache):
@@ -327,7 +355,7 @@ class Rule:
         rv = []
 
         # 2 - Check if frame matchers match
-        for idx, frame in enumerate(frames):
+        for idx in frame_indices:
             if all(
                 m.matches_frame(frames, idx, platform, exception_data, cache)
                 for m in self._other_matchers
@@ -351,6 +379,33 @@ class Rule:
         )
 
 
+@lru_cache(maxsize=CACHED_CONFIGS)
+def _loads(data):
+    padded = data + b"=" * (4 - (len(data) % 4))
+    with metrics.timer("grouping.enhancements.parse", tags={"format": "serialized"}):
+        try:
+            return Enhancements._from_config_structure(
+                msgpack.loads(zlib.decompress(base64.urlsafe_b64decode(padded)), raw=False)
+            )
+        except (LookupError, AttributeError, TypeError, ValueError) as e:
+            raise ValueError("invalid stack trace rule config: %s" % e)
+
+
+@lru_cache(maxsize=CACHED_CONFIGS)
+def _from_config_string(s, bases, id):
+    with metrics.timer("grouping.enhancements.parse", tags={"format": "text"}):
+        try:
+            tree = enhancements_grammar.parse(s)
+        except ParseError as e:
+            context = e.text[e.pos : e.pos + 33]
+            if len(context) == 33:
+                context = context[:-1] + "..."
+            raise InvalidEnhancerConfig(
+                f'Invalid syntax near "{context}" (line {e.line()}, column {e.column()})'
+            )
+        return EnhancmentsVisitor(bases, id).visit(tree)
+
+
 class EnhancmentsVisitor(NodeVisitor):
     visit_comment = visit_empty = lambda *a: None
     unwrapped_exceptions = (InvalidEnhancerConfig,)
@@ -0,0 +1,187 @@
+"""
+A dispatch index that finds the frames a list of enhancement rules can
+possibly match, so that rules are only evaluated against those frames instead
+of every frame of the stacktrace.
+
+Every rule is indexed by a single positive matcher (its anchor), by
+preference:
+
+* a ``function`` or ``module`` pattern without any glob syntax, which is looked
+  up by the exact value of the frame,
+* the literal prefix or suffix of a ``function`` or ``module`` glob, which
+  every matching value must start or end with,
+* the families of a ``family`` matcher.
+
+Candidates found through the index are still checked with all matchers of the
+rule, so the index only has to make sure that it never misses a frame the rule
+matches. Only fields that actions can't change are indexed: ``app`` and
+``category`` are updated by rules while modifications are applied.
+"""
+from collections import OrderedDict, defaultdict
+from threading import Lock
+
+from .matchers import FamilyMatch, FunctionMatch, ModuleMatch
+
+GLOB_CHARS = b"*?[]{}\\"
+
+INDEXED_FIELDS = {FunctionMatch: "function", ModuleMatch: "module"}
+
+
+def _literal_prefix_and_suffix(pattern):
+    """
+    Returns the literal text before the first and after the last glob special
+    character of a pattern, or ``None`` if the pattern is a literal.
+    """
+    positions = [i for i, c in enumerate(pattern) if c in GLOB_CHARS]
+    if not positions:
+        return None
+    return pattern[: positions[0]], pattern[positions[-1] + 1 :]
+
+
+def _get_anchor(rule):
+    """
+    Returns ``(kind, field, key)`` for the most selective indexable matcher of
+    a rule, or ``None`` if the rule has to be checked against every frame.
+    """
+    anchors = []
+    for matcher in rule._other_matchers:
+        if getattr(matcher, "negated", True):
+            # Callers, callees and negated matchers don't narrow down the
+            # frames the rule applies to.
+            continue
+
+        field = INDEXED_FIELDS.get(type(matcher))
+        if field is not None:
+            pattern = matcher._encoded_pattern
+            affixes = _literal_prefix_and_suffix(pattern)
+            if affixes is None:
+                anchors.append((3, 0, ("exact", field, pattern)))
+                continue
+            prefix, suffix = affixes
+            if prefix:
+                anchors.append((2, len(prefix), ("prefix", field, prefix)))
+            if suffix:
+                anchors.append((1, len(suffix), ("suffix", field, suffix)))
+        elif type(matcher) is FamilyMatch and b"all" not in matcher._flags:
+            anchors.append((0, 0, ("family", "family", frozenset(matcher._flags))))
+
+    if not anchors:
+        return None
+    return max(anchors, key=lambda anchor: anchor[:2])[2]
+
+
+class RuleIndex:
+    """
+    The index of a list of rules. Rules are referred to by their position in
+    the list, so that an index can be shared by all parsed copies of the same
+    enhancements config.
+    """
+
+    def __init__(self, rules):
+        self.size = len(rules)
+        # positions of rules that have to be checked against every frame
+        self.unindexed = []
+        # positions of rules that can never match
+        self.never = set()
+        self.exact = defaultdict(lambda: defaultdict(list))
+        # {field: {length: {prefix: [position, ...]}}}
+        self.prefixes = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        self.suffixes = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        self.families = defaultdict(list)
+
+        for position, rule in enumerate(rules):
+            if not rule.matchers:
+                self.never.add(position)
+                continue
+
+            anchor = _get_anchor(rule)
+            if anchor is None:
+                self.unindexed.append(position)
+                continue
+
+            kind, field, key = anchor
+            if kind == "exact":
+                self.exact[field][key].append(position)
+            elif kind == "prefix":
+                self.prefixes[field][len(key)][key].append(position)
+            elif kind == "suffix":
+                self.suffixes[field][len(key)][key].append(position)
+            else:
+                for family in key:
+                    self.families[family].append(position)
+
+        # Freeze the tables so lookups of missing keys don't add entries.
+        self.exact = {field: dict(table) for field, table in self.exact.items()}
+        self.prefixes = {
+            field: [(length, dict(table)) for length, table in tables.items()]
+            for field, tables in self.prefixes.items()
+        }
+        self.suffixes = {
+            field: [(length, dict(table)) for length, table in tables.items()]
+            for field, tables in self.suffixes.items()
+        }
+        self.families = dict(self.families)
+
+    def get_candidates(self, match_frames):
+        """
+        Returns a list with an entry per rule: either a list of indices of the
+        frames the rule can match, or ``None`` if all frames have to be
+        checked.
+        """
+        candidates = [[] for _ in range(self.size)]
+        for position in self.unindexed:
+            candidates[position] = None
+
+        for idx, frame in enumerate(match_frames):
+            for position in self.families.get(frame["family"], ()):
+                candidates[position].append(idx)
+
+            for field, table in self.exact.items():
+                value = frame[field]
+                if value is not None:
+                    for position in table.get(value, ()):
+                        candidates[position].append(idx)
+
+            for field, tables in self.prefixes.items():
+                value = frame[field]
+                if value is not None:
+                    for length, table in tables:
+                        for position in table.get(value[:length], ()):
+                            candidates[position].append(idx)
+
+            for field, tables in self.suffixes.items():
+                value = frame[field]
+                if value is not None:
+                    for length, table in tables:
+                        if len(value) >= length:
+                            for position in table.get(value[-length:], ()):
+                                candidates[position].append(idx)
+
+        return candidates
+
+
+_MAX_CACHED_INDEXES = 500
+
+_indexes = OrderedDict()
+_indexes_lock = Lock()
+
+
+def get_rule_index(key, rules):
+    """
+    Returns the index for ``rules``, building it if it's not in the process
+    wide cache yet. ``key`` has to identify the config the rules were parsed
+    from.
+    """
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+
+    index = RuleIndex(rules)
+
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > _MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
@@ -1,4 +1,5 @@
 import inspect
+from functools import lru_cache
 
 from parsimonious.exceptions import ParseError
 from parsimonious.grammar import Grammar, NodeVisitor
@@ -6,6 +7,7 @@ from parsimonious.grammar import Grammar, NodeVisitor
 from sentry.grouping.utils import get_rule_bool
 from sentry.stacktraces.functions import get_function_name_for_frame
 from sentry.stacktraces.platform import get_behavior_family_for_platform
+from sentry.utils import metrics
 from sentry.utils.event_frames import find_stack_frames
 from sentry.utils.glob import glob_match
 from sentry.utils.safe import get_path
@@ -13,6 +15,10 @@ from sentry.utils.strings import unescape_string
 
 VERSION = 1
 
+# Number of parsed configs that are cached per process, see
+# ``FingerprintingRules.from_config_string``.
+CACHED_CONFIGS = 500
+
 # Grammar is defined in EBNF syntax.
 fingerprinting_grammar = Grammar(
     r"""
@@ -152,7 +158,9 @@ class FingerprintingRules:
         if version is None:
             version = VERSION
         self.version = version
-        self.rules = rules
+        # Parsed rules are shared between callers (see ``from_config_string``),
+        # so they are stored as a tuple.
+        self.rules = tuple(rules)
         self.changelog = changelog
 
     def iter_rules(self):
@@ -182,13 +190,24 @@ class FingerprintingRules:
 
     @classmethod
     def from_json(cls, value):
-        try:
-            return cls._from_config_structure(value)
-        except (LookupError, AttributeError, TypeError, ValueError) as e:
-            raise ValueError("invalid fingerprinting config: %s" % e)
+        with metrics.timer("grouping.fingerprinting.parse", tags={"format": "json"}):
+            try:
+                return cls._from_config_structure(value)
+            except (LookupError, AttributeError, TypeError, ValueError) as e:
+                raise ValueError("invalid fingerprinting config: %s" % e)
 
     @classmethod
     def from_config_string(self, s):
+        """Parses the text format of fingerprinting rules.
+
+        Parsed rules are cached per process and shared between callers.
+        """
+        return _from_config_string(s)
+
+
+@lru_cache(maxsize=CACHED_CONFIGS)
+def _from_config_string(s):
+    with metrics.timer("grouping.fingerprinting.parse", tags={"format": "text"}):
         try:
             tree = fingerprinting_grammar.parse(s)
         except ParseError as e:
@@ -331,9 +350,13 @@ class Match:
 
 class Rule:
     def __init__(self, matchers, fingerprint, attributes):
-        self.matchers = matchers
-        self.fingerprint = fingerprint
-        self.attributes = attributes
+        self.matchers = tuple(matchers)
+        self.fingerprint = tuple(fingerprint)
+        self._attributes = dict(attributes)
+
+    @property
+    def attributes(self):
+        return dict(self._attributes)
 
     def get_fingerprint_values_for_event_access(self, access):
         by_match_group = {}
@@ -347,12 +370,13 @@ class Rule:
             else:
                 return
 
-        return self.fingerprint, self.attributes
+        # The fingerprint and attributes end up in the event.
+        return list(self.fingerprint), self.attributes
 
     def _to_config_structure(self):
         return {
             "matchers": [x._to_config_structure() for x in self.matchers],
-            "fingerprint": self.fingerprint,
+            "fingerprint": list(self.fingerprint),
             "attributes": self.attributes,
         }
 
@@ -378,7 +402,7 @@ class Rule:
             % (
                 " ".join(x.text for x in self.matchers),
                 "".join(x for x in self.fingerprint),
-                " ".join(f'{k}="{v}"' for (k, v) in sorted(self.attributes.items())),
+                " ".join(f'{k}="{v}"' for (k, v) in sorted(self._attributes.items())),
             )
         ).rstrip()
 
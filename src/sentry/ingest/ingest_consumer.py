@@ -2,19 +2,18 @@ import functools
 import logging
 import random
 import time
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import (
     Any,
     Callable,
     Mapping,
     MutableMapping,
     MutableSequence,
-    NamedTuple,
     Optional,
     Sequence,
+    Set,
     Tuple,
-    TypeVar,
-    Union,
 )
 
 import msgpack
@@ -45,26 +44,12 @@ logger = logging.getLogger(__name__)
 CACHE_TIMEOUT = 3600
 
 
-T = TypeVar("T")
-
-
-class AsyncResult(NamedTuple):  # TODO: Use Generic[T] with 3.7+
-    future: "Future[T]"
-    callback: Callable[["Future[T]"], Any]
-
-
 Message = Any
 
 
 class IngestConsumerWorker(AbstractBatchWorker):
     def __init__(self, process_event_executor: Optional[ThreadPoolExecutor] = None) -> None:
         self.__process_event_executor = process_event_executor
-        if self.__process_event_executor is None:
-            self.__process_event = process_event
-        else:
-            self.__process_event = functools.partial(
-                process_event_async, self.__process_event_executor
-            )
 
     def process_message(self, message) -> Message:
         message = msgpack.unpackb(message.value(), use_list=False)
@@ -77,22 +62,9 @@ class IngestConsumerWorker(AbstractBatchWorker):
 
     def _flush_batch(self, batch: Sequence[Message]):
         attachment_chunks = []
-
-        # Processing functions may be either synchronous or asynchronous.
-        # Functions that return an ``AsyncResult`` may perform a combination of
-        # synchronous and asynchronous work, and need to be explicitly waited on
-        # to ensure they have completed and callbacks have been invoked before
-        # returning. Functions that return anything else are assumed to have
-        # completed successfully after they have returned.
-        other_messages: MutableSequence[
-            Tuple[
-                Callable[
-                    [Message, Mapping[int, Project]],
-                    Union[Any, AsyncResult],
-                ],
-                Message,
-            ]
-        ] = []
+        events = []
+        attachments_by_project: MutableMapping[int, MutableSequence[Message]] = defaultdict(list)
+        userreports = []
 
         projects_to_fetch = set()
 
@@ -102,13 +74,13 @@ class IngestConsumerWorker(AbstractBatchWorker):
                 projects_to_fetch.add(message["project_id"])
 
                 if message_type == "event":
-                    other_messages.append((self.__process_event, message))
+                    events.append(message)
                 elif message_type == "attachment_chunk":
                     attachment_chunks.append(message)
                 elif message_type == "attachment":
-                    other_messages.append((process_individual_attachment, message))
+                    attachments_by_project[int(message["project_id"])].append(message)
                 elif message_type == "user_report":
-                    other_messages.append((process_userreport, message))
+                    userreports.append(message)
                 else:
                     raise ValueError(f"Unknown message type: {message_type}")
                 metrics.incr(
@@ -118,35 +90,130 @@ class IngestConsumerWorker(AbstractBatchWorker):
         with metrics.timer("ingest_consumer.fetch_projects"):
             projects = {p.id: p for p in Project.objects.get_many_from_cache(projects_to_fetch)}
 
-        if attachment_chunks:
-            # attachment_chunk messages need to be processed before attachment/event messages.
-            with metrics.timer("ingest_consumer.process_attachment_chunk_batch"):
-                for attachment_chunk in attachment_chunks:
-                    process_attachment_chunk(attachment_chunk, projects=projects)
+        # attachment_chunk messages need to be stored before attachment/event
+        # messages are processed. With an executor, the chunks are uploaded
+        # while the events of the batch are decoded.
+        wait_for_attachment_chunks = self._process_attachment_chunks(attachment_chunks, projects)
+
+        if events:
+            with metrics.timer("ingest_consumer.process_events_batch"):
+                events_flush_start = time.monotonic()
+                self._process_events(events, projects, wait_for_attachment_chunks)
+                metrics.timing(
+                    "ingest_consumer.process_events_batch.normalized",
+                    (time.monotonic() - events_flush_start) / len(events),
+                )
 
-        if other_messages:
-            with metrics.timer("ingest_consumer.process_other_messages_batch"):
-                other_messages_flush_start = time.monotonic()
+        wait_for_attachment_chunks()
 
-                # Keep a mapping of futures to their metadata so that we can
-                # easily associate a future with its callback once completed.
-                results: MutableMapping["Future[Any]", "AsyncResult[Any]"] = {}
+        if attachments_by_project:
+            with metrics.timer("ingest_consumer.process_attachments_batch"):
+                for project_id, attachments in attachments_by_project.items():
+                    process_project_attachments(project_id, attachments, projects)
 
-                # Execute synchronous tasks and dispatch asynchronous tasks.
-                for processing_func, message in other_messages:
-                    result = processing_func(message, projects)
-                    if isinstance(result, AsyncResult):
-                        results[result.future] = result
+        if userreports:
+            with metrics.timer("ingest_consumer.process_userreports_batch"):
+                for message in userreports:
+                    process_userreport(message, projects)
 
-                # Wait for any asynchronous work to be completed, invoking
-                # callbacks (on the main thread) as results are ready.
-                for future in as_completed(results.keys()):
-                    results[future].callback(future)
+    def _process_attachment_chunks(
+        self, attachment_chunks: Sequence[Message], projects: Mapping[int, Project]
+    ) -> Callable[[], None]:
+        """
+        Stores the attachment chunks of a batch. Returns a function that
+        blocks until all chunks have been stored.
+        """
+        if not attachment_chunks:
+            return lambda: None
 
+        if self.__process_event_executor is None:
+            with metrics.timer("ingest_consumer.process_attachment_chunk_batch"):
+                for attachment_chunk in attachment_chunks:
+                    process_attachment_chunk(attachment_chunk, projects=projects)
+            return lambda: None
+
+        start = time.monotonic()
+        futures = [
+            self.__process_event_executor.submit(
+                process_attachment_chunk, attachment_chunk, projects=projects
+            )
+            for attachment_chunk in attachment_chunks
+        ]
+
+        def wait() -> None:
+            for future in futures:
+                future.result()
+            if futures:
                 metrics.timing(
-                    "ingest_consumer.process_other_messages_batch.normalized",
-                    (time.monotonic() - other_messages_flush_start) / len(other_messages),
+                    "ingest_consumer.process_attachment_chunk_batch", time.monotonic() - start
                 )
+                futures.clear()
+
+        return wait
+
+    def _process_events(
+        self,
+        events: Sequence[Message],
+        projects: Mapping[int, Project],
+        wait_for_attachment_chunks: Callable[[], None],
+    ) -> None:
+        """
+        Decodes the events of a batch and writes them to the processing store
+        in chunks of ``SENTRY_INGEST_CONSUMER_STORE_BATCH_SIZE``, with one
+        batched write per chunk. With an executor, a chunk is written while
+        the next one is decoded. At most two chunks of decoded events are kept
+        in memory.
+        """
+        chunk_size = settings.SENTRY_INGEST_CONSUMER_STORE_BATCH_SIZE
+        pending: Optional[Tuple[Any, Sequence[Tuple[Callable[[str], None], float]]]] = None
+
+        # The deduplication key of an event is only set once it has been
+        # dispatched, which is after the next chunk has been loaded, so
+        # duplicates within a batch have to be tracked here.
+        seen_events: Set[Tuple[int, str]] = set()
+
+        def dispatch(result: Any, callbacks: Sequence[Tuple[Callable[[str], None], float]]) -> None:
+            cache_keys = result.result() if isinstance(result, Future) else result
+            # Dispatched tasks read the attachment chunks of their events.
+            wait_for_attachment_chunks()
+            for cache_key, (callback, load_duration) in zip(cache_keys, callbacks):
+                _dispatch_event(callback, cache_key, load_duration)
+
+        for i in range(0, len(events), chunk_size):
+            loaded = []
+            for message in events[i : i + chunk_size]:
+                event_key = (int(message["project_id"]), message["event_id"])
+                if event_key in seen_events:
+                    logger.warning(
+                        "pre-process-forwarder detected a duplicated event"
+                        " with id:%s for project:%s.",
+                        event_key[1],
+                        event_key[0],
+                    )
+                    continue
+                seen_events.add(event_key)
+
+                start = time.monotonic()
+                loaded_event = _load_event(message, projects)
+                if loaded_event is not None:
+                    data, callback = loaded_event
+                    loaded.append((data, callback, time.monotonic() - start))
+
+            if loaded:
+                data = [data for data, _, _ in loaded]
+                if self.__process_event_executor is not None:
+                    result = self.__process_event_executor.submit(_store_events, data)
+                else:
+                    result = _store_events(data)
+            else:
+                result = []
+
+            if pending is not None:
+                dispatch(*pending)
+            pending = (result, [(callback, duration) for _, callback, duration in loaded])
+
+        if pending is not None:
+            dispatch(*pending)
 
     def shutdown(self):
         if self.__process_event_executor is not None:
@@ -317,23 +384,32 @@ def _store_event(data) -> str:
         return event_processing_store.store(data)
 
 
+def _store_events(data: Sequence[Any]) -> Sequence[str]:
+    with metrics.timer("ingest_consumer._store_events"):
+        return event_processing_store.store_many(data)
+
+
 @trace_func(name="ingest_consumer.process_event")
 def process_event(message: Message, projects: Mapping[int, Project]) -> None:
     return _do_process_event(message, projects)
 
 
-def process_event_async(
-    executor: ThreadPoolExecutor, message: Message, projects: Mapping[int, Project]
-) -> Optional["AsyncResult[str]"]:
-    result = _load_event(message, projects)
-    if result is None:
-        return None
-
-    data, callback = result
-    return AsyncResult(
-        executor.submit(_store_event, data),
-        lambda future: callback(future.result()),
-    )
+@trace_func(name="ingest_consumer.process_event")
+def _dispatch_event(callback: Callable[[str], None], cache_key: str, load_duration: float) -> None:
+    """
+    Resumes processing of an event of a batch once it has been stored. The
+    ``ingest_consumer.process_event`` timing covers loading and dispatching
+    the event, the batched write to the processing store is timed separately.
+    """
+    start = time.monotonic()
+    tags = {"result": "failure"}
+    try:
+        callback(cache_key)
+        tags["result"] = "success"
+    finally:
+        metrics.timing(
+            "ingest_consumer.process_event", load_duration + time.monotonic() - start, tags=tags
+        )
 
 
 @trace_func(name="ingest_consumer.process_attachment_chunk")
@@ -353,9 +429,7 @@ def process_attachment_chunk(message, projects):
 @trace_func(name="ingest_consumer.process_individual_attachment")
 @metrics.wraps("ingest_consumer.process_individual_attachment")
 def process_individual_attachment(message, projects) -> None:
-    event_id = message["event_id"]
     project_id = int(message["project_id"])
-    cache_key = cache_key_for_event({"event_id": event_id, "project": project_id})
 
     try:
         project = projects[project_id]
@@ -367,6 +441,13 @@ def process_individual_attachment(message, projects) -> None:
         logger.info("Organization has no event attachments: %s", project_id)
         return
 
+    _process_individual_attachment(message, project)
+
+
+def _process_individual_attachment(message, project) -> None:
+    event_id = message["event_id"]
+    cache_key = cache_key_for_event({"event_id": event_id, "project": project.id})
+
     # Attachments may be uploaded for events that already exist. Fetch the
     # existing group_id, so that the attachment can be fetched by group-level
     # APIs. This is inherently racy.
@@ -397,6 +478,27 @@ def process_individual_attachment(message, projects) -> None:
     attachment.delete()
 
 
+@trace_func(name="ingest_consumer.process_project_attachments")
+@metrics.wraps("ingest_consumer.process_project_attachments")
+def process_project_attachments(project_id, messages, projects) -> None:
+    """
+    Processes the individual attachments of one project. The project and
+    feature checks are done once for all of them.
+    """
+    try:
+        project = projects[project_id]
+    except KeyError:
+        logger.error("Project for ingested event does not exist: %s", project_id)
+        return
+
+    if not features.has("organizations:event-attachments", project.organization, actor=None):
+        logger.info("Organization has no event attachments: %s", project_id)
+        return
+
+    for message in messages:
+        _process_individual_attachment(message, project)
+
+
 @trace_func(name="ingest_consumer.process_userreport")
 @metrics.wraps("ingest_consumer.process_userreport")
 def process_userreport(message, projects) -> None:
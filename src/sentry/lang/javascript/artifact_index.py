@@ -0,0 +1,226 @@
+"""
+A compact binary representation of artifact indexes, which is read through
+``mmap`` from the local release file cache.
+
+Artifact indexes of releases with many artifacts are large JSON documents, and
+parsing them to look up a few URLs per event dominates the cost of loading
+release files. The compact index is built once per index file and host, and
+a URL is looked up with a binary search over the hashes of all URLs, which
+only decodes the matching entry.
+
+Layout (little endian):
+
+* ``MAGIC``, the number of entries ``n`` (u32)
+* ``n`` hashes of the URLs (u64), sorted
+* ``n + 1`` offsets of the entries (u32), relative to the first entry
+* the entries: the URL (UTF-8), a null byte and the entry as JSON
+
+The ZIP helpers at the end of this module use the offset of a file in its
+release archive, as recorded in the artifact index, to read the file without
+reading the central directory and the manifest of the archive.
+"""
+import errno
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from collections import OrderedDict
+from threading import Lock
+from typing import IO, Optional
+
+from sentry import options
+from sentry.models import File
+from sentry.utils import json, metrics
+from sentry.utils.hashlib import md5_text
+
+__all__ = ["CompactArtifactIndex", "load_artifact_index", "read_archive_file"]
+
+MAGIC = b"SAI1"
+HEADER = struct.Struct("<4sI")
+HASH = struct.Struct("<Q")
+OFFSET = struct.Struct("<I")
+
+# Upper bound of the number of compact indexes a process keeps open.
+MAX_OPEN_INDEXES = 100
+
+
+def hash_url(url: str) -> int:
+    return HASH.unpack(md5_text(url).digest()[: HASH.size])[0]
+
+
+def write_compact_index(index: dict, fp: IO) -> None:
+    """Writes the compact representation of artifact index data."""
+    entries = sorted(
+        (hash_url(url), url.encode("utf-8") + b"\0" + json.dumps(entry).encode("utf-8"))
+        for url, entry in index.get("files", {}).items()
+    )
+
+    fp.write(HEADER.pack(MAGIC, len(entries)))
+    for url_hash, _ in entries:
+        fp.write(HASH.pack(url_hash))
+    offset = 0
+    fp.write(OFFSET.pack(offset))
+    for _, entry in entries:
+        offset += len(entry)
+        fp.write(OFFSET.pack(offset))
+    for _, entry in entries:
+        fp.write(entry)
+
+
+class CompactArtifactIndex:
+    """Read-only view of a compact artifact index in a buffer"""
+
+    def __init__(self, buffer):
+        magic, self._count = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError("Invalid compact artifact index")
+        self._buffer = buffer
+        self._offsets_start = HEADER.size + self._count * HASH.size
+        self._entries_start = self._offsets_start + (self._count + 1) * OFFSET.size
+
+    def __len__(self):
+        return self._count
+
+    def _get_hash(self, position: int) -> int:
+        return HASH.unpack_from(self._buffer, HEADER.size + position * HASH.size)[0]
+
+    def _get_entry(self, position: int) -> bytes:
+        start, end = struct.unpack_from(
+            "<2I", self._buffer, self._offsets_start + position * OFFSET.size
+        )
+        return self._buffer[self._entries_start + start : self._entries_start + end]
+
+    def get(self, url: str) -> Optional[dict]:
+        url_hash = hash_url(url)
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._get_hash(mid) < url_hash:
+                low = mid + 1
+            else:
+                high = mid
+
+        prefix = url.encode("utf-8") + b"\0"
+        # URLs with colliding hashes are next to each other.
+        while low < self._count and self._get_hash(low) == url_hash:
+            entry = self._get_entry(low)
+            if entry.startswith(prefix):
+                return json.loads(entry[len(prefix) :].decode("utf-8"))
+            low += 1
+
+        return None
+
+
+_open_indexes: "OrderedDict[str, CompactArtifactIndex]" = OrderedDict()
+_open_indexes_lock = Lock()
+
+
+def _open_index(path: str) -> CompactArtifactIndex:
+    with _open_indexes_lock:
+        index = _open_indexes.get(path)
+        if index is not None:
+            _open_indexes.move_to_end(path)
+            return index
+
+    with open(path, "rb") as fp:
+        # The mapping stays valid after the file is closed or deleted.
+        index = CompactArtifactIndex(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ))
+
+    with _open_indexes_lock:
+        _open_indexes[path] = index
+        while len(_open_indexes) > MAX_OPEN_INDEXES:
+            _open_indexes.popitem(last=False)
+    return index
+
+
+def load_artifact_index(organization_id: int, file_id: int, checksum: str) -> CompactArtifactIndex:
+    """
+    Returns the compact representation of the artifact index stored in the
+    file with the given id and checksum, building it from the index file if
+    it's not in the local release file cache yet.
+
+    Raises ``File.DoesNotExist`` if the index has been replaced since.
+    """
+    path = os.path.join(
+        options.get("releasefile.cache-path"), str(organization_id), f"{file_id}-{checksum}.index"
+    )
+    try:
+        index = _open_index(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+    else:
+        metrics.incr("sourcemaps.compact_artifact_index", tags={"hit": True})
+        return index
+
+    metrics.incr("sourcemaps.compact_artifact_index", tags={"hit": False})
+    with File.objects.get(id=file_id).getfile() as fp:
+        data = json.load(fp)
+
+    base = os.path.dirname(path)
+    os.makedirs(base, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=base, delete=False) as fp:
+        write_compact_index(data, fp)
+    # Index files are never changed, so if another process has written the
+    # compact index in the meantime, it is the same.
+    if os.path.exists(path):
+        os.remove(fp.name)
+    else:
+        os.rename(fp.name, path)
+
+    return _open_index(path)
+
+
+ZIP_LOCAL_FILE_HEADER = struct.Struct("<4s2B4HL2L2H")
+ZIP_LOCAL_FILE_SIGNATURE = b"PK\003\004"
+# Encrypted files and files with sizes in a data descriptor after the data
+ZIP_UNSUPPORTED_FLAGS = 0x1 | 0x8
+
+
+def read_archive_file(fp: IO, header_offset: int) -> Optional[bytes]:
+    """
+    Reads the contents of a file from a ZIP archive, given the offset of its
+    local file header. Returns ``None`` if the file can't be read this way,
+    in which case the archive has to be read with ``zipfile``.
+    """
+    fp.seek(header_offset)
+    header = fp.read(ZIP_LOCAL_FILE_HEADER.size)
+    if len(header) != ZIP_LOCAL_FILE_HEADER.size:
+        return None
+
+    (
+        signature,
+        _,
+        _,
+        flags,
+        compress_type,
+        _,
+        _,
+        crc,
+        compress_size,
+        file_size,
+        filename_length,
+        extra_length,
+    ) = ZIP_LOCAL_FILE_HEADER.unpack(header)
+    if (
+        signature != ZIP_LOCAL_FILE_SIGNATURE
+        or flags & ZIP_UNSUPPORTED_FLAGS
+        or 0xFFFFFFFF in (compress_size, file_size)
+    ):
+        return None
+
+    fp.seek(filename_length + extra_length, os.SEEK_CUR)
+    data = fp.read(compress_size)
+    if compress_type == 8:
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        try:
+            data = decompressor.decompress(data) + decompressor.flush()
+        except zlib.error:
+            return None
+    elif compress_type != 0:
+        return None
+
+    if len(data) != file_size or zlib.crc32(data) != crc:
+        return None
+    return data
@@ -1,8 +1,12 @@
+from collections import OrderedDict
+from threading import Lock
+
 from symbolic import SourceView
 
+from sentry.utils import metrics
 from sentry.utils.strings import codec_lookup
 
-__all__ = ["SourceCache", "SourceMapCache"]
+__all__ = ["SourceCache", "SourceMapCache", "ParsedSourceMapCache"]
 
 
 def is_utf8(codec):
@@ -90,3 +94,63 @@ class SourceMapCache:
             sourcemap = self.get(sourcemap_url)
             return (sourcemap_url, sourcemap)
         return (None, None)
+
+
+class ParsedSourceMapCache:
+    """
+    A process wide LRU cache of parsed source maps, shared by all events.
+
+    Parsed source maps don't report their memory usage, so every entry is
+    accounted for with the size of the input it was parsed from, and the least
+    recently used entries are evicted once the total exceeds ``max_size``
+    bytes.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._cache = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    def size(self):
+        return self._size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+
+        metrics.incr("sourcemaps.parsed_cache", tags={"result": "miss" if entry is None else "hit"})
+        return None if entry is None else entry[0]
+
+    def add(self, key, sourcemap, size):
+        if size > self.max_size:
+            metrics.incr("sourcemaps.parsed_cache.too_large")
+            return
+
+        evicted = 0
+        with self._lock:
+            previous = self._cache.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._cache[key] = (sourcemap, size)
+            self._size += size
+            while self._size > self.max_size:
+                _, (_, evicted_size) = self._cache.popitem(last=False)
+                self._size -= evicted_size
+                evicted += 1
+            total_size = self._size
+
+        if evicted:
+            metrics.incr("sourcemaps.parsed_cache.evicted", amount=evicted)
+        metrics.gauge("sourcemaps.parsed_cache.size", total_size)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._size = 0
@@ -5,13 +5,16 @@ import re
 import sys
 import time
 import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from io import BytesIO
 from os.path import splitext
-from typing import IO, Optional, Tuple
+from threading import Lock
+from typing import IO, Any, Callable, Mapping, Optional, Sequence, Tuple
 from urllib.parse import urlsplit
 
 import sentry_sdk
+from django import db
 from django.conf import settings
 from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
@@ -21,23 +24,28 @@ from symbolic import SourceMapView
 
 from sentry import features, http, options
 from sentry.event_manager import set_tag
-from sentry.models import EventError, Organization, ReleaseFile
-from sentry.models.releasefile import ARTIFACT_INDEX_FILENAME, ReleaseArchive, read_artifact_index
+from sentry.models import EventError, File, Organization, ReleaseFile
+from sentry.models.releasefile import (
+    ARTIFACT_INDEX_FILENAME,
+    ReleaseArchive,
+    get_artifact_index_file_info,
+)
 from sentry.stacktraces.processing import StacktraceProcessor
-from sentry.utils import json, metrics
+from sentry.utils import metrics
 
 # separate from either the source cache or the source maps cache, this is for
 # holding the results of attempting to fetch both kinds of files, either from the
 # database or from the internet
 from sentry.utils.cache import cache
 from sentry.utils.files import compress_file
-from sentry.utils.hashlib import md5_text
+from sentry.utils.hashlib import md5_text, sha1_text
 from sentry.utils.http import is_valid_origin
 from sentry.utils.retries import ConditionalRetryPolicy, exponential_delay
 from sentry.utils.safe import get_path, set_path
 from sentry.utils.urls import non_standard_url_join
 
-from .cache import SourceCache, SourceMapCache
+from .artifact_index import CompactArtifactIndex, load_artifact_index, read_archive_file
+from .cache import ParsedSourceMapCache, SourceCache, SourceMapCache
 
 __all__ = ["JavaScriptStacktraceProcessor"]
 
@@ -79,6 +87,9 @@ MAX_RESOURCE_FETCHES = 100
 
 CACHE_MAX_VALUE_SIZE = settings.SENTRY_CACHE_MAX_VALUE_SIZE
 
+# parsed source maps shared by all events processed by this process
+parsed_sourcemaps = ParsedSourceMapCache(settings.SENTRY_SOURCEMAP_PARSED_CACHE_SIZE)
+
 logger = logging.getLogger(__name__)
 
 
@@ -444,23 +455,28 @@ def get_from_archive(url: str, archive: ReleaseArchive) -> Tuple[bytes, dict]:
 
 
 @metrics.wraps("sourcemaps.load_artifact_index")
-def get_artifact_index(release, dist):
+def get_artifact_index(release, dist) -> Optional[CompactArtifactIndex]:
     dist_name = dist and dist.name or None
 
     ident = ReleaseFile.get_ident(ARTIFACT_INDEX_FILENAME, dist_name)
-    cache_key = f"artifact-index:v1:{release.id}:{ident}"
-    result = cache.get(cache_key)
-    if result == -1:
-        index = None
-    elif result:
-        index = json.loads(result)
-    else:
-        index = read_artifact_index(release, dist, use_cache=True)
-        cache_value = -1 if index is None else json.dumps(index)
-        # Only cache for a short time to keep the manifest up-to-date
-        cache.set(cache_key, cache_value, timeout=60)
+    cache_key = f"artifact-index:v2:{release.id}:{ident}"
+    file_info = cache.get(cache_key)
+    if file_info == -1:
+        return None
+    elif file_info:
+        try:
+            return load_artifact_index(release.organization_id, *file_info)
+        except File.DoesNotExist:
+            # The index has been updated since its file was cached.
+            pass
+
+    file_info = get_artifact_index_file_info(release, dist)
+    # Only cache for a short time to keep the manifest up-to-date
+    cache.set(cache_key, -1 if file_info is None else list(file_info), timeout=60)
+    if file_info is None:
+        return None
 
-    return index
+    return load_artifact_index(release.organization_id, *file_info)
 
 
 def get_index_entry(release, dist, url) -> Optional[dict]:
@@ -472,7 +488,7 @@ def get_index_entry(release, dist, url) -> Optional[dict]:
 
     if index:
         for candidate in ReleaseFile.normalize(url):
-            entry = index.get("files", {}).get(candidate)
+            entry = index.get(candidate)
             if entry:
                 return entry
 
@@ -562,6 +578,39 @@ def compress(fp: IO) -> Tuple[bytes, bytes]:
     return zlib.compress(content), content
 
 
+def fetch_release_artifact_by_offset(url, release, dist, archive_file):
+    """
+    Read a release artifact from its archive at the offset recorded in the
+    artifact index, without reading the directory and manifest of the archive.
+
+    Returns ``None`` if the artifact has to be extracted from the archive.
+    """
+    info = get_index_entry(release, dist, url)
+    if info is None or info.get("header_offset") is None:
+        return None
+
+    try:
+        body = read_archive_file(archive_file, info["header_offset"])
+    except Exception as exc:
+        logger.error("Failed to read %s from release %s", url, release.id, exc_info=exc)
+        body = None
+
+    if body is None:
+        archive_file.seek(0)
+        return None
+
+    archive_file.close()
+    cache_key, cache_key_meta = get_cache_keys(url, release, dist)
+    return fetch_and_cache_artifact(
+        url,
+        lambda: BytesIO(body),
+        cache_key,
+        cache_key_meta,
+        info.get("headers", {}),
+        compress_fn=compress,
+    )
+
+
 def fetch_release_artifact(url, release, dist):
     """
     Get a release artifact either by extracting it or fetching it directly.
@@ -585,6 +634,11 @@ def fetch_release_artifact(url, release, dist):
     ):
         archive_file = fetch_release_archive_for_url(release, dist, url)
     if archive_file is not None:
+        result = fetch_release_artifact_by_offset(url, release, dist, archive_file)
+        if result is not None:
+            metrics.timing("sourcemaps.release_artifact_from_archive", time.monotonic() - start)
+            return result
+
         try:
             archive = ReleaseArchive(archive_file)
         except Exception as exc:
@@ -781,10 +835,44 @@ def get_max_age(headers):
     return min(max_age, CACHE_CONTROL_MAX)
 
 
+def get_parsed_sourcemap_key(url, checksum, source, release, dist, use_smcache):
+    """
+    Returns the key of a parsed sourcemap in ``parsed_sourcemaps``, given the
+    SHA1 checksum of the sourcemap.
+    """
+    return (
+        release.id if release else None,
+        dist.id if dist else None,
+        None if is_data_uri(url) else url,
+        use_smcache,
+        checksum,
+        sha1_text(source).hexdigest() if use_smcache else None,
+    )
+
+
 # TODO(smcache): Remove unnecessary `use_smcache` flag.
 def fetch_sourcemap(
     url, source=b"", project=None, release=None, dist=None, allow_scraping=True, use_smcache=True
 ):
+    # Parsing large source maps is expensive, so parsed source maps are kept
+    # across events. The key includes the checksums of the inputs, so a
+    # changed source map is always parsed again.
+    cache_key = None
+    use_cache = parsed_sourcemaps.max_size > 0
+
+    if use_cache and release and not is_data_uri(url):
+        # The artifact index records the checksums of all files uploaded in
+        # release archives when they are assembled, so the sourcemap doesn't
+        # have to be fetched if it has been parsed already.
+        entry = get_index_entry(release, dist, url)
+        if entry and entry.get("sha1"):
+            cache_key = get_parsed_sourcemap_key(
+                url, entry["sha1"], source, release, dist, use_smcache
+            )
+            sourcemap = parsed_sourcemaps.get(cache_key)
+            if sourcemap is not None:
+                return sourcemap
+
     if is_data_uri(url):
         try:
             body = base64.b64decode(
@@ -807,24 +895,83 @@ def fetch_sourcemap(
                 allow_scraping=allow_scraping,
             )
         body = result.body
+
+    if use_cache:
+        checked_key = cache_key
+        cache_key = get_parsed_sourcemap_key(
+            url, sha1_text(body).hexdigest(), source, release, dist, use_smcache
+        )
+        # The index may be outdated or the file may not come from an archive.
+        if cache_key != checked_key:
+            sourcemap = parsed_sourcemaps.get(cache_key)
+            if sourcemap is not None:
+                return sourcemap
+
     try:
         # TODO(smcache): Remove unnecessary `use_smcache` flag and use `SmCache` only.
         if use_smcache:
             with sentry_sdk.start_span(
                 op="JavaScriptStacktraceProcessor.fetch_sourcemap.SmCache.from_bytes"
             ):
-                return SmCache.from_bytes(source, body)
+                sourcemap = SmCache.from_bytes(source, body)
         else:
             with sentry_sdk.start_span(
                 op="JavaScriptStacktraceProcessor.fetch_sourcemap.SourceMapView.from_json_bytes"
             ):
-                return SourceMapView.from_json_bytes(body)
+                sourcemap = SourceMapView.from_json_bytes(body)
 
     except Exception as exc:
         # This is in debug because the product shows an error already.
         logger.debug(str(exc), exc_info=True)
         raise UnparseableSourcemap({"url": http.expose_url(url)})
 
+    if cache_key is not None:
+        parsed_sourcemaps.add(cache_key, sourcemap, len(body) + len(source))
+    return sourcemap
+
+
+def fetch_concurrently(
+    fetch: Callable[[Any], Any], items: Sequence[Any], concurrency: int, deadline: float
+) -> Mapping[Any, Tuple[Any, Optional[Exception]]]:
+    """
+    Calls ``fetch`` with every item in a pool of up to ``concurrency`` threads.
+    Returns ``(result, exception)`` of the calls that completed before the
+    ``deadline`` (as returned by ``time.monotonic``) by item.
+    """
+    results = {}
+    pending = list(reversed(items))
+    lock = Lock()
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    if not pending or time.monotonic() > deadline:
+                        return
+                    item = pending.pop()
+
+                try:
+                    result = (fetch(item), None)
+                except Exception as exc:
+                    result = (None, exc)
+
+                with lock:
+                    results[item] = result
+        finally:
+            # Every thread of the pool opens its own database connections.
+            db.connections.close_all()
+
+    workers = min(concurrency, len(items))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = [executor.submit(worker) for _ in range(workers)]
+    # Don't wait for fetches that are still running after the deadline.
+    executor.shutdown(wait=False)
+    wait(futures, timeout=max(0, deadline - time.monotonic()))
+
+    with lock:
+        pending.clear()
+        return dict(results)
+
 
 def is_data_uri(url):
     return url[:BASE64_PREAMBLE_LENGTH] == BASE64_SOURCEMAP_PREAMBLE
@@ -1256,72 +1403,24 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         Look for and (if found) cache a source file and its associated source
         map (if any).
         """
-
-        sourcemaps = self.sourcemaps
-        cache = self.cache
-
         self.fetch_count += 1
 
         if self.fetch_count > self.max_fetches:
-            cache.add_error(filename, {"type": EventError.JS_TOO_MANY_REMOTE_SOURCES})
+            self.cache.add_error(filename, {"type": EventError.JS_TOO_MANY_REMOTE_SOURCES})
             return
 
-        # TODO: respect cache-control/max-age headers to some extent
-        logger.debug("Attempting to cache source %r", filename)
         try:
-            # this both looks in the database and tries to scrape the internet
-            with sentry_sdk.start_span(
-                op="JavaScriptStacktraceProcessor.cache_source.fetch_file"
-            ) as span:
-                span.set_data("filename", filename)
-                result = fetch_file(
-                    filename,
-                    project=self.project,
-                    release=self.release,
-                    dist=self.dist,
-                    allow_scraping=self.allow_scraping,
-                )
+            result = self._fetch_file(filename)
         except http.BadSource as exc:
-            # most people don't upload release artifacts for their third-party libraries,
-            # so ignore missing node_modules files
-            if exc.data["type"] == EventError.JS_MISSING_SOURCE and "node_modules" in filename:
-                pass
-            else:
-                cache.add_error(filename, exc.data)
-
-            # either way, there's no more for us to do here, since we don't have
-            # a valid file to cache
+            self._add_file_error(filename, exc)
             return
-        cache.add(filename, result.body, result.encoding)
-        cache.alias(result.url, filename)
 
-        sourcemap_url = discover_sourcemap(result)
-        if not sourcemap_url:
-            return
-
-        logger.debug(
-            "Found sourcemap URL %r for minified script %r", sourcemap_url[:256], result.url
-        )
-        sourcemaps.link(filename, sourcemap_url)
-        if sourcemap_url in sourcemaps:
+        sourcemap_url = self._add_file(filename, result)
+        if not sourcemap_url or sourcemap_url in self.sourcemaps:
             return
 
-        # pull down sourcemap
         try:
-            with sentry_sdk.start_span(
-                op="JavaScriptStacktraceProcessor.cache_source.fetch_sourcemap"
-            ) as span:
-                span.set_data("sourcemap_url", sourcemap_url)
-                sourcemap_view = fetch_sourcemap(
-                    sourcemap_url,
-                    source=result.body,
-                    project=self.project,
-                    release=self.release,
-                    dist=self.dist,
-                    allow_scraping=self.allow_scraping,
-                    # TODO(smcache): Remove unnecessary `use_smcache` flag.
-                    use_smcache=isinstance(self, JavaScriptSmCacheStacktraceProcessor),
-                )
+            sourcemap_view = self._fetch_sourcemap(sourcemap_url, result.body)
         except http.BadSource as exc:
             # we don't perform the same check here as above, because if someone has
             # uploaded a node_modules file, which has a sourceMappingURL, they
@@ -1329,13 +1428,74 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
             # working, if that's the case). If they're not looking for it to be
             # mapped, then they shouldn't be uploading the source file in the
             # first place.
-            cache.add_error(filename, exc.data)
+            self.cache.add_error(filename, exc.data)
             return
 
+        self._add_sourcemap(sourcemap_url, sourcemap_view)
+
+    def _fetch_file(self, filename):
+        # TODO: respect cache-control/max-age headers to some extent
+        logger.debug("Attempting to cache source %r", filename)
+        # this both looks in the database and tries to scrape the internet
+        with sentry_sdk.start_span(
+            op="JavaScriptStacktraceProcessor.cache_source.fetch_file"
+        ) as span:
+            span.set_data("filename", filename)
+            return fetch_file(
+                filename,
+                project=self.project,
+                release=self.release,
+                dist=self.dist,
+                allow_scraping=self.allow_scraping,
+            )
+
+    def _add_file_error(self, filename, exc):
+        # most people don't upload release artifacts for their third-party libraries,
+        # so ignore missing node_modules files
+        if exc.data["type"] == EventError.JS_MISSING_SOURCE and "node_modules" in filename:
+            pass
+        else:
+            self.cache.add_error(filename, exc.data)
+
+    def _add_file(self, filename, result):
+        """
+        Caches a fetched source file, and returns the URL of its sourcemap if
+        it has one.
+        """
+        self.cache.add(filename, result.body, result.encoding)
+        self.cache.alias(result.url, filename)
+
+        sourcemap_url = discover_sourcemap(result)
+        if not sourcemap_url:
+            return None
+
+        logger.debug(
+            "Found sourcemap URL %r for minified script %r", sourcemap_url[:256], result.url
+        )
+        self.sourcemaps.link(filename, sourcemap_url)
+        return sourcemap_url
+
+    def _fetch_sourcemap(self, sourcemap_url, source):
+        with sentry_sdk.start_span(
+            op="JavaScriptStacktraceProcessor.cache_source.fetch_sourcemap"
+        ) as span:
+            span.set_data("sourcemap_url", sourcemap_url)
+            return fetch_sourcemap(
+                sourcemap_url,
+                source=source,
+                project=self.project,
+                release=self.release,
+                dist=self.dist,
+                allow_scraping=self.allow_scraping,
+                # TODO(smcache): Remove unnecessary `use_smcache` flag.
+                use_smcache=isinstance(self, JavaScriptSmCacheStacktraceProcessor),
+            )
+
+    def _add_sourcemap(self, sourcemap_url, sourcemap_view):
         with sentry_sdk.start_span(
             op="JavaScriptStacktraceProcessor.cache_source.cache_sourcemap_view"
         ) as span:
-            sourcemaps.add(sourcemap_url, sourcemap_view)
+            self.sourcemaps.add(sourcemap_url, sourcemap_view)
 
             # TODO(smcache): Remove this whole iteration block
             if not isinstance(self, JavaScriptSmCacheStacktraceProcessor):
@@ -1369,6 +1529,15 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 continue
             pending_file_list.add(f["abs_path"])
 
+        concurrency = options.get("processing.sourcemap-fetch-concurrency")
+        if concurrency > 1 and len(pending_file_list) > 1:
+            with sentry_sdk.start_span(
+                op="JavaScriptStacktraceProcessor.populate_source_cache.cache_sources_concurrently"
+            ) as span:
+                span.set_data("file_count", len(pending_file_list))
+                self.cache_sources_concurrently(list(pending_file_list), concurrency)
+            return
+
         for idx, filename in enumerate(pending_file_list):
             with sentry_sdk.start_span(
                 op="JavaScriptStacktraceProcessor.populate_source_cache.cache_source"
@@ -1376,6 +1545,90 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 span.set_data("filename", filename)
                 self.cache_source(filename=filename)
 
+    def cache_sources_concurrently(self, filenames, concurrency):
+        """
+        Does the same as ``cache_source`` for every file, but fetches the files,
+        and then their sourcemaps, in a pool of threads. Caches are only
+        updated by the calling thread, in the order of ``filenames``.
+
+        Files and sourcemaps that aren't fetched before the deadline
+        configured by ``processing.sourcemap-fetch-deadline`` are reported as
+        timed out.
+        """
+        timeout = options.get("processing.sourcemap-fetch-deadline")
+        deadline = time.monotonic() + timeout
+
+        fetch_filenames = []
+        for filename in filenames:
+            self.fetch_count += 1
+            if self.fetch_count > self.max_fetches:
+                self.cache.add_error(filename, {"type": EventError.JS_TOO_MANY_REMOTE_SOURCES})
+            else:
+                fetch_filenames.append(filename)
+
+        if not fetch_filenames:
+            return
+
+        files = fetch_concurrently(self._fetch_file, fetch_filenames, concurrency, deadline)
+
+        # sourcemap url -> (source of the first file, [filename, ...])
+        pending_sourcemaps = {}
+        for filename in fetch_filenames:
+            if filename not in files:
+                self.cache.add_error(
+                    filename,
+                    {
+                        "type": EventError.FETCH_TIMEOUT,
+                        "url": http.expose_url(filename),
+                        "timeout": timeout,
+                    },
+                )
+                continue
+
+            result, exc = files[filename]
+            if isinstance(exc, http.BadSource):
+                self._add_file_error(filename, exc)
+                continue
+            elif exc is not None:
+                raise exc
+
+            sourcemap_url = self._add_file(filename, result)
+            if sourcemap_url and sourcemap_url not in self.sourcemaps:
+                pending_sourcemaps.setdefault(sourcemap_url, (result.body, []))[1].append(filename)
+
+        if not pending_sourcemaps:
+            return
+
+        sourcemaps = fetch_concurrently(
+            lambda sourcemap_url: self._fetch_sourcemap(
+                sourcemap_url, pending_sourcemaps[sourcemap_url][0]
+            ),
+            list(pending_sourcemaps),
+            concurrency,
+            deadline,
+        )
+
+        for sourcemap_url, (_, sourcemap_filenames) in pending_sourcemaps.items():
+            if sourcemap_url not in sourcemaps:
+                error = {
+                    "type": EventError.FETCH_TIMEOUT,
+                    "url": http.expose_url(sourcemap_url),
+                    "timeout": timeout,
+                }
+            else:
+                sourcemap_view, exc = sourcemaps[sourcemap_url]
+                if exc is None:
+                    self._add_sourcemap(sourcemap_url, sourcemap_view)
+                    continue
+                elif not isinstance(exc, http.BadSource):
+                    raise exc
+                error = exc.data
+
+            # Files that share a sourcemap all report its error, as if they
+            # were fetched one after the other.
+            for filename in sourcemap_filenames:
+                self.cache.add_error(filename, error)
+
     def close(self):
         StacktraceProcessor.close(self)
         if self.sourcemaps_touched:
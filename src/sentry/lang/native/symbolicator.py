@@ -1,6 +1,9 @@
 import base64
 import logging
+import math
+import os
 import sys
+import threading
 import time
 import uuid
 from copy import deepcopy
@@ -174,6 +177,11 @@ class Symbolicator:
                     # have a response ready immediately, so we start polling after
                     # some timeout.
                     json_response = create_task()
+
+                polled = (
+                    json_response["status"] == "pending" and settings.SYMBOLICATOR_POLL_TIMEOUT > 0
+                )
+                json_response = self._poll(json_response, create_task)
             except ServiceUnavailable:
                 # 503 can indicate that symbolicator is restarting. Wait for a
                 # reboot, then try again. This overrides the default behavior of
@@ -194,7 +202,9 @@ class Symbolicator:
                 default_cache.set(
                     self.task_id_cache_key, json_response["request_id"], REQUEST_CACHE_TIMEOUT
                 )
-                raise RetrySymbolication(retry_after=json_response["retry_after"])
+                # If the task has been polled, symbolicator has been waited for
+                # already and it can be queried again right away.
+                raise RetrySymbolication(retry_after=0 if polled else json_response["retry_after"])
             else:
                 # Once we arrive here, we are done processing. Clean up the
                 # task id from the cache.
@@ -204,6 +214,32 @@ class Symbolicator:
                 )
                 return json_response
 
+    def _poll(self, json_response, create_task):
+        """
+        Polls a pending task until it completes, or until
+        ``SYMBOLICATOR_POLL_TIMEOUT`` seconds have passed.
+
+        Instead of sleeping for the ``retry_after`` advertised by symbolicator
+        before querying the task, every query asks symbolicator to wait for up
+        to that long, so that the response is returned as soon as the task
+        completes.
+        """
+        deadline = time.monotonic() + settings.SYMBOLICATOR_POLL_TIMEOUT
+        while json_response["status"] == "pending":
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            wait = min(json_response.get("retry_after") or 1, math.ceil(remaining))
+            metrics.incr("events.symbolicator.poll")
+            task_id = json_response["request_id"]
+            json_response = self.sess.query_task(task_id, timeout=max(1, wait))
+            if json_response is None:
+                # symbolicator has lost the task, see `SymbolicatorSession._request`
+                json_response = create_task()
+
+        return json_response
+
     def process_minidump(self, minidump):
         return self._process(lambda: self.sess.upload_minidump(minidump), "process_minidump")
 
@@ -512,12 +548,11 @@ class SymbolicatorSession:
 
     def open(self):
         if self.session is None:
-            self.session = Session()
+            self.session = get_pooled_session()
 
     def close(self):
-        if self.session is not None:
-            self.session.close()
-            self.session = None
+        # The pooled session keeps its connections open for later requests.
+        self.session = None
 
     def _ensure_open(self):
         if not self.session:
@@ -652,11 +687,15 @@ class SymbolicatorSession:
             files={"apple_crash_report": report},
         )
 
-    def query_task(self, task_id):
+    def query_task(self, task_id, timeout=0):
+        """
+        Queries a task. If it is still pending, symbolicator waits for it to
+        complete for up to ``timeout`` seconds before responding.
+        """
         task_url = f"requests/{task_id}"
 
         params = {
-            "timeout": 0,  # Only wait when creating, but not when querying tasks
+            "timeout": timeout,
             "scope": self.project_id,
         }
 
@@ -675,6 +714,23 @@ class SymbolicatorSession:
         return cls._worker_id
 
 
+_pooled_sessions = threading.local()
+
+
+def get_pooled_session():
+    """
+    Returns the HTTP session of the current thread, so that connections to
+    symbolicator are kept alive across events instead of being opened for
+    every request.
+    """
+    session = getattr(_pooled_sessions, "session", None)
+    if session is None or _pooled_sessions.pid != os.getpid():
+        # Connections must not be shared with forked processes.
+        session = _pooled_sessions.session = Session()
+        _pooled_sessions.pid = os.getpid()
+    return session
+
+
 def reverse_aliases_map(builtin_sources):
     """Returns a map of source IDs to their original un-aliased source ID.
 
@@ -8,12 +8,12 @@ from sentry.db.models import Model, region_silo_only_model, sane_repr
 from sentry.db.models.fields import FlexibleForeignKey, JSONField
 from sentry.models import ActorTuple
 from sentry.models.groupowner import OwnerRuleType
-from sentry.ownership.grammar import Rule, load_schema, resolve_actors
+from sentry.ownership.grammar import Rule, load_rule_index, resolve_actors
 from sentry.utils import metrics
 from sentry.utils.cache import cache
 
 if TYPE_CHECKING:
-    from sentry.models import Team, User
+    from sentry.models import ProjectCodeOwners, Team, User
 
 READ_CACHE_DURATION = 3600
 
@@ -112,9 +112,13 @@ class ProjectOwnership(Model):
             ownership = cls(project_id=project_id)
 
         codeowners = ProjectCodeOwners.get_codeowners_cached(project_id)
-        ownership.schema = cls.get_combined_schema(ownership, codeowners)
 
-        rules = cls._matching_ownership_rules(ownership, project_id, data)
+        # The same rules as matching the combined schema (see
+        # ``get_combined_schema``), with one cached rule index per schema.
+        rules = [
+            *(cls._matching_ownership_rules(codeowners, project_id, data) if codeowners else []),
+            *cls._matching_ownership_rules(ownership, project_id, data),
+        ]
 
         if not rules:
             return cls.Everyone if ownership.fallthrough else [], None
@@ -297,15 +301,15 @@ class ProjectOwnership(Model):
 
     @classmethod
     def _matching_ownership_rules(
-        cls, ownership: "ProjectOwnership", project_id: int, data: Mapping[str, Any]
+        cls,
+        ownership: Union["ProjectOwnership", "ProjectCodeOwners"],
+        project_id: int,
+        data: Mapping[str, Any],
     ) -> Sequence["Rule"]:
-        rules = []
-        if ownership.schema is not None:
-            for rule in load_schema(ownership.schema):
-                if rule.test(data):
-                    rules.append(rule)
+        if ownership.schema is None:
+            return []
 
-        return rules
+        return load_rule_index(ownership.schema).get_matching_rules(data)
 
 
 # Signals update the cached reads used in post_processing
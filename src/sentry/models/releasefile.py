@@ -284,6 +284,10 @@ class _ArtifactIndexGuard:
             with fp:
                 return json.load(fp)
 
+    def file_info(self) -> Optional[Tuple[int, str]]:
+        """Id and checksum of the file holding the index data, no synchronization necessary"""
+        return self._releasefile_qs().values_list("file_id", "file__checksum").first()
+
     @contextmanager
     def writable_data(self, create: bool, initial_artifact_count=None):
         """Context manager for editable artifact index"""
@@ -373,6 +377,14 @@ def read_artifact_index(
     return guard.readable_data(use_cache)
 
 
+def get_artifact_index_file_info(
+    release: Release, dist: Optional[Distribution], **filter_args
+) -> Optional[Tuple[int, str]]:
+    """Get id and checksum of the file holding the index data"""
+    guard = _ArtifactIndexGuard(release, dist, **filter_args)
+    return guard.file_info()
+
+
 def _compute_sha1(archive: ReleaseArchive, url: str) -> str:
     data = archive.read(url)
     return sha1(data).hexdigest()
@@ -408,6 +420,7 @@ def update_artifact_index(release: Release, dist: Optional[Distribution], archiv
             info["date_created"] = archive_file.timestamp
             info["sha1"] = _compute_sha1(archive, filename)
             info["size"] = archive.info(filename).file_size
+            info["header_offset"] = archive.info(filename).header_offset
             files_out[url] = info
 
     guard = _ArtifactIndexGuard(release, dist)
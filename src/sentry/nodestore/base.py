@@ -1,9 +1,14 @@
-from threading import local
+from threading import Lock, local
+from weakref import WeakKeyDictionary
 
 import sentry_sdk
+from django.conf import settings
 from django.core.cache import InvalidCacheBackendError, caches
 
-from sentry.utils import json
+from sentry import options
+from sentry.nodestore import container
+from sentry.nodestore.lru import NodeLRUCache
+from sentry.utils import json, metrics
 from sentry.utils.cache import memoize
 from sentry.utils.services import Service
 
@@ -22,6 +27,11 @@ json_dumps = json.JSONEncoder(
 
 json_loads = json._default_decoder.decode
 
+# The nodestore is a thread local, the in-process LRU is shared between all
+# threads of a process so it is kept outside of the instance.
+_local_caches = WeakKeyDictionary()
+_local_caches_lock = Lock()
+
 
 class NodeStorage(local, Service):
     """
@@ -65,6 +75,7 @@ class NodeStorage(local, Service):
         "get_multi",
         "set",
         "set_subkeys",
+        "set_multi",
         "cleanup",
         "validate",
         "bootstrap",
@@ -92,6 +103,11 @@ class NodeStorage(local, Service):
         if value is None:
             return None
 
+        if container.is_container(value):
+            # Only the requested subkey is decompressed and parsed.
+            segment = container.read_segment(value, subkey)
+            return json_loads(segment) if segment is not None else None
+
         lines_iter = iter(value.splitlines())
         try:
             if subkey is not None:
@@ -126,6 +142,13 @@ class NodeStorage(local, Service):
         """
         with sentry_sdk.start_span(op="nodestore.get") as span:
             span.set_tag("node_id", id)
+
+            local_items = self._get_local_cache_items([id], subkey)
+            if id in local_items:
+                span.set_tag("origin", "from_local_cache")
+                span.set_tag("found", bool(local_items[id]))
+                return local_items[id]
+
             if subkey is None:
                 item_from_cache = self._get_cache_item(id)
                 if item_from_cache:
@@ -139,6 +162,7 @@ class NodeStorage(local, Service):
             if subkey is None:
                 # set cache item only after we know decoding did not fail
                 self._set_cache_item(id, rv)
+            self._set_local_cache_items({id: bytes_data})
 
             span.set_tag("result", "from_service")
             if bytes_data:
@@ -169,23 +193,34 @@ class NodeStorage(local, Service):
             span.set_tag("subkey", str(subkey))
             span.set_tag("num_ids", len(id_list))
 
+            # Backends differ in whether they return missing nodes as ``None``
+            # or leave them out, so those are always looked up to return the
+            # same result as without the local cache.
+            local_items = self._get_local_cache_items(id_list, subkey, include_missing=False)
+            if len(local_items) == len(id_list):
+                span.set_tag("result", "from_local_cache")
+                return local_items
+
+            id_list = [id for id in id_list if id not in local_items]
+
             if subkey is None:
                 cache_items = self._get_cache_items(id_list)
                 if len(cache_items) == len(id_list):
                     span.set_tag("result", "from_cache")
+                    cache_items.update(local_items)
                     return cache_items
 
                 uncached_ids = [id for id in id_list if id not in cache_items]
             else:
                 uncached_ids = id_list
 
-            items = {
-                id: self._decode(value, subkey=subkey)
-                for id, value in self._get_bytes_multi(uncached_ids).items()
-            }
+            bytes_items = self._get_bytes_multi(uncached_ids)
+            items = {id: self._decode(value, subkey=subkey) for id, value in bytes_items.items()}
             if subkey is None:
                 self._set_cache_items(items)
                 items.update(cache_items)
+            self._set_local_cache_items({id: bytes_items.get(id) for id in uncached_ids})
+            items.update(local_items)
 
             span.set_tag("result", "from_service")
             span.set_tag("found", len(items))
@@ -200,7 +235,17 @@ class NodeStorage(local, Service):
 
         >>> _encode({"unprocessed": {}, None: {"stacktrace": {}}})
         b'{"stacktrace": {}}\nunprocessed\n{}'
+
+        With the ``nodestore.container-format.enabled`` option set, nodes are
+        encoded in the container format instead (see ``container``), which
+        stores every subkey as an independently compressed segment.
         """
+        if options.get("nodestore.container-format.enabled"):
+            segments = {None: json_dumps(data.pop(None)).encode("utf8")}
+            for key, value in data.items():
+                segments[key] = json_dumps(value).encode("utf8")
+            return container.encode(segments)
+
         lines = [json_dumps(data.pop(None)).encode("utf8")]
         for key, value in data.items():
             lines.append(key.encode("ascii"))
@@ -245,6 +290,42 @@ class NodeStorage(local, Service):
             self._set_bytes(id, bytes_data, ttl=ttl)
             # set cache only after encoding and write to nodestore has succeeded
             self._set_cache_item(id, cache_item)
+            self._set_local_cache_items({id: bytes_data})
+
+    def _set_bytes_multi(self, items, ttl=None):
+        """
+        >>> nodestore._set_bytes_multi({
+        ...     'key1': b"{'foo': 'bar'}",
+        ...     'key2': b"{'foo': 'baz'}",
+        ... })
+        """
+        for id, data in items.items():
+            self._set_bytes(id, data, ttl=ttl)
+
+    def set_multi(self, items, ttl=None):
+        """
+        Set values and subkeys for multiple ids at once. Every value of
+        `items` is a dict of subkeys as accepted by `set_subkeys`.
+
+        Note: This is not guaranteed to be atomic and may result in a partial
+        write.
+
+        >>> nodestore.set_multi({
+        ...    'key1': {None: {'foo': 'bar'}},
+        ...    'key2': {None: {'foo': 'baz'}, "reprocessing": {'foo': 'bam'}},
+        ... })
+        """
+        with sentry_sdk.start_span(op="nodestore.set_multi") as span:
+            span.set_tag("num_ids", len(items))
+            if not items:
+                return
+
+            cache_items = {id: data.get(None) for id, data in items.items()}
+            bytes_items = {id: self._encode(dict(data)) for id, data in items.items()}
+            self._set_bytes_multi(bytes_items, ttl=ttl)
+            # set cache only after encoding and write to nodestore has succeeded
+            self._set_cache_items({id: data for id, data in cache_items.items() if data})
+            self._set_local_cache_items(bytes_items)
 
     def cleanup(self, cutoff_timestamp):
         raise NotImplementedError
@@ -272,10 +353,66 @@ class NodeStorage(local, Service):
     def _delete_cache_item(self, id):
         if self.cache:
             self.cache.delete(id)
+        if self.local_cache:
+            self.local_cache.delete(id)
 
     def _delete_cache_items(self, id_list):
         if self.cache:
             self.cache.delete_many([id for id in id_list])
+        if self.local_cache:
+            self.local_cache.delete_many(id_list)
+
+    def _get_local_cache_items(self, id_list, subkey=None, include_missing=True):
+        """
+        Returns the decoded nodes (or subkeys of nodes) of ``id_list`` that
+        are found in the in-process cache. Nodes known to not exist are
+        returned as ``None``, unless ``include_missing`` is false in which
+        case they are treated as not cached.
+        """
+        local_cache = self.local_cache
+        if not local_cache:
+            return {}
+
+        items = {}
+        for id, entry in local_cache.get_many(id_list).items():
+            if entry.missing:
+                if include_missing:
+                    items[id] = None
+            else:
+                items[id] = self._decode(entry.raw, subkey=subkey)
+
+        tags = {"backend": type(self).__name__}
+        if items:
+            metrics.incr("nodestore.local_cache.hit", amount=len(items), tags=tags)
+        if len(items) < len(id_list):
+            metrics.incr("nodestore.local_cache.miss", amount=len(id_list) - len(items), tags=tags)
+        return items
+
+    def _set_local_cache_items(self, items):
+        """
+        Stores the encoded payloads of ``items`` (``None`` for nodes that do
+        not exist) in the in-process cache.
+        """
+        if self.local_cache:
+            self.local_cache.set_many(items)
+
+    @property
+    def local_cache(self):
+        max_bytes = getattr(settings, "SENTRY_NODESTORE_LOCAL_CACHE_BYTES", 0)
+        if not max_bytes:
+            return None
+
+        local_cache = _local_caches.get(self)
+        if local_cache is None:
+            with _local_caches_lock:
+                local_cache = _local_caches.get(self)
+                if local_cache is None:
+                    local_cache = _local_caches[self] = NodeLRUCache(
+                        max_bytes=max_bytes,
+                        ttl=settings.SENTRY_NODESTORE_LOCAL_CACHE_TTL,
+                        miss_ttl=settings.SENTRY_NODESTORE_LOCAL_CACHE_MISS_TTL,
+                    )
+        return local_cache
 
     @memoize
     def cache(self):
@@ -3,6 +3,7 @@ import os
 import sentry_sdk
 
 from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.container import is_container
 from sentry.utils.kvstore.bigtable import BigtableKVStorage
 
 
@@ -65,7 +66,27 @@ class BigtableNodeStorage(NodeStorage):
         return rv
 
     def _set_bytes(self, id, data, ttl=None):
-        self.store.set(id, data, ttl)
+        # Containers compress their segments individually, compressing the
+        # whole value again would require decompressing it for every read.
+        self.store.set(id, data, ttl, compress=not is_container(data))
+
+    def _set_bytes_multi(self, items, ttl=None):
+        if len(items) == 1:
+            for id, data in items.items():
+                self._set_bytes(id, data, ttl=ttl)
+            return
+
+        with sentry_sdk.start_span(op="nodestore.bigtable.set_multi") as span:
+            span.set_tag("num_ids", len(items))
+
+            # Compression is configured per request, so legacy payloads and
+            # containers are written in separate batches.
+            batches = {}
+            for id, data in items.items():
+                batches.setdefault(not is_container(data), []).append((id, data))
+
+            for compress, batch in batches.items():
+                self.store.set_many(batch, ttl, compress=compress)
 
     def delete(self, id):
         if self.skip_deletes:
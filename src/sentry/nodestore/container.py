@@ -0,0 +1,107 @@
+"""
+Versioned container format for node payloads.
+
+The legacy encoding (see ``NodeStorage._encode``) joins the JSON payloads of a
+node and its subkeys with newlines, and the result is compressed as a whole.
+Reading a single subkey requires decompressing and scanning the full payload.
+
+The container format stores every subkey as an independently compressed
+segment, preceded by a header that records where each segment is located::
+
+    magic (4 bytes) | header length (u32) | header | segment | segment | ...
+
+The header contains the number of segments (u16), followed by one entry per
+segment: the length of the subkey name (u8), the name (ASCII, empty for the
+default ``None`` subkey), and the offset and length of the segment (both u32,
+relative to the end of the header). Segments are zstd-compressed JSON.
+
+The magic starts with a null byte so that it can be told apart from legacy
+payloads, which are JSON (or pickle for very old Django nodes).
+"""
+
+import struct
+
+import zstandard
+
+MAGIC = b"\x00NS\x01"
+
+_header_length = struct.Struct("<I")
+_segment_count = struct.Struct("<H")
+_name_length = struct.Struct("<B")
+_segment_location = struct.Struct("<II")
+
+
+def is_container(value):
+    return value is not None and value[: len(MAGIC)] == MAGIC
+
+
+def encode(segments, level=3):
+    """
+    Encodes a mapping of subkey to JSON-encoded bytes into a container.
+    """
+    compressor = zstandard.ZstdCompressor(level=level)
+
+    header = [_segment_count.pack(len(segments))]
+    body = []
+    offset = 0
+    for subkey, value in segments.items():
+        name = b"" if subkey is None else subkey.encode("ascii")
+        compressed = compressor.compress(value)
+        header.append(_name_length.pack(len(name)))
+        header.append(name)
+        header.append(_segment_location.pack(offset, len(compressed)))
+        body.append(compressed)
+        offset += len(compressed)
+
+    header = b"".join(header)
+    return b"".join([MAGIC, _header_length.pack(len(header)), header] + body)
+
+
+def read_index(value):
+    """
+    Returns a mapping of subkey to ``(start, end)`` byte positions of the
+    compressed segments in ``value``, without decompressing anything.
+    """
+    view = memoryview(value)
+    pos = len(MAGIC)
+    (header_length,) = _header_length.unpack_from(view, pos)
+    pos += _header_length.size
+    data_start = pos + header_length
+
+    (count,) = _segment_count.unpack_from(view, pos)
+    pos += _segment_count.size
+
+    index = {}
+    for _ in range(count):
+        (name_length,) = _name_length.unpack_from(view, pos)
+        pos += _name_length.size
+        name = bytes(view[pos : pos + name_length]).decode("ascii") or None
+        pos += name_length
+        offset, length = _segment_location.unpack_from(view, pos)
+        pos += _segment_location.size
+        index[name] = (data_start + offset, data_start + offset + length)
+    return index
+
+
+def read_segment(value, subkey=None):
+    """
+    Returns the decompressed JSON bytes of a single subkey, or ``None`` if the
+    container has no such subkey.
+    """
+    location = read_index(value).get(subkey)
+    if location is None:
+        return None
+    start, end = location
+    return zstandard.ZstdDecompressor().decompress(memoryview(value)[start:end])
+
+
+def read_segments(value):
+    """
+    Returns the decompressed JSON bytes of all subkeys.
+    """
+    decompressor = zstandard.ZstdDecompressor()
+    view = memoryview(value)
+    return {
+        subkey: decompressor.decompress(view[start:end])
+        for subkey, (start, end) in read_index(value).items()
+    }
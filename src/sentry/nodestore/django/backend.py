@@ -1,12 +1,16 @@
+import base64
 import logging
 import math
 import pickle
+import zlib
 
+from django.db import connections, router
 from django.utils import timezone
 
 from sentry.db.models import create_or_update
 from sentry.nodestore.base import NodeStorage
-from sentry.utils.strings import compress, decompress
+from sentry.nodestore.container import is_container
+from sentry.utils.strings import compress
 
 from .models import Node
 
@@ -23,7 +27,7 @@ class DjangoNodeStorage(NodeStorage):
             return None
 
         try:
-            if value.startswith(b"{"):
+            if value.startswith(b"{") or is_container(value):
                 return NodeStorage._decode(self, value, subkey=subkey)
 
             if subkey is None:
@@ -34,22 +38,61 @@ class DjangoNodeStorage(NodeStorage):
             logger.exception(e)
             return {}
 
+    def _decompress(self, data):
+        # Containers already compress their segments and are stored as plain
+        # base64 so that subkeys can be read without decompressing everything.
+        value = base64.b64decode(data)
+        if is_container(value):
+            return value
+        return zlib.decompress(value)
+
+    def _compress(self, data):
+        if is_container(data):
+            return base64.b64encode(data).decode("utf-8")
+        return compress(data)
+
     def _get_bytes(self, id):
         try:
             data = Node.objects.get(id=id).data
-            return decompress(data)
+            return self._decompress(data)
         except Node.DoesNotExist:
             return None
 
     def _get_bytes_multi(self, id_list):
-        return {n.id: decompress(n.data) for n in Node.objects.filter(id__in=id_list)}
+        return {n.id: self._decompress(n.data) for n in Node.objects.filter(id__in=id_list)}
 
     def delete_multi(self, id_list):
         Node.objects.filter(id__in=id_list).delete()
         self._delete_cache_items(id_list)
 
     def _set_bytes(self, id, data, ttl=None):
-        create_or_update(Node, id=id, values={"data": compress(data), "timestamp": timezone.now()})
+        create_or_update(
+            Node, id=id, values={"data": self._compress(data), "timestamp": timezone.now()}
+        )
+
+    def _set_bytes_multi(self, items, ttl=None):
+        connection = connections[router.db_for_write(Node)]
+        if connection.vendor != "postgresql":
+            return NodeStorage._set_bytes_multi(self, items, ttl=ttl)
+
+        from psycopg2.extras import execute_values
+
+        # Sort by id so that concurrent upserts acquire row locks in the same
+        # order and cannot deadlock.
+        timestamp = timezone.now()
+        rows = [(id, self._compress(data), timestamp) for id, data in sorted(items.items())]
+        with connection.cursor() as cursor:
+            execute_values(
+                cursor,
+                """
+                INSERT INTO {table} (id, data, timestamp) VALUES %s
+                ON CONFLICT (id) DO UPDATE
+                SET data = EXCLUDED.data, timestamp = EXCLUDED.timestamp
+                """.format(
+                    table=connection.ops.quote_name(Node._meta.db_table)
+                ),
+                rows,
+            )
 
     def cleanup(self, cutoff_timestamp):
         from sentry.db.deletion import BulkDeleteQuery
@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Rough per-entry overhead (key, entry object, dict slots) that is added to the
+# payload size so that many tiny or missing nodes still count against the limit.
+ENTRY_OVERHEAD = 200
+
+
+class CacheEntry:
+    """
+    A cached node. ``raw`` holds the encoded payload as returned by the
+    backend, so that it is decoded exactly like an uncached read. If it is
+    ``None`` the node does not exist (a negative cache entry).
+    """
+
+    __slots__ = ("expires", "size", "raw")
+
+    def __init__(self, expires, size, raw=None):
+        self.expires = expires
+        self.size = size
+        self.raw = raw
+
+    @property
+    def missing(self):
+        return self.raw is None
+
+
+class NodeLRUCache:
+    """
+    A process-wide, size bounded LRU cache of encoded node payloads, used in
+    front of the nodestore backends.
+
+    :param max_bytes: Upper bound of the summed size of all cached payloads.
+    :param ttl: Seconds after which a cached node is considered stale.
+    :param miss_ttl: Seconds for which a node that does not exist is
+        remembered as missing.
+    """
+
+    def __init__(self, max_bytes, ttl, miss_ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, id):
+        """
+        Returns the ``CacheEntry`` for ``id``, or ``None`` if it is not cached.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(id)
+            if entry is None:
+                return None
+            if entry.expires < now:
+                self._remove(id)
+                return None
+            self._entries.move_to_end(id)
+            return entry
+
+    def get_many(self, id_list):
+        rv = {}
+        for id in id_list:
+            entry = self.get(id)
+            if entry is not None:
+                rv[id] = entry
+        return rv
+
+    def set(self, id, value):
+        """
+        Caches the encoded payload of a node. A ``value`` of ``None`` records
+        that the node does not exist.
+        """
+        if value is None:
+            entry = CacheEntry(time.time() + self.miss_ttl, ENTRY_OVERHEAD)
+        else:
+            size = len(value) + ENTRY_OVERHEAD
+            if size > self.max_bytes:
+                self.delete(id)
+                return
+            entry = CacheEntry(time.time() + self.ttl, size, raw=value)
+
+        with self._lock:
+            self._remove(id)
+            self._entries[id] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def set_many(self, items):
+        for id, value in items.items():
+            self.set(id, value)
+
+    def delete(self, id):
+        with self._lock:
+            self._remove(id)
+
+    def delete_many(self, id_list):
+        with self._lock:
+            for id in id_list:
+                self._remove(id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, id):
+        # must be called while holding ``_lock``
+        entry = self._entries.pop(id, None)
+        if entry is not None:
+            self.size -= entry.size
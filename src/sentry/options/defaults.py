@@ -261,6 +261,21 @@ register("snuba.search.max-total-chunk-time-seconds", default=30.0)
 register("snuba.search.hits-sample-size", default=100)
 register("snuba.track-outcomes-sample-rate", default=0.0)
 
+# Snuba query cache: serve all concurrent executions of an uncached query from a
+# single Snuba query, and serve stale results while they are refreshed.
+register("snuba.query-cache.coalescing", type=Bool, default=False)
+register("snuba.query-cache.coalescing-timeout", default=10.0)
+# Seconds for which expired results are still served, by referrer.
+register("snuba.query-cache.stale-while-revalidate", type=Dict, default={})
+# Granularity in seconds to which query time ranges are floored, by referrer.
+register("snuba.query-cache.time-buckets", type=Dict, default={})
+
+# Incremental cache of the buckets of timeseries queries, see sentry.snuba.timeseries_cache
+register("snuba.timeseries-cache.enabled", type=Bool, default=False)
+# Seconds after the end of a bucket after which it is considered complete.
+register("snuba.timeseries-cache.commit-delay", default=5 * 60)
+register("snuba.timeseries-cache.ttl", default=60 * 60)
+
 # The percentage of tagkeys that we want to cache. Set to 1.0 in order to cache everything, <=0.0 to stop caching
 register("snuba.tagstore.cache-tagkeys-rate", default=0.0, flags=FLAG_PRIORITIZE_DISK)
 
@@ -325,6 +340,10 @@ register("nodedata.cache-on-save", default=False, flags=FLAG_PRIORITIZE_DISK)
 # Use nodestore for eventstore.get_events
 register("eventstore.use-nodestore", default=False, flags=FLAG_PRIORITIZE_DISK)
 
+# Write nodes in the container format that allows decoding subkeys
+# independently. Readers support both formats regardless of this option.
+register("nodestore.container-format.enabled", default=False, flags=FLAG_PRIORITIZE_DISK)
+
 # Alerts / Workflow incremental rollout rate. Tied to feature handlers in getsentry
 register("workflow.rollout-rate", default=0, flags=FLAG_PRIORITIZE_DISK)
 
@@ -399,6 +418,14 @@ register("processing.release-archive-min-files", default=10)
 # Try to read release artifacts from zip archives
 register("processing.use-release-archives-sample-rate", default=0.0)  # unused
 
+# Number of threads that fetch the sources and sourcemaps of a JavaScript event
+# concurrently. With 1, files are fetched one after the other.
+register("processing.sourcemap-fetch-concurrency", default=1)
+
+# Seconds after which concurrent fetches of sources and sourcemaps of a
+# JavaScript event are abandoned and reported as timed out.
+register("processing.sourcemap-fetch-deadline", default=30.0)
+
 # All Relay options (statically authenticated Relays can be registered here)
 register("relay.static_auth", default={}, flags=FLAG_NOSTORE)
 
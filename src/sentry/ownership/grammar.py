@@ -2,9 +2,22 @@ from __future__ import annotations
 
 import operator
 import re
-from collections import namedtuple
-from functools import reduce
-from typing import Any, Callable, Iterable, List, Mapping, Optional, Pattern, Sequence, Tuple, Union
+from collections import OrderedDict, defaultdict, namedtuple
+from functools import lru_cache, reduce
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from django.db.models import Q
 from parsimonious.exceptions import ParseError
@@ -14,14 +27,19 @@ from rest_framework.serializers import ValidationError
 
 from sentry.eventstore.models import EventSubjectTemplateData
 from sentry.models import ActorTuple, RepositoryProjectPathConfig
+from sentry.utils import metrics
 from sentry.utils.event_frames import find_stack_frames, get_sdk_name, munged_filename_and_frames
 from sentry.utils.glob import glob_match
+from sentry.utils.hashlib import hash_values
 from sentry.utils.safe import PathSearchable, get_path
 
 __all__ = ("parse_rules", "dump_schema", "load_schema")
 
 VERSION = 1
 
+# Number of parsed rule sets that are cached per process.
+CACHED_RULE_SETS = 1000
+
 URL = "url"
 PATH = "path"
 MODULE = "module"
@@ -376,9 +394,22 @@ def _path_to_regex(pattern: str) -> Pattern[str]:
 
 
 def parse_rules(data: str) -> Any:
-    """Convert a raw text input into a Rule tree"""
-    tree = ownership_grammar.parse(data)
-    return OwnershipVisitor().visit(tree)
+    """Convert a raw text input into a Rule tree
+
+    Parsed rules are cached per process, callers get a copy of them.
+    """
+    return [Rule(rule.matcher, list(rule.owners)) for rule in _parse_rules(data)]
+
+
+@lru_cache(maxsize=CACHED_RULE_SETS)
+def _parse_rules(data: str) -> Tuple[Rule, ...]:
+    with metrics.timer("ownership.parse", tags={"format": "text"}):
+        tree = ownership_grammar.parse(data)
+        return tuple(_freeze_rule(rule) for rule in OwnershipVisitor().visit(tree))
+
+
+def _freeze_rule(rule: Rule) -> Rule:
+    return Rule(rule.matcher, tuple(rule.owners))
 
 
 def dump_schema(rules: Sequence[Rule]) -> Mapping[str, Any]:
@@ -393,6 +424,227 @@ def load_schema(schema: Mapping[str, Any]) -> Sequence[Rule]:
     return [Rule.load(r) for r in schema["rules"]]
 
 
+_rule_indexes: OrderedDict[str, RuleIndex] = OrderedDict()
+_rule_indexes_lock = Lock()
+
+
+def load_rule_index(schema: Mapping[str, Any]) -> RuleIndex:
+    """Like ``load_schema``, but returns a ``RuleIndex`` of the rules.
+
+    Indexes are cached per process by a hash of the schema content and shared
+    between callers.
+    """
+    if schema["$version"] != VERSION:
+        raise RuntimeError("Invalid schema $version: %r" % schema["$version"])
+
+    key = hash_values([schema])
+    with _rule_indexes_lock:
+        index = _rule_indexes.get(key)
+        if index is not None:
+            _rule_indexes.move_to_end(key)
+            return index
+
+    index = _build_rule_index(schema)
+    with _rule_indexes_lock:
+        _rule_indexes[key] = index
+        while len(_rule_indexes) > CACHED_RULE_SETS:
+            _rule_indexes.popitem(last=False)
+    return index
+
+
+def _build_rule_index(schema: Mapping[str, Any]) -> RuleIndex:
+    with metrics.timer("ownership.parse", tags={"format": "schema"}):
+        return RuleIndex([Rule.load(r) for r in schema["rules"]])
+
+
+def _codeowners_anchor(pattern: str) -> Optional[Tuple[str, str]]:
+    """
+    Returns ``(kind, key)`` for the most selective literal of a CODEOWNERS
+    pattern, where kind is ``exact``, ``prefix`` or ``suffix``: every path the
+    pattern matches has a component that is equal to, starts or ends with
+    ``key``. Returns ``None`` if there is no such literal.
+
+    This walks the pattern the same way ``_path_to_regex`` does. The regex
+    only matches slashes where the pattern has them, and the start and end of
+    the regex are always at a component boundary, so every part of the
+    pattern between slashes matches a full component of the path. The only
+    exception is ``**``, which matches across slashes.
+    """
+    if pattern[0] == "\\":
+        return None
+
+    slash_pos = pattern.find("/")
+    anchored = slash_pos > -1 and slash_pos != len(pattern) - 1
+    pattern = pattern.rstrip("/")
+    if anchored and pattern[:1] == "/":
+        pattern = pattern[1:]
+
+    # The parts of the pattern between slashes as ``[left bounded, text,
+    # right bounded]``, where text contains ``*`` and ``?`` wildcards.
+    parts = [[True, "", True]]
+    chars = enumerate(pattern)
+    for i, ch in chars:
+        if ch == "/":
+            parts.append([True, "", True])
+        elif ch == "*" and pattern[i + 1 : i + 2] == "*":
+            left_bounded = i == 0 or pattern[i - 1] == "/"
+            right_bounded = i + 2 == len(pattern) or pattern[i + 2] == "/"
+            if left_bounded and right_bounded:
+                # ``**`` matches anything, including the slash after it.
+                parts[-1][2] = False
+                parts.append([False, "", True])
+                next(chars, None)
+                next(chars, None)
+            else:
+                parts[-1][1] += "*"
+        else:
+            parts[-1][1] += ch
+
+    anchors = []
+    for left_bounded, text, right_bounded in parts:
+        wildcards = [i for i, ch in enumerate(text) if ch in "*?"]
+        if not wildcards and left_bounded and right_bounded:
+            if text:
+                anchors.append((2, len(text), ("exact", text)))
+            continue
+        prefix = text[: wildcards[0]] if wildcards else text
+        suffix = text[wildcards[-1] + 1 :] if wildcards else text
+        if prefix and left_bounded:
+            anchors.append((1, len(prefix), ("prefix", prefix)))
+        if suffix and right_bounded:
+            anchors.append((1, len(suffix), ("suffix", suffix)))
+
+    if not anchors:
+        return None
+    return max(anchors, key=lambda anchor: anchor[:2])[2]
+
+
+def _frame_values(frames: Sequence[Mapping[str, Any]], keys: Sequence[str]) -> Sequence[Any]:
+    """The distinct values the matchers of ``test_frames`` look at."""
+    values = {}
+    for frame in (f for f in frames if isinstance(f, Mapping)):
+        for key in keys:
+            value = frame.get(key)
+            if value:
+                values[value] = True
+    return list(values)
+
+
+class RuleIndex:
+    """
+    Finds all rules of a schema that match an event at once, and returns
+    the same rules as testing every rule on its own.
+
+    Frame paths and modules are extracted from the event once instead of once
+    per rule, and each path is only checked against the CODEOWNERS rules that
+    have a literal component (see ``_codeowners_anchor``) the path contains.
+    Other rules are still tested one by one.
+    """
+
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        # Indexes are shared between callers, see ``load_rule_index``.
+        self.rules = tuple(_freeze_rule(rule) for rule in rules)
+        self._path_rules: List[int] = []
+        self._module_rules: List[int] = []
+        # positions of rules that are tested with ``Rule.test``
+        self._other_rules: List[int] = []
+        self._codeowners_patterns: MutableMapping[int, Pattern[str]] = {}
+        # positions of CODEOWNERS rules that are checked against every path
+        self._unindexed: List[int] = []
+        exact: MutableMapping[str, List[int]] = defaultdict(list)
+        prefixes: MutableMapping[int, MutableMapping[str, List[int]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        suffixes: MutableMapping[int, MutableMapping[str, List[int]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+
+        for position, rule in enumerate(rules):
+            matcher = rule.matcher
+            if matcher.type == PATH:
+                self._path_rules.append(position)
+            elif matcher.type == MODULE:
+                self._module_rules.append(position)
+            elif matcher.type == CODEOWNERS:
+                try:
+                    self._codeowners_patterns[position] = _path_to_regex(matcher.pattern)
+                    anchor = _codeowners_anchor(matcher.pattern)
+                except Exception:
+                    # Invalid patterns fail the same way they did before.
+                    self._other_rules.append(position)
+                    continue
+
+                if anchor is None:
+                    self._unindexed.append(position)
+                    continue
+
+                kind, key = anchor
+                if kind == "exact":
+                    exact[key].append(position)
+                elif kind == "prefix":
+                    prefixes[len(key)][key].append(position)
+                else:
+                    suffixes[len(key)][key].append(position)
+            else:
+                self._other_rules.append(position)
+
+        self._exact = dict(exact)
+        self._prefixes = [(length, dict(table)) for length, table in prefixes.items()]
+        self._suffixes = [(length, dict(table)) for length, table in suffixes.items()]
+
+    def get_codeowners_candidates(self, value: Any) -> Iterable[int]:
+        """
+        Returns the positions of the CODEOWNERS rules that can match a path.
+        """
+        if not isinstance(value, str):
+            return self._codeowners_patterns.keys()
+
+        candidates = set(self._unindexed)
+        for component in value.split("/"):
+            candidates.update(self._exact.get(component, ()))
+            for length, table in self._prefixes:
+                candidates.update(table.get(component[:length], ()))
+            for length, table in self._suffixes:
+                candidates.update(table.get(component[-length:], ()))
+        return candidates
+
+    def get_matching_rules(self, data: PathSearchable) -> Sequence[Rule]:
+        """Returns the rules matching the event ``data`` in schema order."""
+        matches = {position for position in self._other_rules if self.rules[position].test(data)}
+
+        if self._path_rules or self._codeowners_patterns:
+            values = _frame_values(*Matcher.munge_if_needed(data))
+            for position in self._path_rules:
+                pattern = self.rules[position].matcher.pattern
+                if any(
+                    glob_match(value, pattern, ignorecase=True, path_normalize=True)
+                    for value in values
+                ):
+                    matches.add(position)
+
+            for value in values:
+                for position in self.get_codeowners_candidates(value):
+                    if position not in matches and self._codeowners_patterns[position].search(
+                        value
+                    ):
+                        matches.add(position)
+
+        if self._module_rules:
+            values = _frame_values(find_stack_frames(data), ["module"])
+            for position in self._module_rules:
+                pattern = self.rules[position].matcher.pattern
+                if any(
+                    glob_match(value, pattern, ignorecase=True, path_normalize=True)
+                    for value in values
+                ):
+                    matches.add(position)
+
+        return [
+            Rule(self.rules[position].matcher, list(self.rules[position].owners))
+            for position in sorted(matches)
+        ]
+
+
 def convert_schema_to_rules_text(schema: Mapping[str, Any]) -> str:
     rules = load_schema(schema)
     text = ""
@@ -4,6 +4,7 @@ import sentry_sdk
 
 from sentry.constants import DataCategory
 from sentry.quotas.base import NotRateLimited, Quota, QuotaConfig, QuotaScope, RateLimited
+from sentry.ratelimits.leases import Counter, LeasedCounters, get_lease_size
 from sentry.utils.redis import (
     get_dynamic_cluster_from_options,
     load_script,
@@ -24,6 +25,11 @@ class RedisQuota(Quota):
             "SENTRY_QUOTA_OPTIONS", options
         )
 
+        # Maps quota ids to the fraction of the limit a process may lease at
+        # once in ``is_rate_limited``, see ``sentry.ratelimits.leases``.
+        self.leases = options.get("leases", {})
+        self.leased_counters = LeasedCounters()
+
         # Based on the `is_redis_cluster` flag, self.cluster is set two one of
         # the following two objects:
         #  - false: `cluster` is a `RBCluster`. Call `get_local_client_for_key`
@@ -211,6 +217,7 @@ class RedisQuota(Quota):
 
         keys = []
         args = []
+        counters = []
         for quota in quotas:
             if quota.limit == 0:
                 # A zero-sized quota is the absolute worst-case. Do not call
@@ -232,12 +239,26 @@ class RedisQuota(Quota):
             # limit=None is represented as limit=-1 in lua
             lua_quota = quota.limit if quota.limit is not None else -1
             args.extend((lua_quota, int(expiry)))
+            counters.append(
+                Counter(
+                    name=f"{key.rsplit(':', 1)[0]}:{quota.window}",
+                    key=key,
+                    refund_key=return_key,
+                    limit=lua_quota,
+                    lease_size=get_lease_size(quota.limit, self.leases.get(quota.id)),
+                    ttl=int(expiry - timestamp),
+                )
+            )
 
         if not keys or not args:
             return NotRateLimited()
 
         client = self.__get_redis_client(str(project.organization_id))
-        rejections = is_rate_limited(client, keys, args)
+        if any(counter.lease_size > 1 for counter in counters):
+            # All keys share the organization as hash tag.
+            rejections, _ = self.leased_counters.take(client, counters)
+        else:
+            rejections = is_rate_limited(client, keys, args)
 
         if not any(rejections):
             return NotRateLimited()
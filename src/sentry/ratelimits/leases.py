@@ -0,0 +1,148 @@
+"""
+Process-local leases of rate limit counters.
+
+Counting every request in Redis costs a round trip per request. Instead, a
+process can lease a slice of a limit by incrementing the counter of the current
+window by the size of the slice at once, and then spend the leased tokens
+locally. Leases never exceed the remaining limit, so limits are still enforced
+across all processes. In turn, tokens that are leased but not yet spent by one
+process can't be used by others, so up to ``lease_size - 1`` requests per
+process may be rejected although the limit is not reached yet. The lease size
+therefore bounds the accuracy of a limit, and is configured per limit as a
+fraction of it.
+
+When the window of a counter rolls over, the tokens left over from the previous
+window are returned to its counter, so that counters reflect the actual usage
+once the window is over.
+"""
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from sentry.utils import redis
+
+lease_tokens = redis.load_script("ratelimits/leases.lua")
+
+# Upper bound of the number of counters a process holds leases of. Tokens of
+# evicted leases are not returned.
+MAX_LEASES = 10000
+
+
+def get_lease_size(limit: Optional[int], fraction: Optional[float]) -> int:
+    """
+    Returns the number of tokens leased at once for a limit, given the fraction
+    of the limit a single process may hold back.
+    """
+    if limit is None or not fraction:
+        return 1
+    return max(1, int(limit * fraction))
+
+
+class Counter(NamedTuple):
+    # Identifies the counter independent of the window, e.g. the key of the
+    # counter without the window.
+    name: str
+    # The key of the counter in the current window.
+    key: str
+    # The key of a counter that is subtracted from the counter, if any.
+    refund_key: Optional[str]
+    # -1 means "no limit".
+    limit: int
+    lease_size: int
+    # Seconds until the counter of the current window expires.
+    ttl: int
+
+
+class _Lease:
+    __slots__ = ("key", "tokens", "value")
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        # Unused tokens of this process.
+        self.tokens = 0
+        # The value of the counter after the last lease.
+        self.value = 0
+
+
+class LeasedCounters:
+    def __init__(self, max_leases: int = MAX_LEASES) -> None:
+        self.max_leases = max_leases
+        self._leases: "OrderedDict[str, _Lease]" = OrderedDict()
+        self._lock = Lock()
+        self._pid = os.getpid()
+
+    def _call(self, client, counters: Sequence[Counter], amounts: Sequence[int]):
+        keys = []
+        args = []
+        for counter, amount in zip(counters, amounts):
+            keys.append(counter.key)
+            if counter.refund_key is not None:
+                keys.append(counter.refund_key)
+            args.extend(
+                (counter.limit, amount, counter.ttl, 1 if counter.refund_key is not None else 0)
+            )
+        return lease_tokens(client, keys, args)
+
+    def take(self, client, counters: Sequence[Counter]) -> Tuple[List[bool], List[int]]:
+        """
+        Takes a token of every counter, leasing tokens for the counters this
+        process has no tokens of. If any counter has no tokens left, no token
+        is taken at all.
+
+        Returns whether every counter rejected the request (has no tokens
+        left), and the approximate value of every counter. All counters must
+        be stored on the same node.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # Leases are not shared with forked processes.
+                self._leases.clear()
+                self._pid = os.getpid()
+
+            missing = []
+            expired = []
+            for counter in counters:
+                lease = self._leases.get(counter.name)
+                if lease is not None and lease.key != counter.key:
+                    # The window rolled over.
+                    del self._leases[counter.name]
+                    if lease.tokens:
+                        expired.append((counter._replace(key=lease.key), lease.tokens))
+                    lease = None
+                if lease is None or not lease.tokens:
+                    missing.append(counter)
+
+        for counter, tokens in expired:
+            # The counters of previous windows may be stored on other nodes.
+            self._call(client, [counter._replace(refund_key=None)], [-tokens])
+
+        results = []
+        if missing:
+            results = self._call(client, missing, [counter.lease_size for counter in missing])
+
+        with self._lock:
+            for counter, (amount, value) in zip(missing, results):
+                lease = self._leases.get(counter.name)
+                if lease is None or lease.key != counter.key:
+                    lease = self._leases[counter.name] = _Lease(counter.key)
+                lease.tokens += int(amount)
+                lease.value = int(value)
+
+            leases = []
+            for counter in counters:
+                lease = self._leases.get(counter.name)
+                if lease is None or lease.key != counter.key:
+                    lease = self._leases[counter.name] = _Lease(counter.key)
+                self._leases.move_to_end(counter.name)
+                leases.append(lease)
+
+            while len(self._leases) > self.max_leases:
+                self._leases.popitem(last=False)
+
+            rejections = [lease.tokens <= 0 for lease in leases]
+            if not any(rejections):
+                for lease in leases:
+                    lease.tokens -= 1
+
+            return rejections, [lease.value - lease.tokens for lease in leases]
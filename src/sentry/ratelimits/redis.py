@@ -9,6 +9,7 @@ from redis.exceptions import RedisError
 
 from sentry.exceptions import InvalidConfiguration
 from sentry.ratelimits.base import RateLimiter
+from sentry.ratelimits.leases import Counter, LeasedCounters, get_lease_size
 from sentry.utils import redis
 from sentry.utils.hashlib import md5_text
 
@@ -29,9 +30,24 @@ def _bucket_start_time(bucket_number: int, window: int) -> int:
 
 
 class RedisRateLimiter(RateLimiter):
+    """
+    :param leases: Maps prefixes of rate limit keys to the fraction of the limit
+        a process may lease at once, see ``sentry.ratelimits.leases``. The
+        longest matching prefix applies. Limits without a lease are counted in
+        Redis for every request.
+    """
+
     def __init__(self, **options: Any) -> None:
         cluster_key = getattr(settings, "SENTRY_RATE_LIMIT_REDIS_CLUSTER", "default")
         self.client = redis.redis_clusters.get(cluster_key)
+        self.leases = options.get("leases", {})
+        self.leased_counters = LeasedCounters()
+
+    def _get_lease_fraction(self, key: str) -> float | None:
+        prefixes = [prefix for prefix in self.leases if key.startswith(prefix)]
+        if not prefixes:
+            return None
+        return self.leases[max(prefixes, key=len)]
 
     def _construct_redis_key(
         self,
@@ -105,6 +121,24 @@ class RedisRateLimiter(RateLimiter):
         expiration = window - int(request_time % window)
         # Reset Time = next time bucket's start time
         reset_time = _bucket_start_time(_time_bucket(request_time, window) + 1, window)
+
+        lease_size = get_lease_size(limit, self._get_lease_fraction(key))
+        if lease_size > 1:
+            counter = Counter(
+                name=redis_key.rsplit(":", 1)[0] + f":{window}",
+                key=redis_key,
+                refund_key=None,
+                limit=limit,
+                lease_size=lease_size,
+                ttl=expiration,
+            )
+            try:
+                [limited], [value] = self.leased_counters.take(self.client, [counter])
+            except RedisError:
+                logger.exception("Failed to lease rate limit tokens from redis")
+                return False, 0, reset_time
+            return limited, value, reset_time
+
         try:
             result = self.client.incr(redis_key)
             self.client.expire(redis_key, expiration)
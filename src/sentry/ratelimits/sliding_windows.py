@@ -67,6 +67,11 @@ This request is granted the minimum allowed from the two requested, in this case
 Because no quota is exceeded, the request is granted. If one quota summed up to
 100 or 10, respectively, the request would be rejected.
 
+The redis backend implements `check_and_use_quotas` as a Lua script that
+checks and consumes all quotas in a single round trip, which makes it atomic.
+This is only possible when all keys are stored on the same node, on Redis
+Cluster it falls back to `check_within_quotas` followed by `use_quotas`.
+
 When using the quotas, the keys change as follows:
 
     sliding-window-rate-limit:123:3:900 = 1
@@ -78,7 +83,9 @@ When using the quotas, the keys change as follows:
 from collections import defaultdict
 from dataclasses import dataclass
 from time import time
-from typing import Any, Iterator, MutableMapping, Optional, Sequence, Tuple
+from typing import Any, Iterator, List, MutableMapping, Optional, Sequence, Tuple, Union
+
+from rediscluster import RedisCluster
 
 from sentry.exceptions import InvalidConfiguration
 from sentry.utils import redis
@@ -170,6 +177,8 @@ class GrantedQuota:
 
 Timestamp = int
 
+check_and_use_quotas_script = redis.load_script("ratelimits/sliding_windows.lua")
+
 
 class SlidingWindowRateLimiter(Service):
     def __init__(self, **options: Any) -> None:
@@ -428,3 +437,44 @@ class RedisSlidingWindowRateLimiter(SlidingWindowRateLimiter):
                 pipeline.expire(key, keys_ttl[key])
 
             pipeline.execute()
+
+    def check_and_use_quotas(
+        self, requests: Sequence[RequestedQuota], timestamp: Optional[Timestamp] = None
+    ) -> Sequence[GrantedQuota]:
+        if isinstance(self.client, RedisCluster):
+            # The keys of a window are spread over the nodes of the cluster, so
+            # they can't be accessed by a single script.
+            return super().check_and_use_quotas(requests, timestamp)
+
+        if not requests:
+            return []
+
+        if timestamp is None:
+            timestamp = int(time())
+        else:
+            timestamp = int(timestamp)
+
+        keys: MutableMapping[str, int] = {}
+        arguments: List[Union[int, str]] = []
+        for request in requests:
+            assert request.quotas
+
+            arguments.extend([request.requested, len(request.quotas)])
+            for quota in request.quotas:
+                granules = list(quota.iter_window(timestamp))
+                arguments.extend([quota.limit, quota.window_seconds, len(granules)])
+                for granule in granules:
+                    key = self._build_redis_key(request=request, quota=quota, granule=granule)
+                    # Positions of keys are 1-based in Lua.
+                    arguments.append(keys.setdefault(key, len(keys) + 1))
+
+        results = check_and_use_quotas_script(self.client, list(keys), arguments)
+
+        return [
+            GrantedQuota(
+                prefix=request.prefix,
+                granted=int(granted),
+                reached_quotas=[request.quotas[int(position) - 1] for position in reached],
+            )
+            for request, (granted, *reached) in zip(requests, results)
+        ]
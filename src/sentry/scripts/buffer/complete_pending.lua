@@ -0,0 +1,44 @@
+-- Remove the values of a buffer key that have been applied by a flusher.
+--
+-- The flusher has to still hold the lock of the key, otherwise the lock
+-- expired and another flusher may be working on the key already. Increments
+-- that arrived after the flusher read the key must not be lost, so the
+-- applied counters are subtracted instead of deleting the key outright. The
+-- key is only deleted (and removed from the pending set) if no counters are
+-- left, otherwise it stays pending for the remaining increments.
+--
+--   KEYS = {key, pending_key, lock_key}
+--   ARGV = {lock_token, field, applied_amount, ...} for every applied counter
+--
+-- Returns 1 if the key has been removed, 0 if it is still pending, and -1 if
+-- the lock is not held by the flusher anymore. The lock is released unless
+-- it is held by someone else.
+local key = KEYS[1]
+local pending_key = KEYS[2]
+local lock_key = KEYS[3]
+
+if redis.call('GET', lock_key) ~= ARGV[1] then
+    return -1
+end
+redis.call('DEL', lock_key)
+
+-- The key is gone if there was nothing to apply, there is nothing to keep.
+if redis.call('EXISTS', key) == 0 then
+    redis.call('ZREM', pending_key, key)
+    return 1
+end
+
+for i = 2, #ARGV, 2 do
+    redis.call('HINCRBY', key, ARGV[i], -tonumber(ARGV[i + 1]))
+end
+
+local values = redis.call('HGETALL', key)
+for i = 1, #values, 2 do
+    if string.sub(values[i], 1, 2) == 'i+' and tonumber(values[i + 1]) ~= 0 then
+        return 0
+    end
+end
+
+redis.call('DEL', key)
+redis.call('ZREM', pending_key, key)
+return 1
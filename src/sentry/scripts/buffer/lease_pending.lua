@@ -0,0 +1,31 @@
+-- Lease a batch of keys from a pending buffer set so they can be handed to a
+-- flusher. Keys are scored by the time they were last incremented, keys with a
+-- score in the future are currently leased by another flusher.
+--
+-- Leasing a key does not remove it from the set, it bumps its score to the
+-- lease expiry instead. The key is removed once its buffered values have been
+-- applied, and if the flusher never gets to it the key becomes available to
+-- be leased again after the lease expired.
+--
+--   KEYS = {pending_key}
+--   ARGV = {now, lease_expiry, limit}
+--
+-- Returns the score of the oldest key that was not leased before this call
+-- (or false if there is none), followed by the leased keys.
+local pending_key = KEYS[1]
+local now = tonumber(ARGV[1])
+local lease_expiry = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+local oldest = redis.call('ZRANGEBYSCORE', pending_key, '-inf', now, 'WITHSCORES', 'LIMIT', 0, 1)
+local keys = redis.call('ZRANGEBYSCORE', pending_key, '-inf', now, 'LIMIT', 0, limit)
+
+for i = 1, #keys do
+    redis.call('ZADD', pending_key, lease_expiry, keys[i])
+end
+
+local result = {oldest[2] or false}
+for i = 1, #keys do
+    result[i + 1] = keys[i]
+end
+return result
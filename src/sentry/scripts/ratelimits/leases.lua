@@ -0,0 +1,54 @@
+-- Leases tokens of rate limit counters to a process, see
+-- ``sentry.ratelimits.leases``.
+--
+-- Input:
+-- keys:
+--  for every counter: the key of the counter, followed by the key of its
+--  refund counter if it has one
+-- args:
+--  for every counter: limit (-1 means "no limit"), amount, ttl, whether the
+--  counter has a refund key (0 or 1)
+--
+-- A positive amount leases up to that many tokens, but never more than the
+-- remaining limit of the counter. A negative amount returns unused tokens to
+-- the counter, unless it has expired already.
+--
+-- Output:
+-- for every counter: {amount leased or returned, value of the counter}
+local results = {}
+local cursor = 1
+for i = 1, #ARGV, 4 do
+    local limit = tonumber(ARGV[i])
+    local amount = tonumber(ARGV[i + 1])
+    local ttl = tonumber(ARGV[i + 2])
+    local key = KEYS[cursor]
+
+    local refunded = 0
+    if ARGV[i + 3] == "1" then
+        refunded = tonumber(redis.call("GET", KEYS[cursor + 1]) or 0)
+        cursor = cursor + 2
+    else
+        cursor = cursor + 1
+    end
+
+    local value = tonumber(redis.call("GET", key) or 0) - refunded
+    if amount < 0 then
+        if redis.call("EXISTS", key) == 1 then
+            value = redis.call("DECRBY", key, -amount) - refunded
+        else
+            amount = 0
+        end
+    else
+        if limit >= 0 then
+            amount = math.max(0, math.min(amount, limit - value))
+        end
+        if amount > 0 then
+            value = redis.call("INCRBY", key, amount) - refunded
+            redis.call("EXPIRE", key, ttl)
+        end
+    end
+
+    results[#results + 1] = {amount, value}
+end
+
+return results
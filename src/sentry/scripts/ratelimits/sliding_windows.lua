@@ -0,0 +1,77 @@
+-- Checks and consumes the quotas of the sliding window rate limiter in a single
+-- call, so that no other client can use a quota between the check and the use.
+--
+-- Input:
+-- keys:
+--  all granule keys of all quotas, without duplicates
+-- args:
+--  for every request:
+--   requested, number of quotas
+--   then for every quota of the request:
+--    limit, window_seconds, number of granules
+--    then for every granule (newest first): the position of its key in KEYS
+--
+-- Output:
+-- for every request: {granted, positions of the reached quotas (1-based)...}
+--
+-- Quotas are checked in order, a quota is reached if it allows less than the
+-- amount that is granted by the quotas before it. The granted amount is added
+-- to the newest granule of every quota before the next request is checked.
+
+-- Amount used per granule key, read at most once per key
+local used = {}
+
+local function get_used(position)
+    local value = used[position]
+    if value == nil then
+        value = tonumber(redis.call("GET", KEYS[position]) or 0)
+        used[position] = value
+    end
+    return value
+end
+
+local cursor = 1
+local function next_argument()
+    local value = tonumber(ARGV[cursor])
+    cursor = cursor + 1
+    return value
+end
+
+local results = {}
+while ARGV[cursor] ~= nil do
+    local granted = next_argument()
+    local quotas = {}
+    local result = {0}
+
+    for i = 1, next_argument() do
+        local limit = next_argument()
+        local window_seconds = next_argument()
+        local granules = {}
+        local total = 0
+        for j = 1, next_argument() do
+            granules[j] = next_argument()
+            total = total + get_used(granules[j])
+        end
+        quotas[i] = {granules[1], window_seconds}
+
+        local remaining = math.max(0, limit - total)
+        if remaining < granted then
+            granted = remaining
+            table.insert(result, i)
+        end
+    end
+
+    if granted > 0 then
+        for i, quota in ipairs(quotas) do
+            local position, window_seconds = unpack(quota)
+            used[position] = redis.call("INCRBY", KEYS[position], granted)
+            -- Expire the key in `window_seconds`, see `use_quotas`.
+            redis.call("EXPIRE", KEYS[position], window_seconds)
+        end
+    end
+
+    result[1] = granted
+    table.insert(results, result)
+end
+
+return results
@@ -607,40 +607,74 @@ end
 
 -- Command Parsing
 
+local function signature_argument_parser(configuration)
+    return object_argument_parser({
+        {"index", argument_parser(validate_value)},
+        {"frequencies", frequencies_argument_parser(configuration)},
+    })
+end
+
+local function classify_parameter_argument_parser(configuration)
+    return object_argument_parser({
+        {"index", argument_parser(validate_value)},
+        {"threshold", argument_parser(validate_integer)},
+        {"frequencies", frequencies_argument_parser(configuration)},
+    })
+end
+
+local function with_timestamp(configuration, timestamp)
+    -- Batched commands share the configuration, except for the timestamp
+    -- which is provided for every request.
+    return setmetatable({timestamp = timestamp}, {__index = configuration})
+end
+
+local function record(configuration, key, signatures)
+    return table_imap(
+        signatures,
+        function (signature)
+            set_frequencies(configuration, signature.index, key, signature.frequencies)
+            for band, buckets in ipairs(signature.frequencies) do
+                for bucket in pairs(buckets) do
+                    get_bucket_membership_set(configuration, signature.index, band, bucket):add(key)
+                end
+            end
+        end
+    )
+end
+
 local commands = {
     RECORD = function (configuration, cursor, arguments)
         local cursor, key, signatures = multiple_argument_parser(
             argument_parser(validate_value),
-            variadic_argument_parser(
-                object_argument_parser({
-                    {"index", argument_parser(validate_value)},
-                    {"frequencies", frequencies_argument_parser(configuration)},
-                })
-            )
+            variadic_argument_parser(signature_argument_parser(configuration))
+        )(cursor, arguments)
+
+        return record(configuration, key, signatures)
+    end,
+    RECORDMANY = function (configuration, cursor, arguments)
+        local cursor, requests = variadic_argument_parser(
+            object_argument_parser({
+                {"timestamp", argument_parser(validate_number)},
+                {"key", argument_parser(validate_value)},
+                {"signatures", repeated_argument_parser(signature_argument_parser(configuration))},
+            })
         )(cursor, arguments)
 
         return table_imap(
-            signatures,
-            function (signature)
-                set_frequencies(configuration, signature.index, key, signature.frequencies)
-                for band, buckets in ipairs(signature.frequencies) do
-                    for bucket in pairs(buckets) do
-                        get_bucket_membership_set(configuration, signature.index, band, bucket):add(key)
-                    end
-                end
+            requests,
+            function (request)
+                return record(
+                    with_timestamp(configuration, request.timestamp),
+                    request.key,
+                    request.signatures
+                )
             end
         )
     end,
     CLASSIFY = function (configuration, cursor, arguments)
         local cursor, limit, parameters = multiple_argument_parser(
             argument_parser(validate_integer),
-            variadic_argument_parser(
-                object_argument_parser({
-                    {"index", argument_parser(validate_value)},
-                    {"threshold", argument_parser(validate_integer)},
-                    {"frequencies", frequencies_argument_parser(configuration)},
-                })
-            )
+            variadic_argument_parser(classify_parameter_argument_parser(configuration))
         )(cursor, arguments)
 
         return search(
@@ -649,6 +683,26 @@ local commands = {
             limit
         )
     end,
+    CLASSIFYMANY = function (configuration, cursor, arguments)
+        local cursor, requests = variadic_argument_parser(
+            object_argument_parser({
+                {"timestamp", argument_parser(validate_number)},
+                {"limit", argument_parser(validate_integer)},
+                {"parameters", repeated_argument_parser(classify_parameter_argument_parser(configuration))},
+            })
+        )(cursor, arguments)
+
+        return table_imap(
+            requests,
+            function (request)
+                return search(
+                    with_timestamp(configuration, request.timestamp),
+                    request.parameters,
+                    request.limit
+                )
+            end
+        )
+    end,
     COMPARE = function (configuration, cursor, arguments)
         local cursor, limit, item_key = multiple_argument_parser(
             argument_parser(validate_integer),
@@ -0,0 +1,71 @@
+-- Batched operations on the simple counter hashes used by ``RedisTSDB``. This
+-- allows all counter reads or writes for one host to be performed with a
+-- single command rather than one command per hash field. All keys provided to
+-- a single invocation of this script must be located on the same host.
+--
+-- Since the same hash fields (the model key and environment) are commonly
+-- accessed in many hashes (one per rollup and epoch), the arguments start with
+-- a table of all distinct fields, which are then referred to by their
+-- (1-based) position in that table.
+--
+-- INCR: Increment hash fields and update the expiration time of the hashes.
+--
+--   KEYS = {hash_key, ...}
+--   ARGV = {"INCR", field_count, field, ..., expiry, operation_count, field_index, amount, ...}
+--
+--   Every key in ``KEYS`` has an entry in ``ARGV`` (following the field table)
+--   that consists of the expiration timestamp (or 0 to not set an
+--   expiration), the number of operations for the key and the operations
+--   themselves as pairs of field index and amount. Returns the number of
+--   keys that were updated.
+--
+-- GET: Fetch hash field values.
+--
+--   KEYS = {hash_key, ...}
+--   ARGV = {"GET", field_count, field, ..., value_count, field_index, ...}
+--
+--   Every key in ``KEYS`` has an entry in ``ARGV`` (following the field table)
+--   that consists of the number of fields to fetch from the key and the
+--   indices of these fields. Returns the values of all fields, in the order
+--   that they were requested in. Missing fields are returned as 0.
+
+local command = ARGV[1]
+local field_count = tonumber(ARGV[2])
+local fields = {}
+for i = 1, field_count do
+    fields[i] = ARGV[2 + i]
+end
+
+local cursor = 3 + field_count
+
+if command == 'INCR' then
+    for k = 1, #KEYS do
+        local key = KEYS[k]
+        local expiry = tonumber(ARGV[cursor])
+        local operation_count = tonumber(ARGV[cursor + 1])
+        cursor = cursor + 2
+        for _ = 1, operation_count do
+            redis.call('HINCRBY', key, fields[tonumber(ARGV[cursor])], ARGV[cursor + 1])
+            cursor = cursor + 2
+        end
+        if expiry > 0 then
+            redis.call('EXPIREAT', key, expiry)
+        end
+    end
+    return #KEYS
+elseif command == 'GET' then
+    local results = {}
+    for k = 1, #KEYS do
+        local key = KEYS[k]
+        local value_count = tonumber(ARGV[cursor])
+        cursor = cursor + 1
+        for _ = 1, value_count do
+            local value = redis.call('HGET', key, fields[tonumber(ARGV[cursor])])
+            results[#results + 1] = tonumber(value) or 0
+            cursor = cursor + 1
+        end
+    end
+    return results
+else
+    error(string.format('unknown command: %q', command))
+end
@@ -8,9 +8,21 @@ from dataclasses import replace
 from datetime import datetime, timedelta
 from hashlib import md5
 from heapq import merge
-from typing import Any, Iterable, List, Mapping, Optional, Sequence, Set, Tuple, cast
+from typing import (
+    Any,
+    Iterable,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    cast,
+)
 
 import sentry_sdk
+from django.core.cache import cache
 from django.utils import timezone
 from snuba_sdk import (
     Column,
@@ -333,6 +345,103 @@ class AbstractQueryExecutor(metaclass=ABCMeta):
         return sort_by in self.sort_strategies.keys()
 
 
+class CandidatePlanner:
+    """
+    Decides how the Postgres filters of an issue search are combined with the
+    Snuba query, based on what previous searches with the same filters found:
+
+    * ``prefilter``: the ids of all groups that match the Postgres filters are
+      passed to Snuba, which does the rest of the filtering and sorting.
+    * ``postfilter``: Snuba filters and sorts groups in chunks, and the
+      results are filtered in Postgres until enough groups are found.
+
+    The filters are identified by the SQL of the group queryset, which includes
+    the projects. For each of them, the number of Postgres candidates and the
+    fraction of Snuba results that pass the Postgres filters are cached for
+    ``snuba.search.project-group-count-cache-time`` seconds. This allows
+    skipping the candidate query if it is known to return too many groups, and
+    sizing the first post-filter chunk so that it is likely to yield enough
+    results, instead of growing chunks until the time limit is hit. The
+    candidate count expires on its own, so that searches that skip the
+    candidate query don't keep it alive.
+    """
+
+    PREFILTER = "prefilter"
+    POSTFILTER = "postfilter"
+
+    # Lower bound of the pass rate, to limit the size of the first chunk.
+    MIN_PASS_RATE = 0.001
+
+    def __init__(self, group_queryset: BaseQuerySet, max_candidates: int) -> None:
+        self.max_candidates = max_candidates
+        self.cache_time = options.get("snuba.search.project-group-count-cache-time")
+        self.strategy: Optional[str] = None
+        self.start_time = time.time()
+        try:
+            sql = str(group_queryset.query)
+        except Exception:
+            # Some querysets can't be rendered without a database round trip
+            # (e.g. empty ``IN`` clauses), these are not cached.
+            self.cache_key = None
+            self.estimate: MutableMapping[str, Any] = {}
+        else:
+            self.cache_key = f"search:planner:{md5(sql.encode('utf-8')).hexdigest()}"
+            self.estimate = cache.get(self.cache_key) or {}
+        self._passed = 0
+        self._total = 0
+
+    @property
+    def skip_candidates(self) -> bool:
+        """
+        Whether a previous search found more candidates than can be passed to
+        Snuba, so the candidate query can be skipped.
+        """
+        recorded_at = self.estimate.get("candidates_recorded_at")
+        return (
+            recorded_at is not None
+            and self.start_time - recorded_at < self.cache_time
+            and self.estimate.get("candidates", 0) > self.max_candidates
+        )
+
+    def choose(self, strategy: str) -> None:
+        self.strategy = strategy
+        metrics.incr("snuba.search.planner.strategy", tags={"strategy": strategy})
+        sentry_sdk.set_tag("search.strategy", strategy)
+
+    def initial_chunk_limit(self, limit: int, max_chunk_size: int) -> int:
+        pass_rate = self.estimate.get("pass_rate")
+        if pass_rate is None:
+            return limit
+        return min(max_chunk_size, max(limit, int(limit / max(pass_rate, self.MIN_PASS_RATE))))
+
+    def record_candidates(self, count: int) -> None:
+        self.estimate["candidates"] = count
+        self.estimate["candidates_recorded_at"] = time.time()
+
+    def record_postfilter(self, passed: int, total: int) -> None:
+        self._passed += passed
+        self._total += total
+
+    def finish(self) -> None:
+        if self._total:
+            pass_rate = self._passed / self._total
+            previous = self.estimate.get("pass_rate")
+            # Smooth the pass rate, since it depends on how deep into the
+            # results a search had to go.
+            self.estimate["pass_rate"] = (
+                pass_rate if previous is None else (previous + pass_rate) / 2
+            )
+
+        if self.cache_key is not None and self.estimate:
+            cache.set(self.cache_key, self.estimate, self.cache_time)
+
+        metrics.timing(
+            "snuba.search.planner.duration",
+            time.time() - self.start_time,
+            tags={"strategy": self.strategy or "none"},
+        )
+
+
 def trend_aggregation(start: datetime, end: datetime) -> Sequence[str]:
     middle_date = start + timedelta(seconds=(end - start).total_seconds() * 0.5)
     middle = datetime.strftime(middle_date, DateArg.date_format)
@@ -472,18 +581,35 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
         # clause.
         max_candidates = options.get("snuba.search.max-pre-snuba-candidates")
 
-        with sentry_sdk.start_span(op="snuba_group_query") as span:
-            group_ids = list(
-                group_queryset.using_replica().values_list("id", flat=True)[: max_candidates + 1]
-            )
-            span.set_data("Max Candidates", max_candidates)
-            span.set_data("Result Size", len(group_ids))
-        metrics.timing("snuba.search.num_candidates", len(group_ids))
+        planner = None
+        if options.get("snuba.search.pre-snuba-candidates-optimizer"):
+            planner = CandidatePlanner(group_queryset, max_candidates)
 
         too_many_candidates = False
-        if not group_ids:
+        if planner is not None and planner.skip_candidates:
+            # A previous search with the same filters had too many candidates,
+            # don't fetch them again.
+            metrics.incr("snuba.search.planner.skip_candidates", skip_internal=False)
+            too_many_candidates = True
+            group_ids = []
+        else:
+            with sentry_sdk.start_span(op="snuba_group_query") as span:
+                group_ids = list(
+                    group_queryset.using_replica().values_list("id", flat=True)[
+                        : max_candidates + 1
+                    ]
+                )
+                span.set_data("Max Candidates", max_candidates)
+                span.set_data("Result Size", len(group_ids))
+            metrics.timing("snuba.search.num_candidates", len(group_ids))
+            if planner is not None:
+                planner.record_candidates(len(group_ids))
+
+        if not group_ids and not too_many_candidates:
             # no matches could possibly be found from this point on
             metrics.incr("snuba.search.no_candidates", skip_internal=False)
+            if planner is not None:
+                planner.finish()
             return self.empty_result
         elif len(group_ids) > max_candidates:
             # If the pre-filter query didn't include anything to significantly
@@ -502,6 +628,12 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
         chunk_growth = options.get("snuba.search.chunk-growth-rate")
         max_chunk_size = options.get("snuba.search.max-chunk-size")
         chunk_limit = limit
+        if planner is not None:
+            if too_many_candidates:
+                planner.choose(CandidatePlanner.POSTFILTER)
+                chunk_limit = planner.initial_chunk_limit(limit, max_chunk_size)
+            else:
+                planner.choose(CandidatePlanner.PREFILTER)
         offset = 0
         num_chunks = 0
         hits = self.calculate_hits(
@@ -522,6 +654,8 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
             end,
         )
         if count_hits and hits == 0:
+            if planner is not None:
+                planner.finish()
             return self.empty_result
 
         paginator_results = self.empty_result
@@ -581,9 +715,13 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
             else:
                 # pre-filtered candidates were *not* passed down to Snuba,
                 # so we need to do post-filtering to verify Sentry DB predicates
-                filtered_group_ids = group_queryset.filter(
-                    id__in=[gid for gid, _ in snuba_groups]
-                ).values_list("id", flat=True)
+                filtered_group_ids = list(
+                    group_queryset.filter(id__in=[gid for gid, _ in snuba_groups]).values_list(
+                        "id", flat=True
+                    )
+                )
+                if planner is not None:
+                    planner.record_postfilter(len(filtered_group_ids), len(snuba_groups))
 
                 group_to_score = dict(snuba_groups)
                 for group_id in filtered_group_ids:
@@ -631,6 +769,8 @@ class PostgresSnubaQueryExecutor(AbstractQueryExecutor):
             paginator_results.prev.has_results = True
 
         metrics.timing("snuba.search.num_chunks", num_chunks)
+        if planner is not None:
+            planner.finish()
 
         groups = Group.objects.in_bulk(paginator_results.results)
         paginator_results.results = [groups[k] for k in paginator_results.results if k in groups]
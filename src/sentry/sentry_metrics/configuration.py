@@ -143,7 +143,9 @@ def get_ingest_config(
     return _METRICS_INGEST_CONFIG_BY_USE_CASE[(use_case_key, db_backend)]
 
 
-def initialize_sentry_and_global_consumer_state(config: MetricsIngestConfiguration) -> None:
+def initialize_sentry_and_global_consumer_state(
+    config: MetricsIngestConfiguration, shared_cache_name: Optional[str] = None
+) -> None:
     """
     Initialization function for subprocesses spawned by the parallel indexer.
 
@@ -155,11 +157,19 @@ def initialize_sentry_and_global_consumer_state(config: MetricsIngestConfigurati
     an object like
     `functools.partial(initialize_sentry_and_global_consumer_state, config)` is
     pickleable as well (which we pass as initialization callback to arroyo).
+
+    The subprocesses do not inherit any memory of the consumer, so the shared
+    indexer cache created by the consumer is attached by ``shared_cache_name``.
     """
     from sentry.runner import configure
 
     configure()
 
+    if shared_cache_name is not None:
+        from sentry.sentry_metrics.indexer.shared_cache import attach_shared_cache
+
+        attach_shared_cache(shared_cache_name)
+
     initialize_global_consumer_state(config)
 
 
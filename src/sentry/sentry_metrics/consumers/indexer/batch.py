@@ -1,6 +1,7 @@
 import logging
 import random
 from collections import defaultdict
+from sys import intern
 from typing import (
     Any,
     List,
@@ -10,6 +11,7 @@ from typing import (
     Optional,
     Sequence,
     Set,
+    Tuple,
     TypedDict,
     cast,
 )
@@ -23,7 +25,7 @@ from django.conf import settings
 from sentry.sentry_metrics.configuration import UseCaseKey
 from sentry.sentry_metrics.consumers.indexer.common import MessageBatch
 from sentry.sentry_metrics.indexer.base import Metadata
-from sentry.utils import json, metrics
+from sentry.utils import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -72,6 +74,25 @@ class InboundMessage(TypedDict):
     tags: Mapping[str, str]
 
 
+def _intern_strings(payload: Any) -> None:
+    """
+    Interns the metric name and tags of a parsed payload. The same few tag
+    keys, values and metric names repeat across all messages of a batch, so
+    this keeps only one copy of each string around and lets the set and dict
+    lookups during string extraction and reconstruction compare by identity.
+    """
+    if not isinstance(payload, dict):
+        return
+
+    name = payload.get("name")
+    if type(name) is str:
+        payload["name"] = intern(name)
+
+    tags = payload.get("tags")
+    if type(tags) is dict:
+        payload["tags"] = {intern(k): intern(v) if type(v) is str else v for k, v in tags.items()}
+
+
 class IndexerBatch:
     def __init__(
         self,
@@ -90,10 +111,14 @@ class IndexerBatch:
         self.skipped_offsets: Set[PartitionIdxOffset] = set()
         self.parsed_payloads_by_offset: MutableMapping[PartitionIdxOffset, InboundMessage] = {}
 
+        # ``rapidjson`` is called directly, ``json.loads`` would start a span
+        # for every message of the batch.
+        loads = rapidjson.loads
         for msg in self.outer_message.payload:
             partition_offset = PartitionIdxOffset(msg.partition.index, msg.offset)
             try:
-                parsed_payload = json.loads(msg.payload.value.decode("utf-8"), use_rapid_json=True)
+                parsed_payload = loads(msg.payload.value.decode("utf-8"))
+                _intern_strings(parsed_payload)
                 self.parsed_payloads_by_offset[partition_offset] = parsed_payload
             except rapidjson.JSONDecodeError:
                 self.skipped_offsets.add(partition_offset)
@@ -131,10 +156,12 @@ class IndexerBatch:
 
     @metrics.wraps("process_messages.extract_strings")
     def extract_strings(self) -> Mapping[int, Set[str]]:
-        org_strings = defaultdict(set)
+        org_strings: MutableMapping[int, Set[str]] = defaultdict(set)
+        should_index_tag_values = self.__should_index_tag_values
+        skipped_offsets = self.skipped_offsets
 
         for partition_offset, message in self.parsed_payloads_by_offset.items():
-            if partition_offset in self.skipped_offsets:
+            if partition_offset in skipped_offsets:
                 continue
 
             partition_idx, offset = partition_offset
@@ -183,19 +210,13 @@ class IndexerBatch:
                 self.skipped_offsets.add(partition_offset)
                 continue
 
-            parsed_strings = {
-                metric_name,
-                *tags.keys(),
-            }
+            strings = org_strings[org_id]
+            strings.add(metric_name)
+            strings.update(tags)
+            if should_index_tag_values:
+                strings.update(tags.values())
 
-            if self.__should_index_tag_values:
-                parsed_strings.update(tags.values())
-
-            org_strings[org_id].update(parsed_strings)
-
-        string_count = 0
-        for org_set in org_strings:
-            string_count += len(org_strings[org_set])
+        string_count = sum(len(strings) for strings in org_strings.values())
         metrics.gauge("process_messages.lookups_per_batch", value=string_count)
 
         return org_strings
@@ -207,10 +228,14 @@ class IndexerBatch:
         bulk_record_meta: Mapping[int, Mapping[str, Metadata]],
     ) -> List[Message[KafkaPayload]]:
         new_messages: List[Message[KafkaPayload]] = []
+        should_index_tag_values = self.__should_index_tag_values
+        use_case_id = self.use_case_id.value
+        # The fetch type and stringified id of every string, built once per
+        # org instead of once per message that uses the string.
+        mapping_meta_by_org: MutableMapping[int, Mapping[str, Tuple[str, str]]] = {}
 
         for message in self.outer_message.payload:
-            used_tags: Set[str] = set()
-            output_message_meta: Mapping[str, MutableMapping[str, str]] = defaultdict(dict)
+            output_message_meta: MutableMapping[str, MutableMapping[str, str]] = defaultdict(dict)
             partition_offset = PartitionIdxOffset(message.partition.index, message.offset)
             if partition_offset in self.skipped_offsets:
                 logger.info(
@@ -227,15 +252,26 @@ class IndexerBatch:
             org_id = new_payload_value["org_id"]
             sentry_sdk.set_tag("sentry_metrics.organization_id", org_id)
             tags = new_payload_value.get("tags", {})
-            used_tags.add(metric_name)
 
             new_tags: MutableMapping[str, int] = {}
             exceeded_global_quotas = 0
             exceeded_org_quotas = 0
 
             try:
+                org_mapping_meta = mapping_meta_by_org.get(org_id)
+                if org_mapping_meta is None:
+                    org_mapping_meta = mapping_meta_by_org[org_id] = {
+                        string: (metadata.fetch_type.value, str(metadata.id))
+                        for string, metadata in bulk_record_meta[org_id].items()
+                    }
+
+                for string in (metric_name, *tags.keys(), *tags.values()):
+                    meta = org_mapping_meta.get(string)
+                    if meta is not None:
+                        fetch_type, id = meta
+                        output_message_meta[fetch_type][id] = string
+
                 for k, v in tags.items():
-                    used_tags.update({k, v})
                     new_k = mapping[org_id][k]
                     if new_k is None:
                         metadata = bulk_record_meta[org_id].get(k)
@@ -250,7 +286,7 @@ class IndexerBatch:
                         continue
 
                     value_to_write = v
-                    if self.__should_index_tag_values:
+                    if should_index_tag_values:
                         new_v = mapping[org_id][v]
                         if new_v is None:
                             metadata = bulk_record_meta[org_id].get(v)
@@ -292,21 +328,12 @@ class IndexerBatch:
                     )
                 continue
 
-            fetch_types_encountered = set()
-            for tag in used_tags:
-                if tag in bulk_record_meta[org_id]:
-                    metadata = bulk_record_meta[org_id][tag]
-                    fetch_types_encountered.add(metadata.fetch_type)
-                    output_message_meta[metadata.fetch_type.value][str(metadata.id)] = tag
-
-            mapping_header_content = bytes(
-                "".join(sorted(t.value for t in fetch_types_encountered)), "utf-8"
-            )
+            mapping_header_content = bytes("".join(sorted(output_message_meta)), "utf-8")
 
             # When sending tag values as strings, set the version on the payload
             # to 2. This is used by the consumer to determine how to decode the
             # tag values.
-            if not self.__should_index_tag_values:
+            if not should_index_tag_values:
                 new_payload_value["version"] = 2
             new_payload_value["tags"] = new_tags
             new_payload_value["metric_id"] = numeric_metric_id = mapping[org_id][metric_name]
@@ -336,7 +363,7 @@ class IndexerBatch:
 
             new_payload_value["retention_days"] = 90
             new_payload_value["mapping_meta"] = output_message_meta
-            new_payload_value["use_case_id"] = self.use_case_id.value
+            new_payload_value["use_case_id"] = use_case_id
 
             del new_payload_value["name"]
 
@@ -20,6 +20,7 @@ from sentry.sentry_metrics.configuration import (
 from sentry.sentry_metrics.consumers.indexer.common import BatchMessages, MessageBatch, get_config
 from sentry.sentry_metrics.consumers.indexer.multiprocess import SimpleProduceStep
 from sentry.sentry_metrics.consumers.indexer.processing import MessageProcessor
+from sentry.sentry_metrics.indexer.shared_cache import get_shared_cache
 from sentry.utils.batching_kafka_consumer import create_topics
 
 logger = logging.getLogger(__name__)
@@ -114,6 +115,10 @@ class MetricsConsumerStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
         commit: Callable[[Mapping[Partition, Position]], None],
         partitions: Mapping[Partition, int],
     ) -> ProcessingStrategy[KafkaPayload]:
+        # The worker processes attach to the shared indexer cache of this
+        # process by its name.
+        shared_cache = get_shared_cache()
+
         parallel_strategy = ParallelTransformStep(
             MessageProcessor(self.__config).process_messages,
             Unbatcher(
@@ -139,7 +144,9 @@ class MetricsConsumerStrategyFactory(ProcessingStrategyFactory[KafkaPayload]):
             # pull in a bunch of modules that try to read django settings at
             # import time
             initializer=functools.partial(
-                initialize_sentry_and_global_consumer_state, self.__config
+                initialize_sentry_and_global_consumer_state,
+                self.__config,
+                shared_cache.name if shared_cache is not None else None,
             ),
         )
 
@@ -13,6 +13,7 @@ from sentry.sentry_metrics.indexer.base import (
     KeyResults,
     StringIndexer,
 )
+from sentry.sentry_metrics.indexer.shared_cache import SharedStringIndexerCache, get_shared_cache
 from sentry.utils import metrics
 from sentry.utils.hashlib import md5_text
 
@@ -21,6 +22,7 @@ logger = logging.getLogger(__name__)
 _INDEXER_CACHE_METRIC = "sentry_metrics.indexer.memcache"
 # only used to compare to the older version of the PGIndexer
 _INDEXER_CACHE_FETCH_METRIC = "sentry_metrics.indexer.memcache.fetch"
+_INDEXER_SHARED_CACHE_METRIC = "sentry_metrics.indexer.shared_cache"
 
 
 class StringIndexerCache:
@@ -59,10 +61,30 @@ class StringIndexerCache:
 
         return formatted
 
+    @property
+    def shared_cache(self) -> Optional[SharedStringIndexerCache]:
+        return get_shared_cache()
+
+    def make_shared_cache_key(self, key: str, cache_namespace: str) -> str:
+        return f"{self.partition_key}:{cache_namespace}:{key}"
+
     def get(self, key: str, cache_namespace: str) -> int:
+        shared_cache = self.shared_cache
+        if shared_cache is not None:
+            shared_key = self.make_shared_cache_key(key, cache_namespace)
+            shared_result = shared_cache.get(shared_key)
+            metrics.incr(
+                _INDEXER_SHARED_CACHE_METRIC,
+                tags={"cache_hit": str(shared_result is not None).lower()},
+            )
+            if shared_result is not None:
+                return shared_result
+
         result: int = self.cache.get(
             self.make_cache_key(key, cache_namespace), version=self.version
         )
+        if shared_cache is not None and isinstance(result, int):
+            shared_cache.set(shared_key, result)
         return result
 
     def set(self, key: str, value: int, cache_namespace: str) -> None:
@@ -72,9 +94,46 @@ class StringIndexerCache:
             timeout=self.randomized_ttl,
             version=self.version,
         )
+        shared_cache = self.shared_cache
+        if shared_cache is not None:
+            shared_cache.set(self.make_shared_cache_key(key, cache_namespace), value)
 
     def get_many(
         self, keys: Sequence[str], cache_namespace: str
+    ) -> MutableMapping[str, Optional[int]]:
+        shared_cache = self.shared_cache
+        if shared_cache is None:
+            return self._get_many(keys, cache_namespace)
+
+        # Resolve from the node-local shared cache first and only fall through
+        # to the Django cache for the misses.
+        shared_keys = {key: self.make_shared_cache_key(key, cache_namespace) for key in keys}
+        formatted = shared_cache.get_many(shared_keys.values())
+        results: MutableMapping[str, Optional[int]] = {
+            key: formatted[shared_key] for key, shared_key in shared_keys.items()
+        }
+        missing = [key for key, value in results.items() if value is None]
+        metrics.incr(
+            _INDEXER_SHARED_CACHE_METRIC,
+            tags={"cache_hit": "true"},
+            amount=len(results) - len(missing),
+        )
+        metrics.incr(_INDEXER_SHARED_CACHE_METRIC, tags={"cache_hit": "false"}, amount=len(missing))
+
+        if missing:
+            cache_results = self._get_many(missing, cache_namespace)
+            shared_cache.set_many(
+                {
+                    shared_keys[key]: value
+                    for key, value in cache_results.items()
+                    if isinstance(value, int)
+                }
+            )
+            results.update(cache_results)
+        return results
+
+    def _get_many(
+        self, keys: Sequence[str], cache_namespace: str
     ) -> MutableMapping[str, Optional[int]]:
         cache_keys = {self.make_cache_key(key, cache_namespace): key for key in keys}
         results: Mapping[str, Optional[int]] = self.cache.get_many(
@@ -87,14 +146,27 @@ class StringIndexerCache:
             self.make_cache_key(k, cache_namespace): v for k, v in key_values.items()
         }
         self.cache.set_many(cache_key_values, timeout=self.randomized_ttl, version=self.version)
+        shared_cache = self.shared_cache
+        if shared_cache is not None:
+            shared_cache.set_many(
+                {self.make_shared_cache_key(k, cache_namespace): v for k, v in key_values.items()}
+            )
 
     def delete(self, key: str, cache_namespace: str) -> None:
         cache_key = self.make_cache_key(key, cache_namespace)
         self.cache.delete(cache_key, version=self.version)
+        shared_cache = self.shared_cache
+        if shared_cache is not None:
+            shared_cache.delete(self.make_shared_cache_key(key, cache_namespace))
 
     def delete_many(self, keys: Sequence[str], cache_namespace: str) -> None:
         cache_keys = [self.make_cache_key(key, cache_namespace) for key in keys]
         self.cache.delete_many(cache_keys, version=self.version)
+        shared_cache = self.shared_cache
+        if shared_cache is not None:
+            shared_cache.delete_many(
+                [self.make_shared_cache_key(key, cache_namespace) for key in keys]
+            )
 
 
 class CachingIndexer(StringIndexer):
@@ -0,0 +1,170 @@
+"""
+A node-local string -> id cache for the indexer that is shared between the
+processes of a consumer.
+
+The table lives in a named shared memory segment. The consumer creates it and
+passes its name to the worker processes, which are spawned and do not inherit
+any memory from it, through the initializer of the worker pool. The workers
+attach to the segment with ``attach_shared_cache`` and then read and write the
+same memory without any IPC. Processes that are not handed a segment create a
+private table, which still saves round trips to the Django cache.
+
+The table is split into buckets of ``BUCKET_SIZE`` fixed-size slots::
+
+    digest (16 bytes) | id (i64) | expires (u32) | checksum (u32)
+
+Strings are identified by a 128 bit digest, so the table never stores the
+strings themselves. Writers do not take locks: every slot carries a CRC32
+checksum, and a slot that is read while another process is writing it fails
+the check and is treated as a miss. Once a bucket is full, the slot that
+expires first is overwritten.
+"""
+import hashlib
+import struct
+import time
+import weakref
+import zlib
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+from typing import Iterable, Mapping, MutableMapping, Optional, Tuple
+
+from django.conf import settings
+
+BUCKET_SIZE = 8
+
+_slot = struct.Struct("<16sqII")
+_slot_data = struct.Struct("<16sqI")
+_bucket = struct.Struct("<" + "16sqII" * BUCKET_SIZE)
+
+
+class SharedStringIndexerCache:
+    """
+    :param slots: Maximum number of strings held by the table, rounded up to
+        a multiple of ``BUCKET_SIZE``.
+    :param ttl: Seconds after which an entry is no longer returned.
+    :param name: Name of an existing table to attach to. Without a name, a new
+        table is created, which is removed when this object is garbage
+        collected or the process exits.
+    """
+
+    def __init__(self, slots: int, ttl: int, name: Optional[str] = None) -> None:
+        self.buckets = max(1, -(-slots // BUCKET_SIZE))
+        self.ttl = ttl
+        size = self.buckets * _bucket.size
+
+        if name is None:
+            self._shm = SharedMemory(create=True, size=size)
+            weakref.finalize(self, self._shm.unlink)
+        else:
+            self._shm = SharedMemory(name=name)
+            if self._shm.size < size:
+                raise ValueError(f"Shared indexer cache {name!r} is smaller than {slots} slots")
+        self._buffer = self._shm.buf
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def slots(self) -> int:
+        return self.buckets * BUCKET_SIZE
+
+    def _locate(self, key: str) -> Tuple[bytes, int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        return digest, int.from_bytes(digest[8:], "little") % self.buckets * _bucket.size
+
+    def _read_bucket(self, offset: int) -> Iterable[Tuple[int, bytes, int, int, bool]]:
+        values = _bucket.unpack_from(self._buffer, offset)
+        for i in range(BUCKET_SIZE):
+            digest, id, expires, checksum = values[i * 4 : i * 4 + 4]
+            valid = zlib.crc32(_slot_data.pack(digest, id, expires)) == checksum
+            yield offset + i * _slot.size, digest, id, expires, valid
+
+    def get(self, key: str) -> Optional[int]:
+        digest, offset = self._locate(key)
+        now = int(time.time())
+        for _, slot_digest, id, expires, valid in self._read_bucket(offset):
+            if valid and slot_digest == digest and expires > now:
+                return id
+        return None
+
+    def get_many(self, keys: Iterable[str]) -> MutableMapping[str, Optional[int]]:
+        return {key: self.get(key) for key in keys}
+
+    def set(self, key: str, id: int) -> None:
+        digest, offset = self._locate(key)
+        now = int(time.time())
+
+        target = None
+        target_expires = None
+        for slot_offset, slot_digest, _, expires, valid in self._read_bucket(offset):
+            if valid and slot_digest == digest:
+                target = slot_offset
+                break
+            if not valid or expires <= now:
+                expires = 0
+            if target is None or expires < target_expires:
+                target, target_expires = slot_offset, expires
+
+        expires = now + self.ttl
+        checksum = zlib.crc32(_slot_data.pack(digest, id, expires))
+        _slot.pack_into(self._buffer, target, digest, id, expires, checksum)
+
+    def set_many(self, key_values: Mapping[str, int]) -> None:
+        for key, id in key_values.items():
+            self.set(key, id)
+
+    def delete(self, key: str) -> None:
+        digest, offset = self._locate(key)
+        for slot_offset, slot_digest, _, _, valid in self._read_bucket(offset):
+            if valid and slot_digest == digest:
+                self._buffer[slot_offset : slot_offset + _slot.size] = bytes(_slot.size)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.delete(key)
+
+    def clear(self) -> None:
+        self._buffer[:] = bytes(len(self._buffer))
+
+
+_shared_cache: Optional[SharedStringIndexerCache] = None
+_shared_cache_lock = Lock()
+
+
+def get_shared_cache() -> Optional[SharedStringIndexerCache]:
+    """
+    Returns the shared cache of this process, or ``None`` if it is disabled.
+    If no table has been attached with ``attach_shared_cache``, a new one is
+    created, whose ``name`` can be passed on to worker processes.
+    """
+    global _shared_cache
+
+    slots = settings.SENTRY_METRICS_INDEXER_SHARED_CACHE_SLOTS
+    if not slots:
+        return None
+
+    if _shared_cache is None or _shared_cache.slots < slots:
+        with _shared_cache_lock:
+            if _shared_cache is None or _shared_cache.slots < slots:
+                _shared_cache = SharedStringIndexerCache(
+                    slots, settings.SENTRY_METRICS_INDEXER_SHARED_CACHE_TTL
+                )
+    return _shared_cache
+
+
+def attach_shared_cache(name: str) -> None:
+    """
+    Makes this process use the table ``name`` created by another process,
+    e.g. the consumer that started this worker, as its shared cache.
+    """
+    global _shared_cache
+
+    slots = settings.SENTRY_METRICS_INDEXER_SHARED_CACHE_SLOTS
+    if not slots:
+        return
+
+    with _shared_cache_lock:
+        _shared_cache = SharedStringIndexerCache(
+            slots, settings.SENTRY_METRICS_INDEXER_SHARED_CACHE_TTL, name=name
+        )
@@ -138,4 +138,5 @@ def _build_dispatcher(methodname):
 
 merge = _build_dispatcher("merge")
 record = _build_dispatcher("record")
+record_multi = _build_dispatcher("record_multi")
 delete = _build_dispatcher("delete")
@@ -6,6 +6,16 @@ class AbstractIndexBackend(metaclass=ABCMeta):
     def classify(self, scope, items, limit=None, timestamp=None):
         pass
 
+    def classify_multi(self, scope, requests, limit=None):
+        """
+        Classifies many sets of items, ``requests`` is a sequence of
+        ``(items, timestamp)``. Returns the results of each request in order.
+        """
+        return [
+            self.classify(scope, items, limit=limit, timestamp=timestamp)
+            for items, timestamp in requests
+        ]
+
     @abstractmethod
     def compare(self, scope, key, items, limit=None, timestamp=None):
         pass
@@ -14,6 +24,14 @@ class AbstractIndexBackend(metaclass=ABCMeta):
     def record(self, scope, key, items, timestamp=None):
         pass
 
+    def record_multi(self, scope, requests):
+        """
+        Records many keys, ``requests`` is a sequence of ``(key, items,
+        timestamp)``.
+        """
+        for key, items, timestamp in requests:
+            self.record(scope, key, items, timestamp=timestamp)
+
     @abstractmethod
     def merge(self, scope, destination, items, timestamp=None):
         pass
@@ -25,6 +25,12 @@ class MetricsWrapper(AbstractIndexBackend):
     def classify(self, *args, **kwargs):
         return self.__instrumented_method_call("classify", *args, **kwargs)
 
+    def record_multi(self, *args, **kwargs):
+        return self.__instrumented_method_call("record_multi", *args, **kwargs)
+
+    def classify_multi(self, *args, **kwargs):
+        return self.__instrumented_method_call("classify_multi", *args, **kwargs)
+
     def compare(self, *args, **kwargs):
         return self.__instrumented_method_call("compare", *args, **kwargs)
 
@@ -32,13 +32,30 @@ class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
         self.candidate_set_limit = candidate_set_limit
 
     def _build_signature_arguments(self, features):
-        if not features:
-            return [0] * self.bands
-
-        arguments = []
-        for bucket in band(self.bands, self.signature_builder(features)):
-            arguments.extend([1, ",".join(str(b) for b in bucket), 1])
-        return arguments
+        return self._build_many_signature_arguments([features])[0]
+
+    def _build_many_signature_arguments(self, feature_sets):
+        """
+        Returns the signature arguments of every feature set. The signatures
+        of all non-empty feature sets are built with a single call to the
+        signature builder.
+        """
+        feature_sets = [list(features) for features in feature_sets]
+        signatures = iter(
+            self.signature_builder.build_many([features for features in feature_sets if features])
+        )
+
+        results = []
+        for features in feature_sets:
+            if not features:
+                results.append([0] * self.bands)
+                continue
+
+            arguments = []
+            for bucket in band(self.bands, next(signatures)):
+                arguments.extend([1, ",".join(str(b) for b in bucket), 1])
+            results.append(arguments)
+        return results
 
     def __index(self, scope, args):
         # scope must be passed into the script call as a key to allow the
@@ -95,6 +112,37 @@ class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
 
         return self._as_search_result(self.__index(scope, arguments))
 
+    def classify_multi(self, scope, requests, limit=None):
+        if not requests:
+            return []
+
+        arguments = [
+            "CLASSIFYMANY",
+            int(time.time()),
+            self.namespace,
+            self.bands,
+            self.interval,
+            self.retention,
+            self.candidate_set_limit,
+            scope,
+        ]
+
+        signature_arguments = iter(
+            self._build_many_signature_arguments(
+                features for items, _ in requests for _, _, features in items
+            )
+        )
+        for items, timestamp in requests:
+            if timestamp is None:
+                timestamp = int(time.time())
+
+            arguments.extend([timestamp, limit if limit is not None else -1, len(items)])
+            for idx, threshold, _ in items:
+                arguments.extend([idx, threshold])
+                arguments.extend(next(signature_arguments))
+
+        return [self._as_search_result(results) for results in self.__index(scope, arguments)]
+
     def compare(self, scope, key, items, limit=None, timestamp=None):
         if timestamp is None:
             timestamp = int(time.time())
@@ -142,6 +190,38 @@ class RedisScriptMinHashIndexBackend(AbstractIndexBackend):
 
         return self.__index(scope, arguments)
 
+    def record_multi(self, scope, requests):
+        requests = [(key, items, timestamp) for key, items, timestamp in requests if items]
+        if not requests:
+            return  # nothing to do
+
+        arguments = [
+            "RECORDMANY",
+            int(time.time()),
+            self.namespace,
+            self.bands,
+            self.interval,
+            self.retention,
+            self.candidate_set_limit,
+            scope,
+        ]
+
+        signature_arguments = iter(
+            self._build_many_signature_arguments(
+                features for _, items, _ in requests for _, features in items
+            )
+        )
+        for key, items, timestamp in requests:
+            if timestamp is None:
+                timestamp = int(time.time())
+
+            arguments.extend([timestamp, key, len(items)])
+            for idx, _ in items:
+                arguments.append(idx)
+                arguments.extend(next(signature_arguments))
+
+        return self.__index(scope, arguments)
+
     def merge(self, scope, destination, items, timestamp=None):
         if timestamp is None:
             timestamp = int(time.time())
@@ -1,5 +1,80 @@
 import mmh3
 
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+# Upper bound of the size of the padded feature matrix hashed at once.
+MAX_BATCH_BYTES = 8 * 1024 * 1024
+
+
+def _rotl32(value, bits):
+    return (value << np.uint32(bits)) | (value >> np.uint32(32 - bits))
+
+
+def _fmix32(h):
+    h ^= h >> np.uint32(16)
+    h *= np.uint32(0x85EBCA6B)
+    h ^= h >> np.uint32(13)
+    h *= np.uint32(0xC2B2AE35)
+    h ^= h >> np.uint32(16)
+    return h
+
+
+def _mix_blocks(blocks):
+    blocks = blocks * np.uint32(0xCC9E2D51)
+    blocks = _rotl32(blocks, 15)
+    return blocks * np.uint32(0x1B873593)
+
+
+def murmur3_32(values, seeds):
+    """
+    Returns a ``(len(seeds), len(values))`` matrix of the signed 32 bit
+    MurmurHash3 of every value (a sequence of bytes) with every seed, the same
+    as ``mmh3.hash(value, seed)``.
+    """
+    result = np.empty((len(seeds), len(values)), dtype=np.int32)
+    seeds = np.asarray(seeds, dtype=np.uint32).reshape(-1, 1)
+
+    # Values are hashed in groups of similar length (from the longest to the
+    # shortest) and padded to the longest value of the group, so that every
+    # block is mixed in with a single vectorized operation for all values
+    # that are long enough.
+    all_lengths = np.fromiter(map(len, values), dtype=np.uint32, count=len(values))
+    order = np.argsort(-all_lengths.astype(np.int64), kind="stable")
+    start = 0
+    while start < len(order):
+        width = (int(all_lengths[order[start]]) // 4 + 1) * 4
+        stop = min(len(order), start + max(1, MAX_BATCH_BYTES // width))
+        group = order[start:stop]
+
+        lengths = all_lengths[group]
+        padded = b"".join([values[i].ljust(width, b"\0") for i in group.tolist()])
+        blocks = _mix_blocks(np.frombuffer(padded, dtype="<u4").reshape(len(group), -1))
+        counts = lengths // np.uint32(4)
+
+        # Values are sorted by length, so the values that have a block are
+        # always the first n of the group.
+        ends = np.searchsorted(-counts.astype(np.int64), -np.arange(int(counts[0])), side="left")
+
+        h = np.repeat(seeds, len(group), axis=1)
+        for block, n in enumerate(ends.tolist()):
+            h[:, :n] ^= blocks[:n, block]
+            h[:, :n] = _rotl32(h[:, :n], 13) * np.uint32(5) + np.uint32(0xE6546B64)
+
+        # The tail is zero padded, so it is the block after the last full one,
+        # and mixing an empty tail doesn't change the hash.
+        h ^= blocks[np.arange(len(group)), counts]
+        h ^= lengths
+        result[:, group] = _fmix32(h).view(np.int32)
+        start = stop
+
+    return result
+
 
 class MinHashSignatureBuilder:
     def __init__(self, columns, rows):
@@ -11,3 +86,35 @@ class MinHashSignatureBuilder:
             min(mmh3.hash(feature, column) % self.rows for feature in features)
             for column in range(self.columns)
         ]
+
+    def build_many(self, feature_sets):
+        """
+        Returns the signatures of many feature sets, the same as calling the
+        builder with every feature set. Every distinct feature is hashed once,
+        and all columns are computed with vectorized operations if numpy is
+        available.
+        """
+        feature_sets = [list(features) for features in feature_sets]
+        if not feature_sets:
+            return []
+        if not HAS_NUMPY:
+            return [self(features) for features in feature_sets]
+
+        distinct = {}
+        indices = []
+        offsets = []
+        for features in feature_sets:
+            if not features:
+                raise ValueError("signatures of empty feature sets are undefined")
+            offsets.append(len(indices))
+            for feature in features:
+                # mmh3 hashes the UTF-8 encoding of strings.
+                if isinstance(feature, str):
+                    feature = feature.encode("utf-8")
+                elif not isinstance(feature, bytes):
+                    return [self(features) for features in feature_sets]
+                indices.append(distinct.setdefault(feature, len(distinct)))
+
+        hashes = murmur3_32(list(distinct), range(self.columns)).astype(np.int64) % self.rows
+        signatures = np.minimum.reduceat(hashes[:, indices], offsets, axis=1)
+        return signatures.T.tolist()
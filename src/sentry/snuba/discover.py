@@ -13,6 +13,7 @@ from snuba_sdk.conditions import Condition, Op
 from snuba_sdk.function import Function
 from typing_extensions import TypedDict
 
+from sentry import options
 from sentry.discover.arithmetic import categorize_columns
 from sentry.models import Group
 from sentry.search.events.builder import (
@@ -29,6 +30,7 @@ from sentry.search.events.fields import (
     is_function,
 )
 from sentry.search.events.types import HistogramParams, ParamsType
+from sentry.snuba.timeseries_cache import bulk_timeseries_query
 from sentry.tagstore.base import TOP_VALUES_DEFAULT_LIMIT
 from sentry.utils.dates import to_timestamp
 from sentry.utils.math import nice_int
@@ -361,7 +363,11 @@ def timeseries_query(
             )
             query_list.append(comparison_builder)
 
-        query_results = bulk_snql_query([query.get_snql_query() for query in query_list], referrer)
+        requests = [query.get_snql_query() for query in query_list]
+        if options.get("snuba.timeseries-cache.enabled"):
+            query_results = bulk_timeseries_query(requests, rollup, referrer)
+        else:
+            query_results = bulk_snql_query(requests, referrer)
 
     with sentry_sdk.start_span(op="discover.discover", description="timeseries.transform_results"):
         results = []
@@ -497,6 +503,7 @@ def top_events_timeseries(
         equations=equations,
         functions_acl=functions_acl,
     )
+    use_timeseries_cache = options.get("snuba.timeseries-cache.enabled")
     if len(top_events["data"]) == limit and include_other:
         other_events_builder = TopEventsQueryBuilder(
             Dataset.Discover,
@@ -509,12 +516,18 @@ def top_events_timeseries(
             timeseries_columns=timeseries_columns,
             equations=equations,
         )
-        result, other_result = bulk_snql_query(
-            [top_events_builder.get_snql_query(), other_events_builder.get_snql_query()],
-            referrer=referrer,
-        )
+        requests = [top_events_builder.get_snql_query(), other_events_builder.get_snql_query()]
+        if use_timeseries_cache:
+            result, other_result = bulk_timeseries_query(requests, rollup, referrer)
+        else:
+            result, other_result = bulk_snql_query(requests, referrer=referrer)
     else:
-        result = top_events_builder.run_query(referrer)
+        if use_timeseries_cache:
+            [result] = bulk_timeseries_query(
+                [top_events_builder.get_snql_query()], rollup, referrer
+            )
+        else:
+            result = top_events_builder.run_query(referrer)
         other_result = {"data": []}
     if (
         not allow_empty
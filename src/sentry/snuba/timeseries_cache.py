@@ -0,0 +1,258 @@
+"""
+An incremental result cache for timeseries queries.
+
+Dashboards that refresh a timeseries over a sliding window query Snuba for the
+full window every time, although only the most recent buckets can change. This
+cache stores the rows of buckets that are complete (their end is older than
+``snuba.timeseries-cache.commit-delay`` seconds, which accounts for ingestion
+delays) per query and rollup, and only queries Snuba for the buckets that are
+missing from the cache::
+
+    start                                                                 end
+      | head |            cached buckets            |         tail          |
+
+The cache key is the query without its time range conditions, so a query for a
+window that moved forward shares the cache entry of the previous query. The
+head is the partial bucket before the first full bucket of the window, which
+is only queried if ``start`` is not aligned to the rollup. Head and tail are
+fetched with a single bulk query.
+
+Only the rows of complete buckets that are fully contained in the queried
+window are cached, so the stitched result is the same as the result of the
+full query, as long as the select clause only contains aggregates per bucket.
+"""
+import dataclasses
+from datetime import datetime, timezone
+from hashlib import sha1
+from typing import Any, List, Mapping, MutableMapping, Optional, Sequence, Tuple
+
+from dateutil.parser import parse as parse_datetime
+from django.core.cache import cache
+from snuba_sdk import Condition, Op, Request
+
+from sentry import options
+from sentry.utils import json, metrics
+from sentry.utils.snuba import bulk_snql_query
+
+# Upper bound of the number of buckets stored per query.
+MAX_CACHED_BUCKETS = 10000
+# Buckets of larger rollups are not aligned to the epoch (e.g. weeks start on
+# Mondays), so their boundaries can't be computed from the rollup alone.
+MAX_ROLLUP = 24 * 60 * 60
+
+
+def _get_time_range(request: Request) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Returns the ``(start, end)`` of the top level time range conditions of a
+    query, or ``None`` if it does not have exactly one of each.
+    """
+    starts = []
+    ends = []
+    for condition in request.query.where or ():
+        if isinstance(condition, Condition) and isinstance(condition.rhs, datetime):
+            if condition.op == Op.GTE:
+                starts.append(condition.rhs)
+            elif condition.op == Op.LT:
+                ends.append(condition.rhs)
+            else:
+                return None
+
+    if len(starts) != 1 or len(ends) != 1:
+        return None
+    return starts[0], ends[0]
+
+
+def _with_time_range(request: Request, start: datetime, end: datetime) -> Request:
+    where = []
+    for condition in request.query.where or ():
+        if isinstance(condition, Condition) and isinstance(condition.rhs, datetime):
+            condition = dataclasses.replace(condition, rhs=start if condition.op == Op.GTE else end)
+        where.append(condition)
+    return dataclasses.replace(request, query=request.query.set_where(where))
+
+
+def get_cache_key(request: Request, rollup: int) -> str:
+    # Every query gets the same placeholder time range, so that queries that
+    # only differ in their time range share the same key.
+    placeholder = datetime.fromtimestamp(0, timezone.utc)
+    hashable = str(_with_time_range(request, placeholder, placeholder))
+    # sts - Snuba Timeseries Segments
+    return f"sts:{rollup}:{sha1(hashable.encode('utf-8')).hexdigest()}"
+
+
+def _to_timestamp(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _from_timestamp(value: int, tzinfo: Optional[Any]) -> datetime:
+    rv = datetime.fromtimestamp(value, timezone.utc)
+    return rv if tzinfo is not None else rv.replace(tzinfo=None)
+
+
+def _row_time(row: Mapping[str, Any]) -> int:
+    time = row["time"]
+    if isinstance(time, str):
+        return _to_timestamp(parse_datetime(time))
+    return int(time)
+
+
+def _rows_between(rows: Sequence[Mapping[str, Any]], start: int, end: int) -> List[Any]:
+    return [row for row in rows if start <= _row_time(row) < end]
+
+
+class _Plan:
+    """
+    The queries required to answer a single timeseries query: ``queries`` is a
+    list of ``(name, request)``, where name is one of ``full``, ``head`` or
+    ``tail``.
+    """
+
+    def __init__(self, request: Request, cache_key: Optional[str] = None) -> None:
+        self.request = request
+        self.cache_key = cache_key
+        self.segment: Optional[MutableMapping[str, Any]] = None
+        self.start = self.end = self.committed_start = self.committed_end = 0
+        self.queries: List[Tuple[str, Request]] = [("full", request)]
+
+
+def _plan(request: Request, rollup: int, segment: Optional[Mapping[str, Any]], now: int) -> _Plan:
+    time_range = _get_time_range(request) if rollup <= MAX_ROLLUP else None
+    if time_range is None:
+        return _Plan(request)
+
+    start, end = time_range
+    plan = _Plan(request, get_cache_key(request, rollup))
+    plan.start = _to_timestamp(start)
+    plan.end = _to_timestamp(end)
+    # Only complete buckets that are fully inside of the window can be cached.
+    plan.committed_start = -(-plan.start // rollup) * rollup
+    commit_delay = options.get("snuba.timeseries-cache.commit-delay")
+    plan.committed_end = min(plan.end, now - commit_delay) // rollup * rollup
+    if plan.committed_end <= plan.committed_start:
+        plan.cache_key = None
+        return plan
+
+    if (
+        segment is None
+        or segment["start"] > plan.committed_start
+        or segment["end"] <= plan.committed_start
+    ):
+        # The cached buckets don't cover the beginning of the window, so the
+        # full window is queried and becomes the cached segment.
+        return plan
+
+    plan.segment = segment
+    cached_end = min(segment["end"], plan.committed_end)
+    plan.queries = []
+    if plan.start < plan.committed_start:
+        head_end = _from_timestamp(plan.committed_start, start.tzinfo)
+        plan.queries.append(("head", _with_time_range(request, start, head_end)))
+    if cached_end < plan.end:
+        tail_start = _from_timestamp(cached_end, end.tzinfo)
+        plan.queries.append(("tail", _with_time_range(request, tail_start, end)))
+    return plan
+
+
+def _build_result(
+    plan: _Plan, rollup: int, results: Mapping[str, Mapping[str, Any]]
+) -> Mapping[str, Any]:
+    if plan.segment is None:
+        result = results["full"]
+        if plan.cache_key is not None:
+            _store_segment(
+                plan.cache_key,
+                plan.committed_start,
+                plan.committed_end,
+                result["meta"],
+                _rows_between(result["data"], plan.committed_start, plan.committed_end),
+                rollup,
+            )
+        return result
+
+    segment = plan.segment
+    cached_end = min(segment["end"], plan.committed_end)
+    head = results.get("head", {"data": []})
+    tail = results.get("tail", {"data": []})
+    # Any row of the partial head bucket is labeled with the bucket before the
+    # first full one, rows of the tail start after the cached buckets.
+    data = (
+        head["data"]
+        + _rows_between(segment["data"], plan.committed_start, cached_end)
+        + tail["data"]
+    )
+
+    if cached_end < plan.committed_end:
+        _store_segment(
+            plan.cache_key,
+            segment["start"],
+            plan.committed_end,
+            tail.get("meta", segment["meta"]),
+            segment["data"] + _rows_between(tail["data"], cached_end, plan.committed_end),
+            rollup,
+        )
+
+    result = dict(tail if "tail" in results else head if "head" in results else {})
+    result["data"] = data
+    result.setdefault("meta", segment["meta"])
+    return result
+
+
+def _store_segment(
+    cache_key: str,
+    start: int,
+    end: int,
+    meta: Any,
+    data: Sequence[Mapping[str, Any]],
+    rollup: int,
+) -> None:
+    # Drop the oldest buckets to bound the size of a segment.
+    if (end - start) // rollup > MAX_CACHED_BUCKETS:
+        start = end - MAX_CACHED_BUCKETS * rollup
+        data = _rows_between(data, start, end)
+
+    cache.set(
+        cache_key,
+        json.dumps({"start": start, "end": end, "meta": meta, "data": data}),
+        options.get("snuba.timeseries-cache.ttl"),
+    )
+
+
+def bulk_timeseries_query(
+    requests: List[Request], rollup: int, referrer: Optional[str] = None
+) -> List[Mapping[str, Any]]:
+    """
+    Runs timeseries queries like ``bulk_snql_query``, but only queries Snuba
+    for the buckets that are not cached yet. ``rollup`` must be the
+    granularity of the queries, which group by the ``time`` column.
+    """
+    metric_tags = {"referrer": referrer or "unknown"}
+    now = _to_timestamp(datetime.now(timezone.utc))
+
+    plans = [_plan(request, rollup, None, now) for request in requests]
+    cache_keys = [plan.cache_key for plan in plans if plan.cache_key is not None]
+    segments = {key: json.loads(value) for key, value in cache.get_many(cache_keys).items()}
+    if segments:
+        plans = [
+            _plan(request, rollup, segments.get(plan.cache_key), now) if plan.cache_key else plan
+            for request, plan in zip(requests, plans)
+        ]
+
+    for plan in plans:
+        if plan.cache_key is None:
+            metrics.incr("snuba.timeseries_cache.uncacheable", tags=metric_tags)
+        elif plan.segment is None:
+            metrics.incr("snuba.timeseries_cache.miss", tags=metric_tags)
+        else:
+            metrics.incr("snuba.timeseries_cache.hit", tags=metric_tags)
+
+    queries = [(i, name, request) for i, plan in enumerate(plans) for name, request in plan.queries]
+    query_results = []
+    if queries:
+        query_results = bulk_snql_query([request for _, _, request in queries], referrer)
+    results: List[MutableMapping[str, Any]] = [{} for _ in plans]
+    for (i, name, _), result in zip(queries, query_results):
+        results[i][name] = result
+
+    return [_build_result(plan, rollup, result) for plan, result in zip(plans, results)]
@@ -27,6 +27,20 @@ requires_snuba = pytest.mark.skipif(
 )
 
 
+def benchmark_available():
+    try:
+        import pytest_benchmark  # NOQA
+    except ModuleNotFoundError:
+        return False
+    else:
+        return True
+
+
+requires_benchmark = pytest.mark.skipif(
+    not benchmark_available(), reason="requires pytest-benchmark"
+)
+
+
 def is_arm64():
     return os.uname().machine == "arm64"
 
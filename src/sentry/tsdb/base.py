@@ -5,6 +5,7 @@ from enum import Enum
 from django.conf import settings
 from django.utils import timezone
 
+from sentry.tsdb.columnar import ColumnarSeries
 from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.services import Service
 
@@ -103,8 +104,10 @@ class BaseTSDB(Service):
     __read_methods__ = frozenset(
         [
             "get_range",
+            "get_range_columnar",
             "get_sums",
             "get_distinct_counts_series",
+            "get_distinct_counts_series_columnar",
             "get_distinct_counts_totals",
             "get_distinct_counts_union",
             "get_most_frequent",
@@ -364,6 +367,35 @@ class BaseTSDB(Service):
         """
         raise NotImplementedError
 
+    def get_range_columnar(
+        self,
+        model,
+        keys,
+        start,
+        end,
+        rollup=None,
+        environment_ids=None,
+        use_cache=False,
+        jitter_value=None,
+    ):
+        """
+        Same as ``get_range``, but returns a ``ColumnarSeries`` with one row
+        per key. Requires numpy.
+        """
+        return ColumnarSeries.from_points(
+            self.get_range(
+                model,
+                keys,
+                start,
+                end,
+                rollup,
+                environment_ids=environment_ids,
+                use_cache=use_cache,
+                jitter_value=jitter_value,
+            ),
+            keys=list(dict.fromkeys(keys)),
+        )
+
     def get_sums(
         self,
         model,
@@ -436,6 +468,18 @@ class BaseTSDB(Service):
         """
         raise NotImplementedError
 
+    def get_distinct_counts_series_columnar(
+        self, model, keys, start, end=None, rollup=None, environment_id=None
+    ):
+        """
+        Same as ``get_distinct_counts_series``, but returns a
+        ``ColumnarSeries`` with one row per key. Requires numpy.
+        """
+        return ColumnarSeries.from_points(
+            self.get_distinct_counts_series(model, keys, start, end, rollup, environment_id),
+            keys=list(dict.fromkeys(keys)),
+        )
+
     def get_distinct_counts_totals(
         self,
         model,
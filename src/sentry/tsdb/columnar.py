@@ -0,0 +1,146 @@
+import numpy as np
+
+
+class ColumnarSeries:
+    """
+    A set of time series that share the same timestamps.
+
+    Instead of the ``{key: [(timestamp, value), ...]}`` mapping returned by
+    ``get_range``, the data is stored as a vector of ``timestamps`` and a
+    ``values`` matrix that has one row per key (in the order of ``keys``) and
+    one column per timestamp. This allows aggregating results for many keys
+    without looping over every point in Python.
+    """
+
+    __slots__ = ("keys", "timestamps", "values", "_index")
+
+    def __init__(self, keys, timestamps, values):
+        self.keys = list(keys)
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.int64).reshape(
+            (len(self.keys), len(self.timestamps))
+        )
+        self._index = {key: i for i, key in enumerate(self.keys)}
+
+    @classmethod
+    def empty(cls, keys, timestamps):
+        return cls(keys, timestamps, np.zeros((len(keys), len(timestamps)), dtype=np.int64))
+
+    @classmethod
+    def from_points(cls, points, keys=None):
+        """
+        Builds a columnar series from the ``{key: [(timestamp, value), ...]}``
+        mapping returned by ``get_range``. Keys that are listed in ``keys`` but
+        missing from ``points`` are zero-filled.
+        """
+        if keys is None:
+            keys = list(points)
+        else:
+            keys = list(keys)
+
+        timestamps = sorted({int(ts) for series in points.values() for ts, _ in series})
+        columns = {ts: i for i, ts in enumerate(timestamps)}
+
+        result = cls.empty(keys, timestamps)
+        for key, series in points.items():
+            row = result._index.get(key)
+            if row is None:
+                continue
+            for ts, value in series:
+                result.values[row, columns[int(ts)]] += value
+        return result
+
+    def to_points(self):
+        """
+        Returns the data in the ``{key: [(timestamp, value), ...]}`` format
+        used by ``get_range``.
+        """
+        timestamps = self.timestamps.tolist()
+        return {
+            key: list(zip(timestamps, row)) for key, row in zip(self.keys, self.values.tolist())
+        }
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __getitem__(self, key):
+        return self.values[self._index[key]]
+
+    def __eq__(self, other):
+        if not isinstance(other, ColumnarSeries):
+            return NotImplemented
+        return (
+            self.keys == other.keys
+            and np.array_equal(self.timestamps, other.timestamps)
+            and np.array_equal(self.values, other.values)
+        )
+
+    def __repr__(self):
+        return f"<ColumnarSeries keys={len(self.keys)} timestamps={len(self.timestamps)}>"
+
+    def sums(self):
+        """
+        Returns the sum of all values per key, like ``get_sums``.
+        """
+        return dict(zip(self.keys, self.values.sum(axis=1).tolist()))
+
+    def totals(self):
+        """
+        Returns the sum of all keys per timestamp as ``[(timestamp, value), ...]``.
+        """
+        return list(zip(self.timestamps.tolist(), self.values.sum(axis=0).tolist()))
+
+    def rollup(self, rollup):
+        """
+        Combines values into buckets of ``rollup`` seconds, like
+        ``BaseTSDB.rollup``.
+        """
+        if not len(self.timestamps):
+            return ColumnarSeries(self.keys, self.timestamps, self.values)
+
+        order = np.argsort(self.timestamps, kind="stable")
+        buckets = self.timestamps[order] - self.timestamps[order] % rollup
+        timestamps, starts = np.unique(buckets, return_index=True)
+        return ColumnarSeries(
+            self.keys, timestamps, np.add.reduceat(self.values[:, order], starts, axis=1)
+        )
+
+    def select(self, keys):
+        """
+        Returns a series that only contains ``keys``, in that order. Keys that
+        are not part of this series are zero-filled.
+        """
+        result = ColumnarSeries.empty(keys, self.timestamps)
+        present = [(i, self._index[key]) for i, key in enumerate(result.keys) if key in self]
+        if present:
+            target, source = zip(*present)
+            result.values[list(target)] = self.values[list(source)]
+        return result
+
+    @classmethod
+    def merge(cls, series):
+        """
+        Adds up multiple series. The result contains the union of all keys and
+        timestamps, values for the same key and timestamp are summed.
+        """
+        series = list(series)
+
+        keys = {}
+        for s in series:
+            for key in s.keys:
+                keys.setdefault(key, len(keys))
+
+        if series:
+            timestamps = np.unique(np.concatenate([s.timestamps for s in series]))
+        else:
+            timestamps = np.array([], dtype=np.int64)
+
+        result = cls.empty(list(keys), timestamps)
+        for s in series:
+            rows = np.array([keys[key] for key in s.keys], dtype=np.intp)
+            columns = np.searchsorted(timestamps, s.timestamps)
+            np.add.at(result.values, (rows[:, None], columns[None, :]), s.values)
+        return result
@@ -1,4 +1,5 @@
 from sentry.tsdb.base import BaseTSDB
+from sentry.tsdb.columnar import ColumnarSeries
 
 
 class DummyTSDB(BaseTSDB):
@@ -36,6 +37,21 @@ class DummyTSDB(BaseTSDB):
         _, series = self.get_optimal_rollup_series(start, end, rollup)
         return {k: [(ts, 0) for ts in series] for k in keys}
 
+    def get_range_columnar(
+        self,
+        model,
+        keys,
+        start,
+        end,
+        rollup=None,
+        environment_ids=None,
+        use_cache=False,
+        jitter_value=None,
+    ):
+        self.validate_arguments([model], environment_ids if environment_ids is not None else [None])
+        _, series = self.get_optimal_rollup_series(start, end, rollup)
+        return ColumnarSeries.empty(list(dict.fromkeys(keys)), series)
+
     def record(self, model, key, values, timestamp=None, environment_id=None):
         self.validate_arguments([model], [environment_id])
 
@@ -3,6 +3,7 @@ from collections import Counter, defaultdict
 from django.utils import timezone
 
 from sentry.tsdb.base import BaseTSDB
+from sentry.tsdb.columnar import ColumnarSeries
 from sentry.utils.dates import to_datetime, to_timestamp
 
 
@@ -97,6 +98,34 @@ class InMemoryTSDB(BaseTSDB):
             results_by_key[key] = sorted(points.items())
         return dict(results_by_key)
 
+    def get_range_columnar(
+        self,
+        model,
+        keys,
+        start,
+        end,
+        rollup=None,
+        environment_ids=None,
+        use_cache=False,
+        jitter_value=None,
+    ):
+        self.validate_arguments([model], environment_ids if environment_ids is not None else [None])
+
+        rollup, series = self.get_optimal_rollup_series(start, end, rollup)
+        epochs = [self.normalize_ts_to_rollup(timestamp, rollup) for timestamp in series]
+        keys = list(dict.fromkeys(keys))
+
+        values = []
+        for key in keys:
+            if not environment_ids:
+                data = self.data[model][(key, None)]
+                values.extend(int(data[epoch] or 0) for epoch in epochs)
+            else:
+                sources = [self.data[model][(key, e)] for e in environment_ids]
+                values.extend(int(sum(data[epoch] for data in sources)) for epoch in epochs)
+
+        return ColumnarSeries(keys, series, values)
+
     def record(self, model, key, values, timestamp=None, environment_id=None):
         self.validate_arguments([model], [environment_id])
 
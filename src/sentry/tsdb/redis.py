@@ -12,6 +12,7 @@ from django.utils.encoding import force_bytes
 from pkg_resources import resource_string
 
 from sentry.tsdb.base import BaseTSDB
+from sentry.tsdb.columnar import ColumnarSeries
 from sentry.utils.compat import crc32
 from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.redis import SentryScript, check_cluster_versions, get_cluster_from_options
@@ -25,6 +26,8 @@ SketchParameters = namedtuple("SketchParameters", "depth width capacity")
 
 CountMinScript = SentryScript(None, resource_string("sentry", "scripts/tsdb/cmsketch.lua"))
 
+CounterScript = SentryScript(None, resource_string("sentry", "scripts/tsdb/counters.lua"))
+
 
 class SuppressionWrapper:
     """\
@@ -105,6 +108,10 @@ class RedisTSDB(BaseTSDB):
     frequency table can be displayed as percentages of the whole data set.
     (Additional documentation and the bulk of the logic for implementing the
     frequency table API can be found in the ``cmsketch.lua`` script.)
+
+    When ``enable_counter_scripts`` is set, simple counters are written and
+    read with the ``counters.lua`` script, which performs all operations for
+    a host in a single command instead of issuing one command per hash field.
     """
 
     DEFAULT_SKETCH_PARAMETERS = SketchParameters(3, 128, 50)
@@ -114,6 +121,7 @@ class RedisTSDB(BaseTSDB):
         self.prefix = prefix
         self.vnodes = vnodes
         self.enable_frequency_sketches = options.pop("enable_frequency_sketches", False)
+        self.enable_counter_scripts = options.pop("enable_counter_scripts", False)
         super().__init__(**options)
 
     def validate(self):
@@ -224,43 +232,139 @@ class RedisTSDB(BaseTSDB):
             default_timestamp = timezone.now()
 
         for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
+            # (hash_key, hash_field) -> count
+            key_operations = defaultdict(lambda: 0)
+            # (hash_key) -> "max expiration encountered"
+            key_expiries = defaultdict(lambda: 0.0)
+
+            for rollup, max_values in self.rollups.items():
+                for item in items:
+                    if len(item) == 2:
+                        model, key = item
+                        options = {}
+                    else:
+                        model, key, options = item
+
+                    count = options.get("count", default_count)
+                    timestamp = options.get("timestamp", default_timestamp)
+
+                    expiry = self.calculate_expiry(rollup, max_values, timestamp)
+
+                    for environment_id in environment_ids:
+                        hash_key, hash_field = self.make_counter_key(
+                            model, rollup, timestamp, key, environment_id
+                        )
+
+                        if key_expiries[hash_key] < expiry:
+                            key_expiries[hash_key] = expiry
+
+                        key_operations[(hash_key, hash_field)] += count
+
+            if self.enable_counter_scripts:
+                try:
+                    self._incr_counters_scripted(cluster, key_operations, key_expiries)
+                except Exception:
+                    if durable:
+                        raise
+                continue
+
             manager = cluster.map()
             if not durable:
                 manager = SuppressionWrapper(manager)
 
             with manager as client:
-                # (hash_key, hash_field) -> count
-                key_operations = defaultdict(lambda: 0)
-                # (hash_key) -> "max expiration encountered"
-                key_expiries = defaultdict(lambda: 0.0)
-
-                for rollup, max_values in self.rollups.items():
-                    for item in items:
-                        if len(item) == 2:
-                            model, key = item
-                            options = {}
-                        else:
-                            model, key, options = item
-
-                        count = options.get("count", default_count)
-                        timestamp = options.get("timestamp", default_timestamp)
+                for (hash_key, hash_field), count in key_operations.items():
+                    client.hincrby(hash_key, hash_field, count)
+                    if key_expiries.get(hash_key):
+                        client.expireat(hash_key, key_expiries.pop(hash_key))
 
-                        expiry = self.calculate_expiry(rollup, max_values, timestamp)
+    def _group_counter_operations_by_host(self, cluster, operations):
+        """
+        Groups ``(hash_key, hash_field, value)`` operations by the host that
+        the hash is located on. Returns a mapping of ``host -> {hash_key:
+        [(hash_field, value), ...]}``.
+        """
+        router = cluster.get_router()
+        hosts = defaultdict(lambda: defaultdict(list))
+        for hash_key, hash_field, value in operations:
+            hosts[router.get_host_for_key(hash_key)][hash_key].append((hash_field, value))
+        return hosts
 
-                        for environment_id in environment_ids:
-                            hash_key, hash_field = self.make_counter_key(
-                                model, rollup, timestamp, key, environment_id
-                            )
+    def _make_counter_script_arguments(self, command, operations, make_key_arguments):
+        """
+        Builds the ``KEYS`` and ``ARGV`` for the counter script from a mapping
+        of ``hash_key -> [(hash_field, value), ...]``.
+        """
+        fields = {}
+        keys = []
+        key_arguments = []
+        for hash_key, key_operations in operations.items():
+            keys.append(hash_key)
+            key_arguments.extend(
+                make_key_arguments(
+                    hash_key,
+                    [
+                        (fields.setdefault(hash_field, len(fields) + 1), value)
+                        for hash_field, value in key_operations
+                    ],
+                )
+            )
+        return keys, [command, len(fields), *fields.keys(), *key_arguments]
 
-                            if key_expiries[hash_key] < expiry:
-                                key_expiries[hash_key] = expiry
+    def _incr_counters_scripted(self, cluster, key_operations, key_expiries):
+        def make_key_arguments(hash_key, operations):
+            arguments = [int(key_expiries.get(hash_key, 0)), len(operations)]
+            for field_index, count in operations:
+                arguments.extend((field_index, count))
+            return arguments
 
-                            key_operations[(hash_key, hash_field)] += count
+        commands = {}
+        for operations in self._group_counter_operations_by_host(
+            cluster,
+            (
+                (hash_key, hash_field, count)
+                for (hash_key, hash_field), count in key_operations.items()
+            ),
+        ).values():
+            keys, arguments = self._make_counter_script_arguments(
+                "INCR", operations, make_key_arguments
+            )
+            # the command is routed by the first key, all other keys are on
+            # the same host
+            commands[keys[0]] = [(CounterScript, keys, arguments)]
 
-                for (hash_key, hash_field), count in key_operations.items():
-                    client.hincrby(hash_key, hash_field, count)
-                    if key_expiries.get(hash_key):
-                        client.expireat(hash_key, key_expiries.pop(hash_key))
+        cluster.execute_commands(commands)
+
+    def _get_counters_scripted(self, cluster, requests):
+        """
+        Fetches the values of ``(hash_key, hash_field)`` pairs. Returns a list
+        of values in the same order as ``requests``.
+        """
+
+        def make_key_arguments(hash_key, operations):
+            return [len(operations)] + [field_index for field_index, _ in operations]
+
+        hosts = self._group_counter_operations_by_host(
+            cluster,
+            ((hash_key, hash_field, i) for i, (hash_key, hash_field) in enumerate(requests)),
+        )
+
+        commands = {}
+        positions = {}
+        for operations in hosts.values():
+            keys, arguments = self._make_counter_script_arguments(
+                "GET", operations, make_key_arguments
+            )
+            commands[keys[0]] = [(CounterScript, keys, arguments)]
+            positions[keys[0]] = [
+                position for key_operations in operations.values() for _, position in key_operations
+            ]
+
+        values = [0] * len(requests)
+        for routing_key, responses in cluster.execute_commands(commands).items():
+            for position, value in zip(positions[routing_key], responses[0].value):
+                values[position] = int(value)
+        return values
 
     def get_range(
         self,
@@ -281,6 +385,37 @@ class RedisTSDB(BaseTSDB):
         >>>          start=now - timedelta(days=1),
         >>>          end=now)
         """
+        series, values = self._get_range_values(model, keys, start, end, rollup, environment_ids)
+
+        results_by_key = defaultdict(dict)
+        for i, key in enumerate(keys):
+            for epoch, count in zip(series, values[i * len(series) : (i + 1) * len(series)]):
+                results_by_key[key][epoch] = count
+
+        for key, points in results_by_key.items():
+            results_by_key[key] = sorted(points.items())
+        return dict(results_by_key)
+
+    def get_range_columnar(
+        self,
+        model,
+        keys,
+        start,
+        end,
+        rollup=None,
+        environment_ids=None,
+        use_cache=False,
+        jitter_value=None,
+    ):
+        series, values = self._get_range_values(model, keys, start, end, rollup, environment_ids)
+        # ``keys`` may contain duplicates, which are collapsed by ``get_range``
+        return ColumnarSeries(keys, series, values).select(list(dict.fromkeys(keys)))
+
+    def _get_range_values(self, model, keys, start, end, rollup, environment_ids):
+        """
+        Returns the epochs of the series and a flat list of counter values,
+        with one value for every epoch of every key, ordered by key.
+        """
         # redis backend doesn't support multiple envs
         if environment_ids is not None and len(environment_ids) > 1:
             raise NotImplementedError
@@ -289,27 +424,24 @@ class RedisTSDB(BaseTSDB):
         self.validate_arguments([model], [environment_id])
 
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
-        series = [to_datetime(item) for item in series]
+        timestamps = [to_datetime(item) for item in series]
 
-        results = []
         cluster, _ = self.get_cluster(environment_id)
-        with cluster.map() as client:
-            for key in keys:
-                for timestamp in series:
-                    hash_key, hash_field = self.make_counter_key(
-                        model, rollup, timestamp, key, environment_id
-                    )
-                    results.append(
-                        (to_timestamp(timestamp), key, client.hget(hash_key, hash_field))
-                    )
 
-        results_by_key = defaultdict(dict)
-        for epoch, key, count in results:
-            results_by_key[key][epoch] = int(count.value or 0)
+        requests = [
+            self.make_counter_key(model, rollup, timestamp, key, environment_id)
+            for key in keys
+            for timestamp in timestamps
+        ]
 
-        for key, points in results_by_key.items():
-            results_by_key[key] = sorted(points.items())
-        return dict(results_by_key)
+        if self.enable_counter_scripts:
+            values = self._get_counters_scripted(cluster, requests)
+        else:
+            with cluster.map() as client:
+                responses = [client.hget(hash_key, hash_field) for hash_key, hash_field in requests]
+            values = [int(response.value or 0) for response in responses]
+
+        return [to_timestamp(timestamp) for timestamp in timestamps], values
 
     def merge(self, model, destination, sources, timestamp=None, environment_ids=None):
         environment_ids = (set(environment_ids) if environment_ids is not None else set()).union(
@@ -8,6 +8,7 @@ from typing import Any, Optional, Sequence
 from sentry.constants import DataCategory
 from sentry.ingest.inbound_filters import FILTER_STAT_KEYS_TO_VALUES
 from sentry.tsdb.base import BaseTSDB, TSDBModel
+from sentry.tsdb.columnar import ColumnarSeries
 from sentry.utils import outcomes, snuba
 from sentry.utils.dates import to_datetime
 
@@ -399,6 +400,35 @@ class SnubaTSDB(BaseTSDB):
         conditions=None,
         use_cache=False,
         jitter_value=None,
+    ):
+        result = self._get_range_data(
+            model, keys, start, end, rollup, environment_ids, conditions, use_cache, jitter_value
+        )
+        # convert
+        #    {group:{timestamp:count, ...}}
+        # into
+        #    {group: [(timestamp, count), ...]}
+        return {k: sorted(result[k].items()) for k in result}
+
+    def get_range_columnar(
+        self,
+        model,
+        keys,
+        start,
+        end,
+        rollup=None,
+        environment_ids=None,
+        conditions=None,
+        use_cache=False,
+        jitter_value=None,
+    ):
+        result = self._get_range_data(
+            model, keys, start, end, rollup, environment_ids, conditions, use_cache, jitter_value
+        )
+        return self._make_columnar(result, keys)
+
+    def _get_range_data(
+        self, model, keys, start, end, rollup, environment_ids, conditions, use_cache, jitter_value
     ):
         model_query_settings = self.model_query_settings.get(model)
         assert model_query_settings is not None, f"Unsupported TSDBModel: {model.name}"
@@ -408,7 +438,7 @@ class SnubaTSDB(BaseTSDB):
         else:
             aggregate_function = "count()"
 
-        result = self.get_data(
+        return self.get_data(
             model,
             keys,
             start,
@@ -421,11 +451,19 @@ class SnubaTSDB(BaseTSDB):
             use_cache=use_cache,
             jitter_value=jitter_value,
         )
+
+    def _make_columnar(self, result, keys):
         # convert
         #    {group:{timestamp:count, ...}}
-        # into
-        #    {group: [(timestamp, count), ...]}
-        return {k: sorted(result[k].items()) for k in result}
+        # into a matrix with one row per requested group, zero-filling
+        # groups that are missing from the result
+        keys = list(keys)
+        timestamps = sorted({ts for points in result.values() for ts in points})
+        return ColumnarSeries(
+            keys,
+            timestamps,
+            [(result.get(key) or {}).get(ts) or 0 for key in keys for ts in timestamps],
+        )
 
     def get_distinct_counts_series(
         self, model, keys, start, end=None, rollup=None, environment_id=None
@@ -446,6 +484,21 @@ class SnubaTSDB(BaseTSDB):
         #    {group: [(timestamp, count), ...]}
         return {k: sorted(result[k].items()) for k in result}
 
+    def get_distinct_counts_series_columnar(
+        self, model, keys, start, end=None, rollup=None, environment_id=None
+    ):
+        result = self.get_data(
+            model,
+            keys,
+            start,
+            end,
+            rollup,
+            [environment_id] if environment_id is not None else None,
+            aggregation="uniq",
+            group_on_time=True,
+        )
+        return self._make_columnar(result, keys)
+
     def get_distinct_counts_totals(
         self,
         model,
@@ -8,7 +8,7 @@ from typing import Any, Iterator, Mapping, Optional, Sequence, Tuple, cast
 from django.utils import timezone
 from google.api_core import exceptions, retry
 from google.cloud import bigtable
-from google.cloud.bigtable.row import PartialRowData
+from google.cloud.bigtable.row import DirectRow, PartialRowData
 from google.cloud.bigtable.row_set import RowSet
 from google.cloud.bigtable.table import Table
 
@@ -169,9 +169,16 @@ class BigtableKVStorage(KVStorage[str, bytes]):
 
         return value
 
-    def set(self, key: str, value: bytes, ttl: Optional[timedelta] = None) -> None:
+    def set(
+        self, key: str, value: bytes, ttl: Optional[timedelta] = None, compress: bool = True
+    ) -> None:
+        """
+        Set the value for a key. ``compress`` can be disabled for values that
+        are already compressed, in which case the configured compression is
+        not applied.
+        """
         try:
-            return self._set(key, value, ttl)
+            return self._set(key, value, ttl, compress)
         except exceptions.InternalServerError:
             # Delete cached client before retry
             with self.__table_lock:
@@ -179,12 +186,59 @@ class BigtableKVStorage(KVStorage[str, bytes]):
             # Retry once on InternalServerError
             # 500 Received RST_STREAM with error code 2
             # SENTRY-S6D
-            return self._set(key, value, ttl)
+            return self._set(key, value, ttl, compress)
+
+    def _set(
+        self, key: str, value: bytes, ttl: Optional[timedelta] = None, compress: bool = True
+    ) -> None:
+        row = self._make_row(self._get_table(), key, value, ttl, compress)
+
+        status = row.commit()
+        if status.code != 0:
+            raise BigtableError(status.code, status.message)
+
+    def set_many(
+        self,
+        items: Sequence[Tuple[str, bytes]],
+        ttl: Optional[timedelta] = None,
+        compress: bool = True,
+    ) -> None:
+        """
+        Set the values for multiple keys with a single ``mutate_rows`` request.
+        """
+        try:
+            return self._set_many(items, ttl, compress)
+        except exceptions.InternalServerError:
+            # Delete cached client before retry
+            with self.__table_lock:
+                del self.__table
+            # Retry once on InternalServerError, see ``set``. Rewriting rows
+            # that were already written is harmless.
+            return self._set_many(items, ttl, compress)
 
-    def _set(self, key: str, value: bytes, ttl: Optional[timedelta] = None) -> None:
+    def _set_many(
+        self,
+        items: Sequence[Tuple[str, bytes]],
+        ttl: Optional[timedelta] = None,
+        compress: bool = True,
+    ) -> None:
+        table = self._get_table()
+        rows = [self._make_row(table, key, value, ttl, compress) for key, value in items]
+
+        errors = []
+        for status in table.mutate_rows(rows):
+            if status.code != 0:
+                errors.append(BigtableError(status.code, status.message))
+
+        if errors:
+            raise BigtableError(errors)
+
+    def _make_row(
+        self, table: Table, key: str, value: bytes, ttl: Optional[timedelta], compress: bool
+    ) -> DirectRow:
         # XXX: There is a type mismatch here -- ``direct_row`` expects
         # ``bytes`` but we are providing it with ``str``.
-        row = self._get_table().direct_row(key)
+        row = table.direct_row(key)
 
         # Call to delete is just a state mutation, and in this case is just
         # used to clear all columns so the entire row will be replaced.
@@ -223,7 +277,7 @@ class BigtableKVStorage(KVStorage[str, bytes]):
         # tracking now is whether compression is on or not for the data column.
         flags = self.Flags(0)
 
-        if self.compression:
+        if self.compression and compress:
             compression_flag, strategy = self.compression_strategies[self.compression]
             flags |= compression_flag
             value = strategy.encode(value)
@@ -242,9 +296,7 @@ class BigtableKVStorage(KVStorage[str, bytes]):
 
         row.set_cell(self.column_family, self.data_column, value, timestamp=ts)
 
-        status = row.commit()
-        if status.code != 0:
-            raise BigtableError(status.code, status.message)
+        return row
 
     def delete(self, key: str) -> None:
         # XXX: There is a type mismatch here -- ``direct_row`` expects
@@ -34,6 +34,9 @@ class CacheKVStorage(KVStorage[Any, Any]):
     def set(self, key: Any, value: Any, ttl: Optional[timedelta] = None) -> None:
         self.backend.set(key, value, timeout=int(ttl.total_seconds()) if ttl is not None else None)
 
+    def set_many(self, items: Sequence[Tuple[Any, Any]], ttl: Optional[timedelta] = None) -> None:
+        self.backend.set_many(items, timeout=int(ttl.total_seconds()) if ttl is not None else None)
+
     def delete(self, key: Any) -> None:
         self.backend.delete(key)
 
@@ -91,6 +94,12 @@ class CacheKeyWrapper(KVStorage[str, V]):
             ttl,
         )
 
+    def set_many(self, items: Sequence[Tuple[str, V]], ttl: Optional[timedelta] = None) -> None:
+        return self.storage.set_many(
+            [(wrap_key(self.prefix, self.version, key), value) for key, value in items],
+            ttl,
+        )
+
     def delete(self, key: str) -> None:
         self.storage.delete(wrap_key(self.prefix, self.version, key))
 
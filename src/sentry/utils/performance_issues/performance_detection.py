@@ -292,32 +292,38 @@ def _detect_performance_problems(data: Event, sdk_span: Any) -> List[Performance
     project_id = data.get("project")
 
     detection_settings = get_detection_settings(project_id)
+    index = SpanIndex(spans)
     detectors = {
-        DetectorType.DUPLICATE_SPANS: DuplicateSpanDetector(detection_settings, data),
-        DetectorType.DUPLICATE_SPANS_HASH: DuplicateSpanHashDetector(detection_settings, data),
-        DetectorType.SLOW_SPAN: SlowSpanDetector(detection_settings, data),
-        DetectorType.SEQUENTIAL_SLOW_SPANS: SequentialSlowSpanDetector(detection_settings, data),
-        DetectorType.LONG_TASK_SPANS: LongTaskSpanDetector(detection_settings, data),
+        DetectorType.DUPLICATE_SPANS: DuplicateSpanDetector(detection_settings, data, index),
+        DetectorType.DUPLICATE_SPANS_HASH: DuplicateSpanHashDetector(
+            detection_settings, data, index
+        ),
+        DetectorType.SLOW_SPAN: SlowSpanDetector(detection_settings, data, index),
+        DetectorType.SEQUENTIAL_SLOW_SPANS: SequentialSlowSpanDetector(
+            detection_settings, data, index
+        ),
+        DetectorType.LONG_TASK_SPANS: LongTaskSpanDetector(detection_settings, data, index),
         DetectorType.RENDER_BLOCKING_ASSET_SPAN: RenderBlockingAssetSpanDetector(
-            detection_settings, data
+            detection_settings, data, index
         ),
-        DetectorType.N_PLUS_ONE_SPANS: NPlusOneSpanDetector(detection_settings, data),
-        DetectorType.N_PLUS_ONE_DB_QUERIES: NPlusOneDBSpanDetector(detection_settings, data),
+        DetectorType.N_PLUS_ONE_SPANS: NPlusOneSpanDetector(detection_settings, data, index),
+        DetectorType.N_PLUS_ONE_DB_QUERIES: NPlusOneDBSpanDetector(detection_settings, data, index),
         DetectorType.N_PLUS_ONE_DB_QUERIES_EXTENDED: NPlusOneDBSpanDetectorExtended(
-            detection_settings, data
+            detection_settings, data, index
         ),
         DetectorType.N_PLUS_ONE_DB_QUERIES_NO_REDIS: NPlusOneDBSpanDetectorWithoutRedis(
-            detection_settings, data
+            detection_settings, data, index
         ),
         DetectorType.N_PLUS_ONE_DB_QUERIES_PARAMETERIZED: NPlusOneDBSpanDetectorWithoutUnparameterizedQueries(
-            detection_settings, data
+            detection_settings, data, index
         ),
     }
 
-    for span in spans:
-        for _, detector in detectors.items():
-            detector.visit_span(span)
+    # Detectors don't share any state, so each of them walks its own view of
+    # the spans.
     for _, detector in detectors.items():
+        for span in detector.get_spans():
+            detector.visit_span(span)
         detector.on_complete()
 
     # Metrics reporting only for detection, not created issues.
@@ -444,14 +450,83 @@ def get_span_duration(span: Span):
     )
 
 
+class SpanIndex:
+    """
+    The spans of a transaction, indexed once for all detectors.
+
+    Spans are bucketed by their op, so that detectors only visit the spans
+    with the ops they are interested in (see ``PerformanceDetector.get_spans``)
+    instead of every span of the transaction. Views always return spans in
+    the order of the transaction, which detectors rely on. Durations and
+    fingerprints are computed at most once per span.
+    """
+
+    def __init__(self, spans: Sequence[Span]):
+        self.spans = spans
+        self._positions = {id(span): position for position, span in enumerate(spans)}
+        # Spans without an op are ignored by all detectors.
+        self._positions_by_op: Dict[str, List[int]] = {}
+        for position, span in enumerate(spans):
+            op = span.get("op", None)
+            if op:
+                self._positions_by_op.setdefault(op, []).append(position)
+        self._durations: List[Optional[timedelta]] = [None] * len(spans)
+        self._fingerprints: Dict[int, Optional[str]] = {}
+        self._views: Dict[Any, Sequence[Span]] = {}
+
+    def _view(self, key: Any, ops: Sequence[str]) -> Sequence[Span]:
+        view = self._views.get(key)
+        if view is None:
+            positions = sorted(
+                position for op in ops for position in self._positions_by_op.get(op, ())
+            )
+            view = self._views[key] = [self.spans[position] for position in positions]
+        return view
+
+    def spans_with_op(self, ops: Optional[Sequence[str]] = None) -> Sequence[Span]:
+        """Spans with one of the ``ops``, or with any op if ``ops`` is ``None``."""
+        if ops is None:
+            return self._view(None, list(self._positions_by_op))
+        ops = tuple(ops)
+        return self._view(("op", ops), ops)
+
+    def spans_with_op_prefix(self, prefixes: Sequence[str]) -> Sequence[Span]:
+        """Spans with an op that starts with one of the ``prefixes``."""
+        prefixes = tuple(prefixes)
+        return self._view(
+            ("prefix", prefixes),
+            [op for op in self._positions_by_op if op.startswith(prefixes)],
+        )
+
+    def get_duration(self, span: Span) -> timedelta:
+        position = self._positions.get(id(span))
+        if position is None:
+            return get_span_duration(span)
+        duration = self._durations[position]
+        if duration is None:
+            duration = self._durations[position] = get_span_duration(span)
+        return duration
+
+    def get_fingerprint(self, span: Span) -> Optional[str]:
+        position = self._positions.get(id(span))
+        if position is None:
+            return fingerprint_span(span)
+        if position not in self._fingerprints:
+            self._fingerprints[position] = fingerprint_span(span)
+        return self._fingerprints[position]
+
+
 class PerformanceDetector(ABC):
     """
-    Classes of this type have their visit functions called as the event is walked once and will store a performance issue if one is detected.
+    Classes of this type have their visit functions called with the spans of ``get_spans`` and will store a performance issue if one is detected.
     """
 
-    def __init__(self, settings: Dict[str, Any], event: Event):
+    def __init__(self, settings: Dict[str, Any], event: Event, index: Optional[SpanIndex] = None):
         self.settings = settings[self.settings_key]
         self._event = event
+        self.index = index if index is not None else SpanIndex(event.get("spans", []))
+        # op -> (op prefix, setting) of the first matching setting, or None
+        self._settings_by_op: Dict[str, Optional[Tuple[Any, Dict[str, Any]]]] = {}
         self.init()
 
     @abstractmethod
@@ -470,12 +545,33 @@ class PerformanceDetector(ABC):
         if not op or not span_id:
             return None
 
-        span_duration = get_span_duration(span)
+        if op not in self._settings_by_op:
+            self._settings_by_op[op] = None
+            for setting in self.settings:
+                op_prefix = self.find_span_prefix(setting, op)
+                if op_prefix:
+                    self._settings_by_op[op] = (op_prefix, setting)
+                    break
+
+        op_settings = self._settings_by_op[op]
+        if op_settings is None:
+            return None
+        op_prefix, setting = op_settings
+        return op, span_id, op_prefix, self.index.get_duration(span), setting
+
+    def get_spans(self) -> Sequence[Span]:
+        """
+        Returns the spans ``visit_span`` is called with. By default these are
+        the spans matching the allowed span ops of the settings, spans that
+        don't match any are skipped by ``settings_for_span`` anyway.
+        """
+        prefixes = []
         for setting in self.settings:
-            op_prefix = self.find_span_prefix(setting, op)
-            if op_prefix:
-                return op, span_id, op_prefix, span_duration, setting
-        return None
+            allowed_span_ops = setting.get("allowed_span_ops", [])
+            if len(allowed_span_ops) <= 0:
+                return self.index.spans_with_op()
+            prefixes.extend(allowed_span_ops)
+        return self.index.spans_with_op_prefix(prefixes)
 
     def event(self) -> Event:
         return self._event
@@ -520,7 +616,7 @@ class DuplicateSpanDetector(PerformanceDetector):
         duplicate_count_threshold = settings.get("count")
         duplicate_duration_threshold = settings.get("cumulative_duration")
 
-        fingerprint = fingerprint_span(span)
+        fingerprint = self.index.get_fingerprint(span)
         if not fingerprint:
             return
 
@@ -610,7 +706,7 @@ class SlowSpanDetector(PerformanceDetector):
         op, span_id, op_prefix, span_duration, settings = settings_for_span
         duration_threshold = settings.get("duration_threshold")
 
-        fingerprint = fingerprint_span(span)
+        fingerprint = self.index.get_fingerprint(span)
 
         if not fingerprint:
             return
@@ -710,11 +806,10 @@ class LongTaskSpanDetector(PerformanceDetector):
         op, span_id, op_prefix, span_duration, settings = settings_for_span
         duration_threshold = settings.get("cumulative_duration")
 
-        fingerprint = fingerprint_span(span)
+        fingerprint = self.index.get_fingerprint(span)
         if not fingerprint:
             return
 
-        span_duration = get_span_duration(span)
         self.cumulative_duration += span_duration
         self.spans_involved.append(span_id)
 
@@ -761,7 +856,7 @@ class RenderBlockingAssetSpanDetector(PerformanceDetector):
 
         if self._is_blocking_render(span):
             span_id = span.get("span_id", None)
-            fingerprint = fingerprint_span(span)
+            fingerprint = self.index.get_fingerprint(span)
             if span_id and fingerprint:
                 self.stored_problems[fingerprint] = PerformanceSpanProblem(span_id, op, [span_id])
 
@@ -773,13 +868,18 @@ class RenderBlockingAssetSpanDetector(PerformanceDetector):
             # Early return for all future span visits.
             self.fcp = None
 
+    def get_spans(self) -> Sequence[Span]:
+        if not self.fcp:
+            return []
+        return self.index.spans_with_op(self.settings.get("allowed_span_ops"))
+
     def _is_blocking_render(self, span):
         span_end_timestamp = timedelta(seconds=span.get("timestamp", 0))
         fcp_timestamp = self.transaction_start + self.fcp
         if span_end_timestamp >= fcp_timestamp:
             return False
 
-        span_duration = get_span_duration(span)
+        span_duration = self.index.get_duration(span)
         fcp_ratio_threshold = self.settings.get("fcp_ratio_threshold")
         return span_duration / self.fcp > fcp_ratio_threshold
 
@@ -933,6 +1033,10 @@ class NPlusOneDBSpanDetector(PerformanceDetector):
                 self.source_span = None
                 self._maybe_use_as_source(span)
 
+    def get_spans(self) -> Sequence[Span]:
+        # Spans of any op break up the N+1 that is being tracked.
+        return self.index.spans_with_op()
+
     def on_complete(self) -> None:
         self._maybe_store_problem()
 
@@ -1000,7 +1104,7 @@ class NPlusOneDBSpanDetector(PerformanceDetector):
         # Do the spans take enough total time?
         total_duration = timedelta()
         for span in self.n_spans:
-            total_duration += get_span_duration(span)
+            total_duration += self.index.get_duration(span)
         if total_duration < duration_threshold:
             return
 
@@ -1,3 +1,4 @@
+import dataclasses
 import functools
 import logging
 import os
@@ -9,6 +10,7 @@ from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from copy import deepcopy
 from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
 from hashlib import sha1
 from typing import Any, Callable, List, Mapping, MutableMapping, Optional, Sequence, Tuple, Union
 from urllib.parse import urlparse
@@ -20,9 +22,11 @@ from dateutil.parser import parse as parse_datetime
 from django.conf import settings
 from django.core.cache import cache
 from sentry_sdk import Hub
-from snuba_sdk import Request
+from snuba_sdk import Condition, Request
 from snuba_sdk.legacy import json_to_snql
 
+from sentry import options
+from sentry.locks import locks
 from sentry.models import (
     Environment,
     Group,
@@ -39,6 +43,7 @@ from sentry.snuba.events import Columns
 from sentry.snuba.referrer import validate_referrer
 from sentry.utils import json, metrics
 from sentry.utils.dates import outside_retention_with_modified_start, to_timestamp
+from sentry.utils.locking import UnableToAcquireLock
 
 logger = logging.getLogger(__name__)
 
@@ -356,6 +361,9 @@ _snuba_pool = connection_from_url(
     maxsize=10,
 )
 _query_thread_pool = ThreadPoolExecutor(max_workers=10)
+# Refreshes stale query cache entries in the background, see
+# ``_apply_coalescing_cache``.
+_revalidation_thread_pool = ThreadPoolExecutor(max_workers=2)
 
 
 epoch_naive = datetime(1970, 1, 1, tzinfo=None)
@@ -752,6 +760,23 @@ def _apply_cache_and_build_results(
     # Store the original position of the query so that we can maintain the order
     query_param_list = list(enumerate(snuba_param_list))
 
+    if use_cache and options.get("snuba.query-cache.coalescing"):
+        results = _apply_coalescing_cache(query_param_list, referrer, headers)
+    else:
+        results = _apply_cache(query_param_list, referrer, headers, use_cache)
+
+    # Sort so that we get the results back in the original param list order
+    results.sort()
+    # Drop the sort order val
+    return [result[1] for result in results]
+
+
+def _apply_cache(
+    query_param_list: Sequence[Tuple[int, SnubaQueryBody]],
+    referrer: Optional[str],
+    headers: Mapping[str, str],
+    use_cache: Optional[bool],
+) -> List[Tuple[int, Mapping[str, Any]]]:
     results = []
 
     if use_cache:
@@ -777,10 +802,191 @@ def _apply_cache_and_build_results(
                 cache.set(cache_key, json.dumps(result), settings.SENTRY_SNUBA_CACHE_TTL_SECONDS)
             results.append((query_pos, result))
 
-    # Sort so that we get the results back in the original param list order
-    results.sort()
-    # Drop the sort order val
-    return [result[1] for result in results]
+    return results
+
+
+def _floor_datetime(value: datetime, bucket: int) -> datetime:
+    if value.tzinfo is None:
+        timestamp = value.replace(tzinfo=dt_timezone.utc).timestamp()
+    else:
+        timestamp = value.timestamp()
+    return value - timedelta(seconds=timestamp % bucket)
+
+
+def _normalize_time_range(query: SnubaQuery, bucket: int) -> SnubaQuery:
+    """
+    Floors the time range of a query to multiples of ``bucket`` seconds, so
+    that queries over a sliding window (e.g. "the last 24 hours") share cache
+    entries for the duration of a bucket. This shifts the window by up to one
+    bucket into the past.
+    """
+    if isinstance(query, Request):
+        where = [
+            dataclasses.replace(condition, rhs=_floor_datetime(condition.rhs, bucket))
+            if isinstance(condition, Condition) and isinstance(condition.rhs, datetime)
+            else condition
+            for condition in query.query.where or ()
+        ]
+        return dataclasses.replace(query, query=query.query.set_where(where))
+
+    query = dict(query)
+    for key in ("from_date", "to_date"):
+        if key in query:
+            query[key] = _floor_datetime(parse_datetime(query[key]), bucket).isoformat()
+    return query
+
+
+def _get_cache_entries(cache_keys: Sequence[str]) -> Mapping[str, Tuple[float, Any]]:
+    """
+    Returns ``(stored_at, result)`` for the cache keys that have an entry.
+    """
+    return {key: tuple(json.loads(entry)) for key, entry in cache.get_many(cache_keys).items()}
+
+
+def _set_cache_entry(cache_key: str, result: Any, timeout: int) -> None:
+    cache.set(cache_key, json.dumps([time.time(), result]), timeout)
+
+
+def _revalidate_cache_entries(
+    to_revalidate: Sequence[Tuple[SnubaQueryBody, str, Any]],
+    headers: Mapping[str, str],
+    timeout: int,
+) -> None:
+    try:
+        query_results = _bulk_snuba_query([params for params, _, _ in to_revalidate], headers)
+        for result, (_, cache_key, _) in zip(query_results, to_revalidate):
+            _set_cache_entry(cache_key, result, timeout)
+    except Exception:
+        logger.warning("snuba.query_cache.revalidation-failed", exc_info=True)
+    finally:
+        for _, _, lock in to_revalidate:
+            lock.release()
+
+
+def _apply_coalescing_cache(
+    query_param_list: Sequence[Tuple[int, SnubaQueryBody]],
+    referrer: Optional[str],
+    headers: Mapping[str, str],
+) -> List[Tuple[int, Mapping[str, Any]]]:
+    """
+    A query cache that protects Snuba from stampedes when popular queries
+    expire:
+
+    * Entries older than ``SENTRY_SNUBA_CACHE_TTL_SECONDS`` are still served
+      during the stale-while-revalidate window of the referrer, while a single
+      process refreshes them in the background.
+    * Only one process runs a query that is missing from the cache. Others
+      running the same query wait for its result to appear in the cache
+      instead of querying Snuba themselves.
+    * Time ranges can be normalized into buckets per referrer, so that queries
+      over sliding windows share cache entries.
+    """
+    metric_tags = {"referrer": referrer} if referrer else None
+    ttl = settings.SENTRY_SNUBA_CACHE_TTL_SECONDS
+    stale_window = options.get("snuba.query-cache.stale-while-revalidate").get(referrer, 0)
+    timeout = ttl + stale_window
+    bucket = options.get("snuba.query-cache.time-buckets").get(referrer)
+    coalescing_timeout = options.get("snuba.query-cache.coalescing-timeout")
+
+    if bucket:
+        query_param_list = [
+            (query_pos, (_normalize_time_range(query, bucket), forward, reverse))
+            for query_pos, (query, forward, reverse) in query_param_list
+        ]
+
+    def get_lock(cache_key: str):
+        return locks.get(
+            f"{cache_key}:lock", duration=int(coalescing_timeout) + 1, name="snuba_query_cache"
+        )
+
+    cache_keys = [f"{get_cache_key(query_params[0])}:c" for _, query_params in query_param_list]
+    cache_entries = _get_cache_entries(cache_keys)
+    now = time.time()
+
+    results = []
+    to_revalidate = []
+    to_query = []
+    for (query_pos, query_params), cache_key in zip(query_param_list, cache_keys):
+        entry = cache_entries.get(cache_key)
+        if entry is not None:
+            stored_at, cached_result = entry
+            if now - stored_at < ttl:
+                metrics.incr("snuba.query_cache.hit", tags=metric_tags)
+                results.append((query_pos, cached_result))
+                continue
+            if now - stored_at < timeout:
+                metrics.incr("snuba.query_cache.stale", tags=metric_tags)
+                results.append((query_pos, cached_result))
+                lock = get_lock(cache_key)
+                try:
+                    lock.acquire()
+                except UnableToAcquireLock:
+                    # Another process is already revalidating this entry.
+                    pass
+                else:
+                    to_revalidate.append((query_params, cache_key, lock))
+                continue
+
+        metrics.incr("snuba.query_cache.miss", tags=metric_tags)
+        to_query.append((query_pos, query_params, cache_key))
+
+    if to_revalidate:
+        _revalidation_thread_pool.submit(_revalidate_cache_entries, to_revalidate, headers, timeout)
+
+    leaders = []
+    waiters = []
+    for query_pos, query_params, cache_key in to_query:
+        lock = get_lock(cache_key)
+        try:
+            lock.acquire()
+        except UnableToAcquireLock:
+            waiters.append((query_pos, query_params, cache_key, lock))
+        else:
+            leaders.append((query_pos, query_params, cache_key, lock))
+
+    if leaders:
+        try:
+            query_results = _bulk_snuba_query([item[1] for item in leaders], headers)
+            for result, (query_pos, _, cache_key, _) in zip(query_results, leaders):
+                _set_cache_entry(cache_key, result, timeout)
+                results.append((query_pos, result))
+        finally:
+            for _, _, _, lock in leaders:
+                lock.release()
+
+    # Wait for the processes holding the locks to store their results. If a
+    # lock is released without a result (the query failed) or the wait times
+    # out, the query is run without coalescing.
+    deadline = time.monotonic() + coalescing_timeout
+    while waiters:
+        cache_entries = _get_cache_entries([item[2] for item in waiters])
+        pending = []
+        uncoalesced = []
+        for waiter in waiters:
+            query_pos, _, cache_key, lock = waiter
+            entry = cache_entries.get(cache_key)
+            if entry is not None and time.time() - entry[0] < ttl:
+                metrics.incr("snuba.query_cache.coalesced", tags=metric_tags)
+                results.append((query_pos, entry[1]))
+            elif time.monotonic() >= deadline or not lock.locked():
+                uncoalesced.append(waiter)
+            else:
+                pending.append(waiter)
+
+        if uncoalesced:
+            metrics.incr(
+                "snuba.query_cache.coalescing_failed", amount=len(uncoalesced), tags=metric_tags
+            )
+            query_results = _bulk_snuba_query([item[1] for item in uncoalesced], headers)
+            for result, (query_pos, _, cache_key, _) in zip(query_results, uncoalesced):
+                _set_cache_entry(cache_key, result, timeout)
+                results.append((query_pos, result))
+
+        waiters = pending
+        if waiters:
+            time.sleep(0.05)
+
+    return results
 
 
 def _bulk_snuba_query(
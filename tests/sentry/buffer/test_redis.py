@@ -1,7 +1,9 @@
 import pickle
 from datetime import datetime
+from time import time
 from unittest import mock
 
+import pytest
 from django.utils import timezone
 from django.utils.encoding import force_text
 from freezegun import freeze_time
@@ -11,6 +13,10 @@ from sentry.models import Group, Project
 from sentry.testutils import TestCase
 
 
+def _unleased(client, pending_key):
+    return client.zrangebyscore(pending_key, "-inf", time())
+
+
 class RedisBufferTest(TestCase):
     def setUp(self):
         self.buf = RedisBuffer()
@@ -31,7 +37,7 @@ class RedisBufferTest(TestCase):
         assert len(process_incr.apply_async.mock_calls) == 1
         process_incr.apply_async.assert_any_call(kwargs={"batch_keys": ["foo", "bar"]})
         client = self.buf.cluster.get_routing_client()
-        assert client.zrange("b:p", 0, -1) == []
+        assert _unleased(client, "b:p") == []
 
     @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
     @mock.patch("sentry.buffer.redis.process_incr")
@@ -44,7 +50,7 @@ class RedisBufferTest(TestCase):
         process_incr.apply_async.assert_any_call(kwargs={"batch_keys": ["foo", "bar"]})
         process_incr.apply_async.assert_any_call(kwargs={"batch_keys": ["baz"]})
         client = self.buf.cluster.get_routing_client()
-        assert client.zrange("b:p", 0, -1) == []
+        assert _unleased(client, "b:p") == []
 
     @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
     @mock.patch("sentry.buffer.base.Buffer.process")
@@ -173,15 +179,15 @@ class RedisBufferTest(TestCase):
 
         # Confirm that we've only processed the unpartitioned buffer
         client = self.buf.cluster.get_routing_client()
-        assert client.zrange("b:p", 0, -1) == []
-        assert client.zrange("b:p:0", 0, -1) != []
-        assert client.zrange("b:p:1", 0, -1) != []
+        assert _unleased(client, "b:p") == []
+        assert _unleased(client, "b:p:0") != []
+        assert _unleased(client, "b:p:1") != []
 
         # partition 0
         self.buf.process_pending(partition=0)
         assert len(process_incr.apply_async.mock_calls) == 2
         process_incr.apply_async.assert_any_call(kwargs={"batch_keys": ["foo"]})
-        assert client.zrange("b:p:0", 0, -1) == []
+        assert _unleased(client, "b:p:0") == []
 
         # Make sure we didn't queue up more
         assert len(process_pending.apply_async.mock_calls) == 2
@@ -190,7 +196,7 @@ class RedisBufferTest(TestCase):
         self.buf.process_pending(partition=1)
         assert len(process_incr.apply_async.mock_calls) == 3
         process_incr.apply_async.assert_any_call(kwargs={"batch_keys": ["bar"]})
-        assert client.zrange("b:p:1", 0, -1) == []
+        assert _unleased(client, "b:p:1") == []
 
         # Make sure we didn't queue up more
         assert len(process_pending.apply_async.mock_calls) == 2
@@ -211,6 +217,242 @@ class RedisBufferTest(TestCase):
         self.buf.process("foo")
         process.assert_called_once_with(mock.Mock, {"times_seen": 1}, {"pk": 1}, {}, True)
 
+    @mock.patch("sentry.buffer.redis.RedisBuffer._ensure_local_buffer_flusher", mock.Mock())
+    def test_incr_local_buffer_coalesces(self):
+        buf = RedisBuffer(local_buffer_size=10, local_buffer_flush_interval=3600)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        filters = {"pk": 1}
+        key = buf._make_key(model, filters=filters)
+
+        buf.incr(model, {"times_seen": 1}, filters, extra={"foo": "bar"})
+        buf.incr(model, {"times_seen": 2}, filters, extra={"foo": "baz"}, signal_only=True)
+
+        # nothing has been written yet, but reads include the local increments
+        assert client.hgetall(key) == {}
+        assert buf.get(model, ["times_seen"], filters=filters) == {"times_seen": 3}
+
+        buf.flush_local_buffer()
+        result = {force_text(k): v for k, v in client.hgetall(key).items()}
+        assert pickle.loads(result.pop("f")) == filters
+        assert pickle.loads(result.pop("e+foo")) == "baz"
+        assert result == {"i+times_seen": b"3", "m": b"unittest.mock.Mock", "s": b"1"}
+        assert client.zrange("b:p", 0, -1) == [key.encode("utf-8")]
+        assert buf.get(model, ["times_seen"], filters=filters) == {"times_seen": 3}
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._ensure_local_buffer_flusher", mock.Mock())
+    def test_incr_local_buffer_flushes_on_size(self):
+        buf = RedisBuffer(local_buffer_size=2, local_buffer_flush_interval=3600)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+
+        buf.incr(model, {"times_seen": 1}, {"pk": 1})
+        buf.incr(model, {"times_seen": 1}, {"pk": 1})
+        assert client.zrange("b:p", 0, -1) == []
+
+        buf.incr(model, {"times_seen": 1}, {"pk": 2})
+        assert sorted(client.zrange("b:p", 0, -1)) == sorted(
+            [
+                buf._make_key(model, {"pk": 1}).encode("utf-8"),
+                buf._make_key(model, {"pk": 2}).encode("utf-8"),
+            ]
+        )
+        assert client.hget(buf._make_key(model, {"pk": 1}), "i+times_seen") == b"2"
+        assert client.hget(buf._make_key(model, {"pk": 2}), "i+times_seen") == b"1"
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._ensure_local_buffer_flusher", mock.Mock())
+    def test_incr_local_buffer_flushes_on_interval(self):
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        with freeze_time("2000-01-01") as frozen_time:
+            buf = RedisBuffer(local_buffer_size=100, local_buffer_flush_interval=5)
+            client = buf.cluster.get_routing_client()
+            buf.incr(model, {"times_seen": 1}, {"pk": 1})
+            assert client.zrange("b:p", 0, -1) == []
+
+            frozen_time.tick(6)
+            buf.incr(model, {"times_seen": 1}, {"pk": 1})
+            assert client.hget(buf._make_key(model, {"pk": 1}), "i+times_seen") == b"2"
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._ensure_local_buffer_flusher", mock.Mock())
+    def test_incr_local_buffer_restores_failed_flush(self):
+        buf = RedisBuffer(local_buffer_size=10, local_buffer_flush_interval=3600)
+        client = buf.cluster.get_routing_client()
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        filters = {"pk": 1}
+        key = buf._make_key(model, filters=filters)
+
+        buf.incr(model, {"times_seen": 2}, filters, extra={"foo": "bar"})
+        with mock.patch.object(buf, "_write_incr", side_effect=ConnectionError):
+            buf.flush_local_buffer()
+        assert client.hgetall(key) == {}
+        assert buf.get(model, ["times_seen"], filters=filters) == {"times_seen": 2}
+
+        buf.incr(model, {"times_seen": 1}, filters, extra={"foo": "baz"})
+        buf.flush_local_buffer()
+        assert client.hget(key, "i+times_seen") == b"3"
+        assert pickle.loads(client.hget(key, "e+foo")) == "baz"
+
+        # nothing is kept around for a flush that never comes
+        buf.incr(model, {"times_seen": 1}, filters)
+        with mock.patch.object(buf, "_write_incr", side_effect=ConnectionError):
+            buf.flush_local_buffer(reason="shutdown")
+        assert buf._local_buffer == {}
+
+    @mock.patch("sentry.buffer.redis.process_incr")
+    def test_process_pending_leases_keys(self, process_incr):
+        self.buf.incr_batch_size = 5
+        with self.buf.cluster.map() as client:
+            client.zadd("b:p", {"foo": 1, "bar": 2})
+        self.buf.process_pending()
+        process_incr.apply_async.assert_called_once_with(kwargs={"batch_keys": ["foo", "bar"]})
+
+        # keys are still pending, but leased until they are processed
+        client = self.buf.cluster.get_routing_client()
+        assert sorted(client.zrange("b:p", 0, -1)) == [b"bar", b"foo"]
+        assert _unleased(client, "b:p") == []
+
+        # a second run does not hand out leased keys again
+        self.buf.process_pending()
+        assert len(process_incr.apply_async.mock_calls) == 1
+
+        # until the lease expires
+        expired = time() + self.buf.pending_lease_duration + 1
+        with mock.patch("sentry.buffer.redis.time", mock.Mock(return_value=expired)):
+            self.buf.process_pending()
+        assert len(process_incr.apply_async.mock_calls) == 2
+
+    @mock.patch("sentry.buffer.redis.process_incr")
+    def test_process_pending_lease_limit(self, process_incr):
+        self.buf.incr_batch_size = 10
+        self.buf.pending_lease_batch_size = 2
+        self.buf.pending_lease_limit = 3
+        with self.buf.cluster.map() as client:
+            client.zadd("b:p", {"foo": 1, "bar": 2, "baz": 3, "qux": 4})
+        self.buf.process_pending()
+        process_incr.apply_async.assert_called_once_with(
+            kwargs={"batch_keys": ["foo", "bar", "baz"]}
+        )
+        client = self.buf.cluster.get_routing_client()
+        assert _unleased(client, "b:p") == [b"qux"]
+
+    def test_process_batch_bulk_updates_groups(self):
+        other_group = self.create_group(project=self.project)
+        orig_times_seen = self.group.times_seen
+        last_seen = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
+        self.buf.incr(Group, {"times_seen": 2}, {"id": self.group.id}, {"last_seen": last_seen})
+        self.buf.incr(Group, {"times_seen": 3}, {"id": other_group.id}, {"last_seen": last_seen})
+        self.buf.incr(Group, {"times_seen": 4}, {"id": 0}, {"last_seen": last_seen})
+
+        keys = [
+            self.buf._make_key(Group, {"id": self.group.id}),
+            self.buf._make_key(Group, {"id": other_group.id}),
+            self.buf._make_key(Group, {"id": 0}),
+        ]
+        with mock.patch("sentry.buffer.base.Buffer.process") as process:
+            self.buf.process(batch_keys=keys)
+        # only the group that does not exist falls back to the slow path
+        process.assert_called_once_with(
+            self.buf, Group, {"times_seen": 4}, {"id": 0}, {"last_seen": last_seen}, None
+        )
+
+        group = Group.objects.get_from_cache(id=self.group.id)
+        assert group.times_seen == orig_times_seen + 2
+        assert group.last_seen == last_seen
+        assert Group.objects.get(id=other_group.id).times_seen == other_group.times_seen + 3
+
+        client = self.buf.cluster.get_routing_client()
+        assert client.zrange("b:p", 0, -1) == []
+        assert not any(client.exists(key) for key in keys)
+
+    def test_process_batch_keeps_keys_on_failure(self):
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        keys = [self.buf._make_key(model, {"pk": 1}), self.buf._make_key(model, {"pk": 2})]
+        self.buf.incr(model, {"times_seen": 1}, {"pk": 1})
+        self.buf.incr(model, {"times_seen": 1}, {"pk": 2})
+
+        with mock.patch(
+            "sentry.buffer.base.Buffer.process_batch", side_effect=ValueError
+        ), pytest.raises(ValueError):
+            self.buf.process(batch_keys=keys)
+
+        client = self.buf.cluster.get_routing_client()
+        assert sorted(client.zrange("b:p", 0, -1)) == sorted(k.encode("utf-8") for k in keys)
+        assert [client.hget(key, "i+times_seen") for key in keys] == [b"1", b"1"]
+
+    def test_process_batch_keeps_concurrent_increments(self):
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        keys = [self.buf._make_key(model, {"pk": 1}), self.buf._make_key(model, {"pk": 2})]
+        self.buf.incr(model, {"times_seen": 2}, {"pk": 1})
+        self.buf.incr(model, {"times_seen": 1}, {"pk": 2})
+
+        def process_batch(batch):
+            assert sorted(columns["times_seen"] for _, columns, _, _, _ in batch) == [1, 2]
+            self.buf.incr(model, {"times_seen": 3}, {"pk": 1})
+
+        with mock.patch("sentry.buffer.base.Buffer.process_batch", side_effect=process_batch):
+            self.buf.process(batch_keys=keys)
+
+        # only the increment that has not been applied yet is left
+        client = self.buf.cluster.get_routing_client()
+        assert client.zrange("b:p", 0, -1) == [keys[0].encode("utf-8")]
+        assert client.hget(keys[0], "i+times_seen") == b"3"
+        assert not client.exists(keys[1])
+        assert not client.exists(*(self.buf._make_lock_key(key) for key in keys))
+
+    def test_process_batch_leaves_keys_of_expired_locks(self):
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        keys = [self.buf._make_key(model, {"pk": 1}), self.buf._make_key(model, {"pk": 2})]
+        self.buf.incr(model, {"times_seen": 1}, {"pk": 1})
+        self.buf.incr(model, {"times_seen": 1}, {"pk": 2})
+        client = self.buf.cluster.get_routing_client()
+        lock_key = self.buf._make_lock_key(keys[0])
+
+        def process_batch(batch):
+            # the lock expires and another flusher processes the key
+            client.set(lock_key, "other")
+            client.delete(keys[0])
+
+        with mock.patch("sentry.buffer.base.Buffer.process_batch", side_effect=process_batch):
+            self.buf.process(batch_keys=keys)
+
+        assert not client.exists(keys[0])
+        assert client.get(lock_key) == b"other"
+        assert client.zrange("b:p", 0, -1) == [keys[0].encode("utf-8")]
+        assert not client.exists(keys[1])
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
+    def test_process_removes_empty_keys(self):
+        client = self.buf.cluster.get_routing_client()
+        client.zadd("b:p", {"foo": 1})
+        with mock.patch("sentry.buffer.base.Buffer.process") as process:
+            self.buf.process("foo")
+        assert not process.called
+        assert client.zrange("b:p", 0, -1) == []
+        assert not client.exists("l:foo")
+
+    def test_process_single_keeps_key_on_failure(self):
+        model = mock.Mock()
+        model.__name__ = "Mock"
+        key = self.buf._make_key(model, {"pk": 1})
+        self.buf.incr(model, {"times_seen": 1}, {"pk": 1})
+
+        with mock.patch("sentry.buffer.base.Buffer.process", side_effect=ValueError), pytest.raises(
+            ValueError
+        ):
+            self.buf.process(key)
+
+        client = self.buf.cluster.get_routing_client()
+        assert client.zrange("b:p", 0, -1) == [key.encode("utf-8")]
+        assert client.hget(key, "i+times_seen") == b"1"
+        assert not client.exists(self.buf._make_lock_key(key))
+
 
 #    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
 #    def test_incr_uses_signal_only(self):
@@ -21,3 +21,9 @@ class RedisCacheTest(TestCase):
 
         with pytest.raises(ValueTooLarge):
             self.backend.set("foo", "x" * (RedisCache.max_size + 1), 0)
+
+    def test_set_many(self):
+        self.backend.set_many([("foo", {"foo": "bar"}), ("bar", "baz")], 50)
+
+        assert self.backend.get("foo") == {"foo": "bar"}
+        assert self.backend.get("bar") == "baz"
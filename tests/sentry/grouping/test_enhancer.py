@@ -1,7 +1,12 @@
 import pytest
 
 from sentry.grouping.component import GroupingComponent
-from sentry.grouping.enhancer import Enhancements, InvalidEnhancerConfig, create_match_frame
+from sentry.grouping.enhancer import (
+    ENHANCEMENT_BASES,
+    Enhancements,
+    InvalidEnhancerConfig,
+    create_match_frame,
+)
 
 
 def dump_obj(obj):
@@ -11,7 +16,7 @@ def dump_obj(obj):
     for (key, value) in obj.__dict__.items():
         if key.startswith("_"):
             continue
-        elif isinstance(value, list):
+        elif isinstance(value, (list, tuple)):
             rv[key] = [dump_obj(x) for x in value]
         elif isinstance(value, dict):
             rv[key] = {k: dump_obj(v) for k, v in value.items()}
@@ -22,7 +27,7 @@ def dump_obj(obj):
 
 @pytest.mark.parametrize("version", [1, 2])
 def test_basic_parsing(insta_snapshot, version):
-    enhancement = Enhancements.from_config_string(
+    parsed = Enhancements.from_config_string(
         """
 # This is a config
 path:*/code/game/whatever/*                     +app
@@ -38,7 +43,8 @@ family:native                                   max-frames=3
 """,
         bases=["common:v1"],
     )
-    enhancement.version = version
+    # Parsed configs are shared, so set the version on a new instance.
+    enhancement = Enhancements(parsed.rules, version=version, bases=parsed.bases)
 
     dumped = enhancement.dumps()
     insta_snapshot(dump_obj(enhancement))
@@ -442,3 +448,74 @@ def test_app_no_matches(frame):
     enhancements = Enhancements.from_config_string("app:no +app")
     enhancements.apply_modifications_to_frame([frame], "native", None)
     assert frame.get("in_app")
+
+
+def _frames_for_rules(rules):
+    """Creates frames that match the frame matchers of the given rules, and
+    some variations of them that don't."""
+    frames = []
+    for rule in rules:
+        frame = {}
+        for matcher in rule.matchers:
+            matcher = getattr(matcher, "caller", matcher)
+            if matcher.key in ("function", "module", "package", "category"):
+                value = matcher.pattern.replace("**", "x/y").replace("*", "foo")
+            elif matcher.key == "path":
+                frame["abs_path"] = matcher.pattern.replace("**", "x/y").replace("*", "foo")
+                continue
+            else:
+                continue
+            if matcher.key == "category":
+                frame["data"] = {"category": value}
+            else:
+                frame[matcher.key] = value
+        frames.append(frame)
+        frames.append({key: value[1:] for key, value in frame.items() if key != "data"})
+        frames.append({key: value + "x" for key, value in frame.items() if key != "data"})
+    return frames
+
+
+@pytest.mark.parametrize("base", sorted(ENHANCEMENT_BASES))
+@pytest.mark.parametrize("platform", ["native", "javascript", "python"])
+def test_rule_index(base, platform):
+    enhancements = Enhancements(rules=[], bases=[base])
+    frames = _frames_for_rules(list(enhancements.iter_rules()))
+    match_frames = [create_match_frame(frame, platform) for frame in frames]
+    modifier_index, updater_index = enhancements._get_rule_indexes()
+
+    for rules, index in (
+        (enhancements._modifier_rules, modifier_index),
+        (enhancements._updater_rules, updater_index),
+    ):
+        for rule, frame_indices in zip(rules, index.get_candidates(match_frames)):
+            assert rule.get_matching_frame_actions(
+                match_frames, platform, None, {}, frame_indices
+            ) == rule.get_matching_frame_actions(match_frames, platform, None, {})
+
+
+def test_rule_index_is_shared():
+    enhancements = Enhancements.from_config_string(
+        """
+        family:native function:std::* -app
+        function:foo +app
+        module:*.bar -group
+        """,
+        bases=["common:2019-03-23"],
+    )
+    indexes = enhancements._get_rule_indexes()
+    assert len(indexes[0].unindexed) == 0
+    loaded = Enhancements.loads(enhancements.dumps())
+    assert all(a is b for a, b in zip(loaded._get_rule_indexes(), indexes))
+
+
+def test_parsed_configs_are_cached():
+    config = "family:native function:std::* -app"
+    enhancements = Enhancements.from_config_string(config, bases=["common:2019-03-23"])
+    assert Enhancements.from_config_string(config, bases=["common:2019-03-23"]) is enhancements
+    assert Enhancements.from_config_string(config) is not enhancements
+
+    dumped = enhancements.dumps()
+    assert Enhancements.loads(dumped) is Enhancements.loads(dumped)
+    assert isinstance(enhancements.rules, tuple)
+    assert isinstance(enhancements.bases, tuple)
+    assert all(isinstance(rule.actions, tuple) for rule in enhancements.rules)
@@ -184,3 +184,20 @@ def test_event_hash_variant(insta_snapshot, input):
             },
         }
     )
+
+
+def test_parsed_rules_are_cached():
+    config = 'type:DatabaseUnavailable -> DatabaseUnavailable title="Database"'
+    rules = FingerprintingRules.from_config_string(config)
+    assert FingerprintingRules.from_config_string(config) is rules
+    assert isinstance(rules.rules, tuple)
+
+    # Callers get their own copies of the values of the shared rules
+    event = {"exception": {"values": [{"type": "DatabaseUnavailable"}]}}
+    _, fingerprint, attributes = rules.get_fingerprint_values_for_event(event)
+    fingerprint.append("foo")
+    attributes["title"] = "foo"
+    assert rules.get_fingerprint_values_for_event(event)[1:] == (
+        ["DatabaseUnavailable"],
+        {"title": "Database"},
+    )
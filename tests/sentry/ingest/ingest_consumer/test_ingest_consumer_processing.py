@@ -1,12 +1,15 @@
 import datetime
 import time
 import uuid
-from unittest.mock import Mock
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
 
 import pytest
 
 from sentry.event_manager import EventManager
+from sentry.eventstore.processing import event_processing_store
 from sentry.ingest.ingest_consumer import (
+    IngestConsumerWorker,
     process_attachment_chunk,
     process_event,
     process_individual_attachment,
@@ -70,6 +73,85 @@ def test_deduplication_works(default_project, task_runner, preprocess_event):
     }
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize("executor", [False, True], ids=["serial", "executor"])
+def test_flush_batch_stores_events_in_chunks(
+    default_project, task_runner, preprocess_event, django_cache, settings, executor
+):
+    settings.SENTRY_INGEST_CONSUMER_STORE_BATCH_SIZE = 2
+    project_id = default_project.id
+    start_time = time.time() - 3600
+    payloads = [
+        get_normalized_event({"message": f"hello world {i}"}, default_project) for i in range(5)
+    ]
+    batch = [
+        {
+            "type": "attachment_chunk",
+            "payload": b"Hello",
+            "event_id": payloads[0]["event_id"],
+            "project_id": project_id,
+            "id": "ca90fb45-6dd9-40a0-a18f-8693aa621abb",
+            "chunk_index": 0,
+        }
+    ] + [
+        {
+            "type": "event",
+            "payload": json.dumps(payload),
+            "start_time": start_time,
+            "event_id": payload["event_id"],
+            "project_id": project_id,
+            "remote_addr": "127.0.0.1",
+        }
+        for payload in payloads
+    ]
+
+    worker = IngestConsumerWorker(ThreadPoolExecutor(2) if executor else None)
+    with patch.object(
+        event_processing_store, "store_many", wraps=event_processing_store.store_many
+    ) as store_many:
+        worker.flush_batch(batch)
+    worker.shutdown()
+
+    assert [len(call[0][0]) for call in store_many.call_args_list] == [2, 2, 1]
+    assert [kwargs["cache_key"] for kwargs in preprocess_event] == [
+        f"e:{payload['event_id']}:{project_id}" for payload in payloads
+    ]
+    for payload in payloads:
+        cache_key = f"e:{payload['event_id']}:{project_id}"
+        assert event_processing_store.get(cache_key) == payload
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("executor", [False, True], ids=["serial", "executor"])
+def test_flush_batch_deduplicates_events(
+    default_project, task_runner, preprocess_event, django_cache, settings, executor
+):
+    settings.SENTRY_INGEST_CONSUMER_STORE_BATCH_SIZE = 2
+    payload = get_normalized_event({"message": "hello world"}, default_project)
+    other_payload = get_normalized_event({"message": "hello world"}, default_project)
+    # The duplicates are in the same chunk and in the next one.
+    batch = [
+        {
+            "type": "event",
+            "payload": json.dumps(data),
+            "start_time": time.time() - 3600,
+            "event_id": data["event_id"],
+            "project_id": default_project.id,
+            "remote_addr": "127.0.0.1",
+        }
+        for data in [payload, payload, other_payload, payload]
+    ]
+
+    worker = IngestConsumerWorker(ThreadPoolExecutor(2) if executor else None)
+    worker.flush_batch(batch)
+    worker.shutdown()
+
+    assert [kwargs["event_id"] for kwargs in preprocess_event] == [
+        payload["event_id"],
+        other_payload["event_id"],
+    ]
+
+
 @pytest.mark.django_db
 def test_transactions_spawn_save_event_transaction(
     default_project,
@@ -0,0 +1,90 @@
+import unittest
+import zipfile
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+
+from sentry.lang.javascript.artifact_index import (
+    CompactArtifactIndex,
+    load_artifact_index,
+    read_archive_file,
+    write_compact_index,
+)
+from sentry.models import File
+from sentry.testutils import TestCase
+from sentry.utils import json
+
+
+def build_compact_index(index):
+    buffer = BytesIO()
+    write_compact_index(index, buffer)
+    return CompactArtifactIndex(buffer.getvalue())
+
+
+class CompactArtifactIndexTest(unittest.TestCase):
+    def test_get(self):
+        files = {f"~/static/{i}.js": {"filename": f"{i}.js", "size": i} for i in range(100)}
+        index = build_compact_index({"files": files})
+
+        assert len(index) == 100
+        for url, entry in files.items():
+            assert index.get(url) == entry
+        assert index.get("~/static/100.js") is None
+        assert index.get("") is None
+
+    def test_empty(self):
+        index = build_compact_index({})
+        assert len(index) == 0
+        assert index.get("~/foo.js") is None
+
+    @patch("sentry.lang.javascript.artifact_index.hash_url", return_value=42)
+    def test_hash_collisions(self, hash_url):
+        files = {"~/a.js": {"size": 1}, "~/b.js": {"size": 2}, "~/ü.js": {"size": 3}}
+        index = build_compact_index({"files": files})
+
+        for url, entry in files.items():
+            assert index.get(url) == entry
+        assert index.get("~/c.js") is None
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            CompactArtifactIndex(b"SAI0\0\0\0\0")
+
+
+class ReadArchiveFileTest(unittest.TestCase):
+    def test_read(self):
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, mode="w") as zip_file:
+            zip_file.writestr("stored.js", b"foo" * 100, compress_type=zipfile.ZIP_STORED)
+            zip_file.writestr("deflated.js", b"bar" * 100, compress_type=zipfile.ZIP_DEFLATED)
+            zip_file.writestr("empty.js", b"")
+
+        with zipfile.ZipFile(buffer) as zip_file:
+            for info in zip_file.infolist():
+                assert read_archive_file(buffer, info.header_offset) == zip_file.read(info)
+
+        # Not the offset of a file
+        assert read_archive_file(buffer, 1) is None
+        assert read_archive_file(buffer, len(buffer.getvalue())) is None
+
+
+class LoadArtifactIndexTest(TestCase):
+    def test_load(self):
+        files = {"~/app.js": {"filename": "app.js", "size": 3}}
+        file_ = File.objects.create(name="artifact-index.json", type="release.artifact-index")
+        file_.putfile(BytesIO(json.dumps({"files": files}).encode()))
+
+        index = load_artifact_index(self.organization.id, file_.id, file_.checksum)
+        assert index.get("~/app.js") == files["~/app.js"]
+
+        # The compact index is only built once
+        with patch("sentry.lang.javascript.artifact_index.File.objects.get") as get:
+            assert load_artifact_index(self.organization.id, file_.id, file_.checksum).get(
+                "~/app.js"
+            )
+            assert not get.called
+
+    def test_deleted(self):
+        with pytest.raises(File.DoesNotExist):
+            load_artifact_index(self.organization.id, 2**31 - 1, "0" * 40)
@@ -1,6 +1,6 @@
 from unittest import TestCase
 
-from sentry.lang.javascript.cache import SourceCache
+from sentry.lang.javascript.cache import ParsedSourceMapCache, SourceCache
 
 
 class BasicCacheTest(TestCase):
@@ -34,3 +34,31 @@ class BasicCacheTest(TestCase):
         # fall back to utf-8
         cache.add(url, "foobar".encode("utf-32"), encoding="utf-32")
         assert cache.get(url)[0] == "foobar"
+
+
+class ParsedSourceMapCacheTest(TestCase):
+    def test_eviction_by_size(self):
+        cache = ParsedSourceMapCache(max_size=10)
+        cache.add("a", "A", 4)
+        cache.add("b", "B", 4)
+        assert cache.get("a") == "A"
+
+        # "b" is the least recently used entry
+        cache.add("c", "C", 4)
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+        assert cache.get("c") == "C"
+        assert len(cache) == 2
+        assert cache.size == 8
+
+        cache.add("a", "A2", 7)
+        assert cache.get("a") == "A2"
+        assert cache.get("c") is None
+        assert cache.size == 7
+
+    def test_too_large(self):
+        cache = ParsedSourceMapCache(max_size=10)
+        cache.add("a", "A", 4)
+        cache.add("b", "B", 11)
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
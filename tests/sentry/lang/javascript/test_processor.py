@@ -1,5 +1,7 @@
+import base64
 import errno
 import re
+import threading
 import unittest
 import zipfile
 from copy import deepcopy
@@ -12,6 +14,7 @@ from requests.exceptions import RequestException
 
 from sentry import http, options
 from sentry.event_manager import get_tag
+from sentry.lang.javascript.cache import ParsedSourceMapCache
 from sentry.lang.javascript.errormapping import REACT_MAPPING_URL, rewrite_exception
 from sentry.lang.javascript.processor import (
     CACHE_CONTROL_MAX,
@@ -686,6 +689,27 @@ class FetchFileTest(TestCase):
         result2 = fetch_file("/example.js", release=release)
         assert result2 == result
 
+    def test_release_archive_read_at_offset(self):
+        compressed = BytesIO()
+        with zipfile.ZipFile(compressed, mode="w") as zip_file:
+            zip_file.writestr("example.js", b"foo", compress_type=zipfile.ZIP_DEFLATED)
+            zip_file.writestr(
+                "manifest.json", json.dumps({"files": {"example.js": {"url": "/example.js"}}})
+            )
+
+        release = Release.objects.create(version="1", organization_id=self.project.organization_id)
+        compressed.seek(0)
+        file_ = File.objects.create(name="foo", type="release.bundle")
+        file_.putfile(compressed)
+        update_artifact_index(release, None, file_)
+
+        # The file is read without opening the archive
+        with patch("sentry.lang.javascript.processor.ReleaseArchive") as archive:
+            result = fetch_file("/example.js", release=release)
+            assert not archive.called
+
+        assert result.body == b"foo"
+
     def _create_archive(self, release, url):
         pseudo_archive = File.objects.create(name="", type="release.bundle")
         pseudo_archive.putfile(BytesIO(b"0123456789"))
@@ -1151,6 +1175,38 @@ class FetchSourcemapTest(TestCase):
         with pytest.raises(UnparseableSourcemap):
             fetch_sourcemap("data:application/json;base64,xxx")
 
+    @patch("sentry.lang.javascript.processor.parsed_sourcemaps", ParsedSourceMapCache(1024))
+    def test_parsed_sourcemap_reused(self):
+        smap_view = fetch_sourcemap(base64_sourcemap, source=b"foo")
+        assert fetch_sourcemap(base64_sourcemap, source=b"foo") is smap_view
+        assert fetch_sourcemap(base64_sourcemap.rstrip("="), source=b"foo") is smap_view
+        assert fetch_sourcemap(base64_sourcemap, source=b"bar") is not smap_view
+        assert fetch_sourcemap(base64_sourcemap, use_smcache=False) is not smap_view
+
+    @patch("sentry.lang.javascript.processor.parsed_sourcemaps", ParsedSourceMapCache(1024))
+    def test_parsed_sourcemap_from_release_archive(self):
+        compressed = BytesIO()
+        with zipfile.ZipFile(compressed, mode="w") as zip_file:
+            zip_file.writestr("app.js.map", base64.b64decode(base64_sourcemap.split(",", 1)[1]))
+            zip_file.writestr(
+                "manifest.json",
+                json.dumps({"files": {"app.js.map": {"url": "/app.js.map"}}}),
+            )
+
+        release = Release.objects.create(version="1", organization_id=self.project.organization_id)
+        compressed.seek(0)
+        file_ = File.objects.create(name="foo", type="release.bundle")
+        file_.putfile(compressed)
+        update_artifact_index(release, None, file_)
+
+        with patch("sentry.lang.javascript.processor.fetch_file", wraps=fetch_file) as fetch:
+            smap_view = fetch_sourcemap("/app.js.map", release=release)
+            assert fetch.call_count == 1
+
+            # The checksum in the artifact index identifies the parsed sourcemap
+            assert fetch_sourcemap("/app.js.map", release=release) is smap_view
+            assert fetch.call_count == 1
+
     @responses.activate
     def test_garbage_json(self):
         responses.add(
@@ -1509,3 +1565,110 @@ class CacheSourceTest(TestCase):
         # now we have an error
         assert len(processor.cache.get_errors(abs_path)) == 1
         assert processor.cache.get_errors(abs_path)[0] == {"url": map_url, "type": "js_no_source"}
+
+
+def lines(source_view):
+    if source_view is None:
+        return None
+    return list(source_view[0 : len(source_view)])
+
+
+class CacheSourcesConcurrentlyTest(TestCase):
+    files = {
+        "http://example.com/a.min.js": b"a()\n//# sourceMappingURL=shared.js.map",
+        "http://example.com/b.min.js": b"b()\n//# sourceMappingURL=shared.js.map",
+        "http://example.com/c.min.js": b"c()\n//# sourceMappingURL=c.js.map",
+        "http://example.com/d.min.js": b"d()",
+    }
+
+    def fetch_file(self, url, **kwargs):
+        if url not in self.files:
+            raise http.BadSource({"type": EventError.JS_MISSING_SOURCE, "url": url})
+        return http.UrlResult(url, {}, self.files[url], 200, "utf-8")
+
+    def fetch_sourcemap(self, url, **kwargs):
+        if url == "http://example.com/c.js.map":
+            raise http.BadSource({"type": EventError.JS_INVALID_SOURCEMAP, "url": url})
+        return MagicMock(url=url)
+
+    def cache_sources(self, filenames, concurrency, max_fetches=100):
+        processor = JavaScriptStacktraceProcessor(
+            data={}, stacktrace_infos=None, project=self.project
+        )
+        processor.max_fetches = max_fetches
+
+        with patch(
+            "sentry.lang.javascript.processor.fetch_file", side_effect=self.fetch_file
+        ), patch(
+            "sentry.lang.javascript.processor.fetch_sourcemap", side_effect=self.fetch_sourcemap
+        ) as fetch_sourcemap:
+            if concurrency > 1:
+                processor.cache_sources_concurrently(filenames, concurrency)
+            else:
+                for filename in filenames:
+                    processor.cache_source(filename)
+
+        return processor, fetch_sourcemap
+
+    def test_same_as_serial(self):
+        filenames = sorted(self.files) + ["http://example.com/missing.js"]
+
+        for max_fetches in (100, 3):
+            serial, _ = self.cache_sources(filenames, 1, max_fetches)
+            concurrent, fetch_sourcemap = self.cache_sources(filenames, 4, max_fetches)
+
+            assert concurrent.fetch_count == serial.fetch_count
+            for filename in filenames:
+                assert lines(concurrent.cache.get(filename)) == lines(serial.cache.get(filename))
+                assert concurrent.cache.get_errors(filename) == serial.cache.get_errors(filename)
+                sourcemap_url, sourcemap = concurrent.sourcemaps.get_link(filename)
+                assert sourcemap_url == serial.sourcemaps.get_link(filename)[0]
+                assert getattr(sourcemap, "url", None) == sourcemap_url
+
+        # Sourcemaps shared by several files are fetched once.
+        assert [c[0][0] for c in fetch_sourcemap.call_args_list].count(
+            "http://example.com/shared.js.map"
+        ) == 1
+        assert serial.cache.get_errors("http://example.com/c.min.js") == [
+            {"type": EventError.JS_INVALID_SOURCEMAP, "url": "http://example.com/c.js.map"}
+        ]
+
+    @override_options({"processing.sourcemap-fetch-deadline": 0.1})
+    def test_deadline(self):
+        released = threading.Event()
+
+        def fetch_file(url, **kwargs):
+            if url.startswith("http://example.com/slow"):
+                released.wait(5)
+            return self.fetch_file(url.replace("slow", "a.min"))
+
+        filenames = ["http://example.com/d.min.js", "http://example.com/slow.js"]
+        self.fetch_file = fetch_file
+        try:
+            processor, _ = self.cache_sources(filenames, 2)
+        finally:
+            released.set()
+
+        assert processor.cache.get("http://example.com/d.min.js")
+        assert processor.cache.get("http://example.com/slow.js") is None
+        assert processor.cache.get_errors("http://example.com/slow.js") == [
+            {"type": EventError.FETCH_TIMEOUT, "url": "http://example.com/slow.js", "timeout": 0.1}
+        ]
+
+    @override_options({"processing.sourcemap-fetch-concurrency": 4})
+    def test_populate_source_cache(self):
+        processor = JavaScriptStacktraceProcessor(
+            data={}, stacktrace_infos=None, project=self.project
+        )
+        frames = [{"abs_path": filename} for filename in self.files]
+
+        with patch(
+            "sentry.lang.javascript.processor.fetch_file", side_effect=self.fetch_file
+        ), patch(
+            "sentry.lang.javascript.processor.fetch_sourcemap", side_effect=self.fetch_sourcemap
+        ):
+            processor.populate_source_cache(frames)
+
+        assert processor.fetch_count == len(self.files)
+        for filename in self.files:
+            assert processor.cache.get(filename)
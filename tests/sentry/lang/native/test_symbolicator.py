@@ -1,10 +1,19 @@
 import copy
+from urllib.parse import parse_qs, urlsplit
 
 import pytest
+import responses
+from django.test import override_settings
 
 from sentry.lang.native import symbolicator
-from sentry.lang.native.symbolicator import get_sources_for_project, redact_internal_sources
+from sentry.lang.native.symbolicator import (
+    Symbolicator,
+    get_sources_for_project,
+    redact_internal_sources,
+)
+from sentry.tasks.symbolication import RetrySymbolication
 from sentry.testutils.helpers import Feature
+from sentry.testutils.helpers.options import override_options
 
 CUSTOM_SOURCE_CONFIG = """
 [{
@@ -264,3 +273,64 @@ class TestAliasReversion:
         reverse_aliases = symbolicator.reverse_aliases_map(builtin_sources)
         expected = {"sentry:ios-source": "sentry:ios", "sentry:tvos-source": "sentry:ios"}
         assert reverse_aliases == expected
+
+
+class TestPolling:
+    @pytest.fixture
+    def symbolicator(self, default_project):
+        with override_options({"symbolicator.options": {"url": "http://symbolicator.test"}}):
+            return Symbolicator(project=default_project, event_id="abc")
+
+    def add_response(self, method, path, status, retry_after=None):
+        response = {"status": status, "request_id": "123"}
+        if retry_after is not None:
+            response["retry_after"] = retry_after
+        responses.add(method, f"http://symbolicator.test/{path}", json=response)
+
+    def get_query_timeouts(self):
+        return [
+            parse_qs(urlsplit(call.request.url).query)["timeout"]
+            for call in responses.calls
+            if call.request.method == "GET"
+        ]
+
+    @pytest.mark.django_db
+    @responses.activate
+    def test_pending(self, symbolicator):
+        self.add_response(responses.POST, "symbolicate", "pending", retry_after=2)
+        self.add_response(responses.GET, "requests/123", "pending", retry_after=3)
+        self.add_response(responses.GET, "requests/123", "completed")
+
+        response = symbolicator.process_payload(stacktraces=[], modules=[])
+        assert response["status"] == "completed"
+
+        # Symbolicator is asked to wait for the advertised retry_after
+        assert self.get_query_timeouts() == [["2"], ["3"]]
+
+    @pytest.mark.django_db
+    @responses.activate
+    @override_settings(SYMBOLICATOR_POLL_TIMEOUT=0.01)
+    def test_still_pending(self, symbolicator):
+        self.add_response(responses.POST, "symbolicate", "pending", retry_after=2)
+        self.add_response(responses.GET, "requests/123", "pending", retry_after=2)
+
+        with pytest.raises(RetrySymbolication) as excinfo:
+            symbolicator.process_payload(stacktraces=[], modules=[])
+        assert excinfo.value.retry_after == 0
+
+        # The task is queried, not created again
+        self.add_response(responses.GET, "requests/123", "completed")
+        responses.calls.reset()
+        response = symbolicator.process_payload(stacktraces=[], modules=[])
+        assert response["status"] == "completed"
+        assert self.get_query_timeouts()[0] == ["0"]
+
+    @pytest.mark.django_db
+    def test_pooled_session(self, symbolicator):
+        with symbolicator.sess:
+            session = symbolicator.sess.session
+        assert symbolicator.sess.session is None
+
+        # Connections are kept for the next event
+        with symbolicator.sess:
+            assert symbolicator.sess.session is session
@@ -4,6 +4,7 @@ from datetime import datetime, timezone
 from io import BytesIO
 from threading import Thread
 from time import sleep
+from unittest.mock import ANY
 from zipfile import ZipFile
 
 import pytest
@@ -155,6 +156,7 @@ class ReleaseArchiveTestCase(TestCase):
                     "filename": "bar",
                     "sha1": "62cdb7020ff920e5aa642c3d4066950dd1f01f4d",
                     "size": 3,
+                    "header_offset": ANY,
                 },
                 "fake://baz": {
                     "archive_ident": archive1.ident,
@@ -162,6 +164,7 @@ class ReleaseArchiveTestCase(TestCase):
                     "filename": "baz",
                     "sha1": "1a74885aa2771a6a0edcc80dbd0cf396dfaf1aab",
                     "size": 5,
+                    "header_offset": ANY,
                 },
                 "fake://foo": {
                     "archive_ident": archive1.ident,
@@ -169,6 +172,7 @@ class ReleaseArchiveTestCase(TestCase):
                     "filename": "foo",
                     "sha1": "0beec7b5ea3f0fdbc95d0dd47f3c5bc275da8a33",
                     "size": 3,
+                    "header_offset": ANY,
                 },
             },
         }
@@ -197,6 +201,7 @@ class ReleaseArchiveTestCase(TestCase):
                     "filename": "bar",
                     "sha1": "a5d5c1bba91fdb6c669e1ae0413820885bbfc455",
                     "size": 3,
+                    "header_offset": ANY,
                 },
                 "fake://baz": {
                     "archive_ident": archive1.ident,
@@ -204,6 +209,7 @@ class ReleaseArchiveTestCase(TestCase):
                     "filename": "baz",
                     "sha1": "1a74885aa2771a6a0edcc80dbd0cf396dfaf1aab",
                     "size": 5,
+                    "header_offset": ANY,
                 },
                 "fake://foo": {
                     "archive_ident": archive2.ident,
@@ -211,6 +217,7 @@ class ReleaseArchiveTestCase(TestCase):
                     "filename": "foo",
                     "sha1": "0beec7b5ea3f0fdbc95d0dd47f3c5bc275da8a33",
                     "size": 3,
+                    "header_offset": ANY,
                 },
                 "fake://zap": {
                     "archive_ident": archive2.ident,
@@ -218,6 +225,7 @@ class ReleaseArchiveTestCase(TestCase):
                     "filename": "zap",
                     "sha1": "a7a9c12205f9cb1f53f8b6678265c9e8158f2a8f",
                     "size": 4,
+                    "header_offset": ANY,
                 },
             },
         }
@@ -3,10 +3,13 @@ Testsuite of backend-independent nodestore tests. Add your backend to the
 `ns` fixture to have it tested.
 """
 from contextlib import nullcontext
+from unittest import mock
 
 import pytest
+from django.test import override_settings
 
 from sentry.nodestore.django.backend import DjangoNodeStorage
+from sentry.testutils.helpers import override_options
 from tests.sentry.nodestore.bigtable.test_backend import (
     MockedBigtableNodeStorage,
     get_temporary_bigtable_nodestorage,
@@ -91,3 +94,85 @@ def test_set_subkeys(ns):
     ns.delete("node_1")
     assert ns.get("node_1") is None
     assert ns.get("node_1", subkey="other") is None
+
+
+def test_set_multi(ns):
+    ns.set("node_1", {"foo": "old"})
+    ns.set_multi(
+        {
+            "node_1": {None: {"foo": "a"}},
+            "node_2": {None: {"foo": "b"}, "other": {"foo": "c"}},
+        }
+    )
+    assert ns.get_multi(["node_1", "node_2"]) == {
+        "node_1": {"foo": "a"},
+        "node_2": {"foo": "b"},
+    }
+    assert ns.get("node_2", subkey="other") == {"foo": "c"}
+
+    # nodes written in the container format are batched separately
+    with override_options({"nodestore.container-format.enabled": True}):
+        ns.set_multi({"node_3": {None: {"foo": "d"}}, "node_4": {None: {"foo": "e"}}})
+    assert ns.get_multi(["node_3", "node_4"]) == {
+        "node_3": {"foo": "d"},
+        "node_4": {"foo": "e"},
+    }
+
+
+@override_settings(SENTRY_NODESTORE_LOCAL_CACHE_BYTES=1024 * 1024)
+def test_local_cache(ns):
+    ns.set_subkeys("node_1", {None: {"foo": "a"}, "other": {"foo": "b"}})
+
+    with mock.patch.object(ns, "_get_bytes") as get_bytes, mock.patch.object(
+        ns, "_get_bytes_multi"
+    ) as get_bytes_multi:
+        assert ns.get("node_1") == {"foo": "a"}
+        assert ns.get("node_1", subkey="other") == {"foo": "b"}
+        assert ns.get("node_1", subkey="missing") is None
+        assert ns.get_multi(["node_1"], subkey="other") == {"node_1": {"foo": "b"}}
+        assert not get_bytes.called
+        assert not get_bytes_multi.called
+
+    # cached payloads are decoded by the backend, like uncached ones
+    with mock.patch.object(ns, "_decode", wraps=ns._decode) as decode:
+        assert ns.get("node_1", subkey="other") == {"foo": "b"}
+        decode.assert_called_once_with(mock.ANY, subkey="other")
+
+    # misses are cached as well
+    assert ns.get("node_2") is None
+    with mock.patch.object(ns, "_get_bytes") as get_bytes:
+        assert ns.get("node_2") is None
+        assert not get_bytes.called
+
+    # writes and deletes update the cache
+    ns.set("node_2", {"foo": "c"})
+    assert ns.get("node_2") == {"foo": "c"}
+    ns.delete("node_1")
+    assert ns.get("node_1") is None
+
+    # results do not depend on whether the local cache is used
+    with override_settings(SENTRY_NODESTORE_LOCAL_CACHE_BYTES=0):
+        uncached = ns.get_multi(["node_1", "node_2"])
+    assert uncached["node_2"] == {"foo": "c"}
+    assert ns.get_multi(["node_1", "node_2"]) == uncached
+
+
+def test_container_format(ns):
+    with override_options({"nodestore.container-format.enabled": True}):
+        ns.set_subkeys("node_1", {None: {"foo": "a"}, "other": {"foo": "b"}})
+        ns.set("node_2", {"foo": "c"})
+        assert ns.get("node_1") == {"foo": "a"}
+        assert ns.get("node_1", subkey="other") == {"foo": "b"}
+        assert ns.get("node_1", subkey="missing") is None
+
+    # nodes of both formats can be read at the same time
+    ns.set("node_3", {"foo": "d"})
+    assert ns.get_multi(["node_1", "node_2", "node_3"]) == {
+        "node_1": {"foo": "a"},
+        "node_2": {"foo": "c"},
+        "node_3": {"foo": "d"},
+    }
+    assert ns.get_multi(["node_1", "node_3"], subkey="other") == {
+        "node_1": {"foo": "b"},
+        "node_3": None,
+    }
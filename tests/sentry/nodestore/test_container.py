@@ -0,0 +1,24 @@
+import zstandard
+
+from sentry.nodestore import container
+
+
+def test_roundtrip():
+    segments = {None: b'{"foo":"a"}', "unprocessed": b'{"foo":"b"}', "empty": b""}
+    value = container.encode(segments)
+
+    assert container.is_container(value)
+    assert not container.is_container(b'{"foo":"a"}')
+    assert not container.is_container(None)
+
+    assert container.read_segments(value) == segments
+    assert container.read_segment(value) == b'{"foo":"a"}'
+    assert container.read_segment(value, "unprocessed") == b'{"foo":"b"}'
+    assert container.read_segment(value, "empty") == b""
+    assert container.read_segment(value, "missing") is None
+
+
+def test_segments_are_independent():
+    value = container.encode({None: b'{"foo":"a"}', "other": b'{"foo":"b"}'})
+    start, end = container.read_index(value)["other"]
+    assert zstandard.ZstdDecompressor().decompress(value[start:end]) == b'{"foo":"b"}'
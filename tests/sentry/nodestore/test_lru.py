@@ -0,0 +1,60 @@
+from unittest import mock
+
+from sentry.nodestore.lru import ENTRY_OVERHEAD, NodeLRUCache
+
+
+def test_get_set():
+    cache = NodeLRUCache(max_bytes=10000, ttl=60, miss_ttl=5)
+    assert cache.get("a") is None
+
+    cache.set("a", b'{"foo":"a"}\nother\n{}')
+    entry = cache.get("a")
+    assert entry.raw == b'{"foo":"a"}\nother\n{}'
+    assert not entry.missing
+
+    cache.set("b", b"\x80pickle")
+    assert cache.get("b").raw == b"\x80pickle"
+
+    cache.set("c", None)
+    assert cache.get("c").missing
+
+    assert set(cache.get_many(["a", "b", "c", "d"])) == {"a", "b", "c"}
+
+    cache.delete_many(["a", "b"])
+    assert cache.get_many(["a", "b", "c"]).keys() == {"c"}
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def test_evicts_least_recently_used():
+    value = b"x" * 100
+    cache = NodeLRUCache(max_bytes=3 * (len(value) + ENTRY_OVERHEAD), ttl=60, miss_ttl=5)
+    cache.set("a", value)
+    cache.set("b", value)
+    cache.set("c", value)
+    assert cache.get("a") is not None
+
+    cache.set("d", value)
+    assert cache.get("b") is None
+    assert set(cache.get_many(["a", "c", "d"])) == {"a", "c", "d"}
+    assert cache.size == 3 * (len(value) + ENTRY_OVERHEAD)
+
+    # values that are larger than the cache are not stored
+    cache.set("a", b"x" * cache.max_bytes)
+    assert cache.get("a") is None
+
+
+def test_expiry():
+    cache = NodeLRUCache(max_bytes=10000, ttl=60, miss_ttl=5)
+    with mock.patch("time.time", return_value=1000):
+        cache.set("a", b"{}")
+        cache.set("b", None)
+
+    with mock.patch("time.time", return_value=1010):
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+
+    with mock.patch("time.time", return_value=1070):
+        assert cache.get("a") is None
+    assert cache.size == 0
@@ -4,10 +4,13 @@ from sentry.ownership.grammar import (
     Matcher,
     Owner,
     Rule,
+    RuleIndex,
+    _codeowners_anchor,
     convert_codeowners_syntax,
     convert_schema_to_rules_text,
     dump_schema,
     get_source_code_path_from_stacktrace_path,
+    load_rule_index,
     load_schema,
     parse_code_owners,
     parse_rules,
@@ -107,6 +110,15 @@ def test_load_schema():
     ) == [Rule(Matcher("path", "*.js"), [Owner("team", "frontend")])]
 
 
+def test_parse_rules_cached():
+    rules = parse_rules(fixture_data)
+    # callers get their own copy of the cached rules
+    rules[0].owners.append(Owner("team", "other"))
+    del rules[1]
+    assert parse_rules(fixture_data) != rules
+    assert parse_rules(fixture_data) == parse_rules(fixture_data)
+
+
 def test_load_tag_schema():
     assert load_schema(
         {
@@ -1035,3 +1047,85 @@ def test_convert_schema_to_rules_text():
         )
         == "path:*.js #frontend m@robenolt.com\nurl:http://google.com/* #backend\npath:src/sentry/* david@sentry.io\ntags.foo:bar tagperson@sentry.io\ntags.foo:bar baz tagperson@sentry.io\nmodule:foo.bar #workflow\nmodule:foo bar meow@sentry.io\n"
     )
+
+
+@pytest.mark.parametrize(
+    "pattern, anchor",
+    [
+        ("*", None),
+        ("**", None),
+        ("\\filename", None),
+        ("/", None),
+        ("docs/", ("exact", "docs")),
+        ("/usr/local/src/foo/*", ("exact", "local")),
+        ("*.py", ("suffix", ".py")),
+        ("test.*", ("prefix", "test.")),
+        ("test.?y", ("prefix", "test.")),
+        ("/**/app.py", ("suffix", "app.py")),
+        ("foo/**/test.py", ("exact", "foo")),
+        ("**/foo", ("suffix", "foo")),
+    ],
+)
+def test_codeowners_anchor(pattern, anchor):
+    assert _codeowners_anchor(pattern) == anchor
+
+
+def test_rule_index():
+    rules = [
+        Rule(Matcher("codeowners", pattern), [Owner("team", "team-%d" % i)])
+        for i, pattern in enumerate(
+            [
+                "*",
+                "*.py",
+                "*.js",
+                "foo/",
+                "/usr/local/src/foo/*",
+                "foo/*/test.py",
+                "foo/**/test.py",
+                "/**/app.py",
+                "test.?y",
+                "\\filename",
+                "/",
+            ]
+        )
+    ] + [
+        Rule(Matcher("path", "*.py"), [Owner("team", "path")]),
+        Rule(Matcher("module", "foo.*"), [Owner("team", "module")]),
+        Rule(Matcher("url", "*.example.com*"), [Owner("team", "url")]),
+        Rule(Matcher("tags.foo", "bar"), [Owner("team", "tag")]),
+    ]
+    index = RuleIndex(rules)
+
+    for frames in (
+        [{"filename": "foo/test.py"}, {"abs_path": "/usr/local/src/foo/test.py"}],
+        [{"filename": "foo/bar/baz/test.py"}, {"abs_path": "/usr/local/src/foo/bar/test.js"}],
+        [{"filename": "config/subdir/test.jy", "module": "foo.bar"}],
+        [{"filename": "foo/\\"}, {"abs_path": "/usr/local/src/other/app.py"}],
+        [{"filename": "foo"}, {"abs_path": None}, None],
+        [],
+    ):
+        data = {
+            "stacktrace": {"frames": frames},
+            "request": {"url": "http://sub.example.com/path"},
+            "tags": [["foo", "bar"]],
+        }
+        assert index.get_matching_rules(data) == [rule for rule in rules if rule.test(data)]
+
+
+def test_load_rule_index():
+    schema = dump_schema(parse_rules(fixture_data))
+    assert load_rule_index(schema) is load_rule_index(dump_schema(parse_rules(fixture_data)))
+    changed = dump_schema(parse_rules(fixture_data + "\nurl:http://example.com/* #other\n"))
+    assert load_rule_index(changed) is not load_rule_index(schema)
+    assert [Rule(rule.matcher, list(rule.owners)) for rule in load_rule_index(schema).rules] == (
+        load_schema(schema)
+    )
+
+    # callers get their own copy of the matching rules
+    index = load_rule_index(schema)
+    data = {"request": {"url": "http://google.com/path"}}
+    (rule,) = index.get_matching_rules(data)
+    rule.owners.append(Owner("team", "other"))
+    assert index.get_matching_rules(data) == [
+        Rule(Matcher("url", "http://google.com/*"), [Owner("team", "backend")])
+    ]
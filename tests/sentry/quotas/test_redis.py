@@ -305,3 +305,22 @@ class RedisQuotaTest(TestCase):
         # count for these quotas and None for the others.
         # The ``- 1`` is because we refunded once.
         assert usage == [n - 1 if q.id else None for q in quotas] + [0, 0]
+
+    def test_leased_quotas(self):
+        timestamp = time.time()
+
+        self.get_project_quota.return_value = (20, 60)
+        self.get_organization_quota.return_value = (300, 60)
+
+        quota = RedisQuota(leases={"p": 0.25})
+        results = [quota.is_rate_limited(self.project, timestamp=timestamp) for _ in range(21)]
+        assert [result.is_limited for result in results] == [False] * 20 + [True]
+        assert results[-1].reason_code == "project_quota"
+
+        # The project quota is leased five tokens at a time, the organization
+        # quota one token at a time. The token of the organization quota leased
+        # for the rejected event is kept for the next event.
+        usage = quota.get_usage(
+            self.project.organization_id, quota.get_quotas(self.project), timestamp=timestamp
+        )
+        assert usage == [20, 21]
@@ -0,0 +1,38 @@
+import pytest
+
+from sentry.ratelimits.sliding_windows import (
+    Quota,
+    RedisSlidingWindowRateLimiter,
+    RequestedQuota,
+    SlidingWindowRateLimiter,
+)
+from sentry.testutils.skips import requires_benchmark
+
+
+# Resembles the per-org limits of the string indexer: a short and a long
+# window, and a global limit shared by all orgs.
+QUOTAS = [
+    Quota(window_seconds=10, granularity_seconds=1, limit=10**9),
+    Quota(window_seconds=3600, granularity_seconds=60, limit=10**9),
+    Quota(window_seconds=3600, granularity_seconds=60, limit=10**9, prefix_override="global"),
+]
+
+
+@requires_benchmark
+@pytest.mark.parametrize("implementation", ["script", "two-steps"])
+def test_benchmark_check_and_use_quotas(implementation, benchmark):
+    limiter = RedisSlidingWindowRateLimiter()
+    if implementation == "script":
+        check_and_use_quotas = limiter.check_and_use_quotas
+    else:
+
+        def check_and_use_quotas(requests, timestamp):
+            return SlidingWindowRateLimiter.check_and_use_quotas(limiter, requests, timestamp)
+
+    requests = [
+        RequestedQuota(prefix=f"org-id:{org_id}", requested=10, quotas=QUOTAS)
+        for org_id in range(100)
+    ]
+
+    grants = benchmark(check_and_use_quotas, requests, 10**6)
+    assert [grant.granted for grant in grants] == [10] * len(requests)
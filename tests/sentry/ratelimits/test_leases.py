@@ -0,0 +1,87 @@
+import pytest
+
+from sentry.ratelimits.leases import Counter, LeasedCounters, get_lease_size
+from sentry.utils import redis
+
+
+@pytest.fixture
+def client():
+    return redis.redis_clusters.get("default")
+
+
+def make_counter(window, limit=10, lease_size=4, refund_key=None):
+    return Counter(
+        name="leases:foo",
+        key=f"leases:foo:{window}",
+        refund_key=refund_key,
+        limit=limit,
+        lease_size=lease_size,
+        ttl=60,
+    )
+
+
+def test_get_lease_size():
+    assert get_lease_size(None, 0.1) == 1
+    assert get_lease_size(100, None) == 1
+    assert get_lease_size(100, 0.001) == 1
+    assert get_lease_size(100, 0.1) == 10
+
+
+def test_take_within_limit(client):
+    counters = LeasedCounters()
+
+    results = [counters.take(client, [make_counter(1)]) for _ in range(12)]
+    assert [rejections for rejections, _ in results] == [[False]] * 10 + [[True]] * 2
+    assert [values for _, values in results][:10] == [[i] for i in range(1, 11)]
+
+    # A lease is never larger than the remaining limit.
+    assert client.get("leases:foo:1") == "10"
+    assert 0 < client.ttl("leases:foo:1") <= 60
+
+
+def test_leases_are_shared(client):
+    a = LeasedCounters()
+    b = LeasedCounters()
+
+    assert a.take(client, [make_counter(1)]) == ([False], [1])
+    assert client.get("leases:foo:1") == "4"
+
+    # Tokens leased by a can't be taken by b.
+    results = [b.take(client, [make_counter(1)])[0] for _ in range(8)]
+    assert results == [[False]] * 6 + [[True]] * 2
+    assert [a.take(client, [make_counter(1)])[0] for _ in range(4)] == [[False]] * 3 + [[True]]
+
+
+def test_rollover_returns_tokens(client):
+    counters = LeasedCounters()
+
+    counters.take(client, [make_counter(1)])
+    assert client.get("leases:foo:1") == "4"
+
+    counters.take(client, [make_counter(2)])
+    assert client.get("leases:foo:1") == "1"
+    assert client.get("leases:foo:2") == "4"
+
+    # Tokens are not returned to expired counters.
+    client.delete("leases:foo:2")
+    counters.take(client, [make_counter(3)])
+    assert client.get("leases:foo:2") is None
+
+
+def test_take_all_or_nothing(client):
+    counters = LeasedCounters()
+    other = make_counter(1, limit=1)._replace(name="leases:bar", key="leases:bar:1")
+
+    assert counters.take(client, [make_counter(1), other]) == ([False, False], [1, 1])
+    assert counters.take(client, [make_counter(1), other]) == ([False, True], [1, 1])
+    assert counters.take(client, [make_counter(1)]) == ([False], [2])
+
+
+def test_refunds(client):
+    counters = LeasedCounters()
+    client.set("leases:refunds", 5)
+
+    results = [
+        counters.take(client, [make_counter(1, refund_key="leases:refunds")])[0] for _ in range(16)
+    ]
+    assert results == [[False]] * 15 + [[True]]
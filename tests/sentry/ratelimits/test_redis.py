@@ -65,3 +65,20 @@ class RedisRateLimiterTest(TestCase):
             assert not limited
             assert value == 1
             assert reset_time == expected_reset_time + 5
+
+    def test_leased_limit(self):
+        backend = RedisRateLimiter(leases={"foo": 0.2, "foo:exact": 0})
+        with freeze_time("2000-01-01") as frozen_time:
+            results = [backend.is_limited_with_value("foo", 10, window=5) for _ in range(11)]
+            assert [limited for limited, _, _ in results] == [False] * 10 + [True]
+            assert [value for _, value, _ in results] == list(range(1, 11)) + [10]
+            # Tokens are leased two at a time.
+            assert backend.current_value("foo", window=5) == 10
+
+            frozen_time.tick(5)
+            assert not backend.is_limited("foo", 10, window=5)
+            assert backend.current_value("foo", window=5) == 2
+
+            # The longest prefix applies.
+            assert not backend.is_limited("foo:exact", 10, window=5)
+            assert backend.current_value("foo:exact", window=5) == 1
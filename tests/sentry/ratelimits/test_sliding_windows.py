@@ -5,6 +5,7 @@ from sentry.ratelimits.sliding_windows import (
     Quota,
     RedisSlidingWindowRateLimiter,
     RequestedQuota,
+    SlidingWindowRateLimiter,
 )
 
 
@@ -121,3 +122,40 @@ def test_conflicting_quotas(limiter):
         GrantedQuota(prefix="foo", granted=6, reached_quotas=[]),
         GrantedQuota(prefix="bar", granted=4, reached_quotas=quotas),
     ]
+
+
+def test_check_and_use_quotas_matches_two_steps(limiter):
+    def make_quotas(prefix):
+        return [
+            Quota(window_seconds=10, granularity_seconds=2, limit=20),
+            Quota(window_seconds=4, granularity_seconds=1, limit=7),
+            Quota(window_seconds=20, granularity_seconds=5, limit=50, prefix_override=prefix),
+        ]
+
+    def two_steps(requests, timestamp):
+        return SlidingWindowRateLimiter.check_and_use_quotas(limiter, requests, timestamp)
+
+    lua_quotas = make_quotas("lua-global")
+    python_quotas = make_quotas("python-global")
+
+    for timestamp in range(TIMESTAMP_OFFSET, TIMESTAMP_OFFSET + 30, 3):
+        results = []
+        for prefix, quotas, check_and_use_quotas in (
+            ("lua", lua_quotas, limiter.check_and_use_quotas),
+            ("python", python_quotas, two_steps),
+        ):
+            requests = [
+                RequestedQuota(
+                    prefix=f"{prefix}:{org_id}", requested=timestamp % 7 + org_id, quotas=quotas
+                )
+                for org_id in range(3)
+            ]
+            grants = check_and_use_quotas(requests, timestamp)
+            results.append(
+                [
+                    (grant.granted, [quotas.index(quota) for quota in grant.reached_quotas])
+                    for grant in grants
+                ]
+            )
+
+        assert results[0] == results[1]
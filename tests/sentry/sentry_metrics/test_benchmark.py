@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from sentry.sentry_metrics.configuration import UseCaseKey
+from sentry.sentry_metrics.consumers.indexer.batch import IndexerBatch
+from sentry.sentry_metrics.indexer.base import FetchType, Metadata
+from sentry.testutils.skips import requires_benchmark
+from tests.sentry.sentry_metrics.test_batch import _construct_outer_message, ts
+
+pytestmark = pytest.mark.sentry_metrics
+
+
+TAG_KEYS = [
+    "environment",
+    "release",
+    "transaction",
+    "transaction.op",
+    "transaction.status",
+    "http.method",
+    "browser.name",
+    "os.name",
+    "geo.country_code",
+    "satisfaction",
+]
+
+
+def _make_payloads(count, orgs=10, seed=0):
+    """
+    Builds a batch that resembles transaction metrics: a handful of metric
+    names, and tags drawn from a small set of values so that most strings
+    repeat across the batch.
+    """
+    rng = random.Random(seed)
+    names = [f"d:transactions/measurements.m{i}@millisecond" for i in range(20)]
+    tag_values = {key: [f"{key}-{i}" for i in range(50)] for key in TAG_KEYS}
+
+    payloads = []
+    for _ in range(count):
+        metric_type = rng.choice("cds")
+        payloads.append(
+            (
+                {
+                    "name": metric_type + rng.choice(names)[1:],
+                    "tags": {key: rng.choice(tag_values[key]) for key in rng.sample(TAG_KEYS, 7)},
+                    "timestamp": ts,
+                    "type": metric_type,
+                    "value": 1.0 if metric_type == "c" else [rng.random() for _ in range(5)],
+                    "org_id": rng.randint(1, orgs),
+                    "project_id": 3,
+                },
+                [],
+            )
+        )
+    return payloads
+
+
+def _resolve(org_strings):
+    mapping = {}
+    meta = {}
+    for org_id, strings in org_strings.items():
+        mapping[org_id] = {string: i for i, string in enumerate(sorted(strings), 1)}
+        meta[org_id] = {
+            string: Metadata(id=id, fetch_type=FetchType.CACHE_HIT)
+            for string, id in mapping[org_id].items()
+        }
+    return mapping, meta
+
+
+@requires_benchmark
+@pytest.mark.parametrize("should_index_tag_values", [True, False], ids=["indexed", "raw"])
+def test_benchmark_indexer_batch(should_index_tag_values, benchmark):
+    outer_message = _construct_outer_message(_make_payloads(5000))
+    batch = IndexerBatch(UseCaseKey.PERFORMANCE, outer_message, should_index_tag_values)
+    mapping, meta = _resolve(batch.extract_strings())
+
+    def process():
+        batch = IndexerBatch(UseCaseKey.PERFORMANCE, outer_message, should_index_tag_values)
+        batch.extract_strings()
+        return batch.reconstruct_messages(mapping, meta)
+
+    assert len(benchmark(process)) == 5000
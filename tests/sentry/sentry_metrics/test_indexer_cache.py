@@ -1,5 +1,6 @@
 import pytest
 from django.conf import settings
+from django.test import override_settings
 
 from sentry.sentry_metrics.configuration import UseCaseKey
 from sentry.sentry_metrics.indexer.cache import StringIndexerCache
@@ -71,3 +72,34 @@ def test_separate_namespacing() -> None:
     indexer_cache.set("a", 2, UseCaseKey.PERFORMANCE.value)
     assert indexer_cache.get("a", UseCaseKey.RELEASE_HEALTH.value) == 1
     assert indexer_cache.get("a", UseCaseKey.PERFORMANCE.value) == 2
+
+
+@override_settings(SENTRY_METRICS_INDEXER_SHARED_CACHE_SLOTS=1024)
+def test_shared_cache(use_case_id: str) -> None:
+    cache.clear()
+    shared_cache = indexer_cache.shared_cache
+    shared_cache.clear()
+
+    indexer_cache.set_many({"hello": 2, "bye": 3}, use_case_id)
+    shared_key = indexer_cache.make_shared_cache_key("hello", use_case_id)
+    assert shared_cache.get(shared_key) == 2
+
+    # hits are served without going to the django cache
+    cache.clear()
+    assert indexer_cache.get_many(["hello", "bye", "missing"], use_case_id) == {
+        "hello": 2,
+        "bye": 3,
+        "missing": None,
+    }
+    assert indexer_cache.get("hello", use_case_id) == 2
+
+    # misses fall through to the django cache and populate the shared cache
+    shared_cache.clear()
+    indexer_cache.cache.set(
+        indexer_cache.make_cache_key("hello", use_case_id), 2, version=indexer_cache.version
+    )
+    assert indexer_cache.get_many(["hello"], use_case_id) == {"hello": 2}
+    assert shared_cache.get(shared_key) == 2
+
+    indexer_cache.delete("hello", use_case_id)
+    assert shared_cache.get(shared_key) is None
@@ -0,0 +1,81 @@
+import multiprocessing
+from unittest import mock
+
+import pytest
+
+from sentry.sentry_metrics.indexer.shared_cache import BUCKET_SIZE, SharedStringIndexerCache
+
+
+def test_get_set_delete() -> None:
+    cache = SharedStringIndexerCache(slots=64, ttl=60)
+    assert cache.get("1:foo") is None
+
+    cache.set_many({"1:foo": 1, "2:foo": 2})
+    assert cache.get_many(["1:foo", "2:foo", "3:foo"]) == {"1:foo": 1, "2:foo": 2, "3:foo": None}
+
+    cache.set("1:foo", 3)
+    assert cache.get("1:foo") == 3
+
+    cache.delete("1:foo")
+    assert cache.get("1:foo") is None
+    assert cache.get("2:foo") == 2
+
+    cache.clear()
+    assert cache.get("2:foo") is None
+
+
+def test_ttl() -> None:
+    cache = SharedStringIndexerCache(slots=64, ttl=60)
+    with mock.patch("sentry.sentry_metrics.indexer.shared_cache.time.time", return_value=1000):
+        cache.set("1:foo", 1)
+    with mock.patch("sentry.sentry_metrics.indexer.shared_cache.time.time", return_value=1059):
+        assert cache.get("1:foo") == 1
+    with mock.patch("sentry.sentry_metrics.indexer.shared_cache.time.time", return_value=1060):
+        assert cache.get("1:foo") is None
+
+
+def test_bounded_size() -> None:
+    cache = SharedStringIndexerCache(slots=BUCKET_SIZE, ttl=60)
+    assert cache.slots == BUCKET_SIZE
+
+    keys = [f"1:{i}" for i in range(BUCKET_SIZE * 4)]
+    cache.set_many({key: i for i, key in enumerate(keys)})
+    results = cache.get_many(keys)
+    assert len([v for v in results.values() if v is not None]) == BUCKET_SIZE
+    # the most recently written key always survives
+    assert results[keys[-1]] == len(keys) - 1
+
+
+def test_torn_slot_is_a_miss() -> None:
+    cache = SharedStringIndexerCache(slots=BUCKET_SIZE, ttl=60)
+    cache.set("1:foo", 1)
+    offset = next(
+        offset for offset in range(0, len(cache._buffer), 32) if cache._buffer[offset] != 0
+    )
+    # simulate a concurrent write of the id that has not finished yet
+    cache._buffer[offset + 16] ^= 0xFF
+    assert cache.get("1:foo") is None
+
+
+def _set_in_worker(name: str) -> None:
+    cache = SharedStringIndexerCache(slots=64, ttl=60, name=name)
+    cache.set("1:foo", 42)
+
+
+def test_shared_between_processes() -> None:
+    cache = SharedStringIndexerCache(slots=64, ttl=60)
+
+    # arroyo starts its worker pool with the spawn start method
+    process = multiprocessing.get_context("spawn").Process(
+        target=_set_in_worker, args=(cache.name,)
+    )
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+    assert cache.get("1:foo") == 42
+
+
+def test_attach_to_smaller_table() -> None:
+    cache = SharedStringIndexerCache(slots=BUCKET_SIZE, ttl=60)
+    with pytest.raises(ValueError):
+        SharedStringIndexerCache(slots=BUCKET_SIZE * 1024, ttl=60, name=cache.name)
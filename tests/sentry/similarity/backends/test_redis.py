@@ -209,6 +209,36 @@ class RedisScriptMinHashIndexBackendTestCase(TestCase):
         self.index.merge("example", "2", [("index", "1")])
         assert self.index.classify("example", [("index", 0, ["foo", "bar"])]) == [("2", [0.5])]
 
+    def test_record_and_classify_multi(self):
+        timestamp = int(time.time())
+        self.index.record_multi(
+            "example",
+            [
+                ("1", [("index:a", "hello world"), ("index:b", "hello world")], timestamp),
+                ("2", [("index:a", "hello world")], timestamp - 60 * 60),
+                ("3", [("index:a", "jello world"), ("index:b", "")], None),
+                ("4", [], timestamp),
+            ],
+        )
+
+        requests = [
+            ([("index:a", 0, "hello world")], timestamp),
+            ([("index:a", 0, "yellow world"), ("index:b", 0, "hello world")], None),
+            ([("index:b", self.index.bands, "pizza world")], timestamp),
+        ]
+        results = self.index.classify_multi("example", requests)
+        assert results == [
+            self.index.classify("example", items, timestamp=timestamp)
+            for items, timestamp in requests
+        ]
+        assert results[0][:2] == [("1", [1.0]), ("2", [1.0])]
+        assert results[2] == []
+
+        assert self.index.classify_multi("example", [([("index:a", 0, "hello")], None)], 1) == [
+            self.index.classify("example", [("index:a", 0, "hello")], 1)
+        ]
+        assert self.index.classify_multi("example", []) == []
+
     def test_flush_scoped(self):
         self.index.record("example", "1", [("index", ["foo", "bar"])])
         assert self.index.classify("example", [("index", 0, ["foo", "bar"])]) == [("1", [1.0])]
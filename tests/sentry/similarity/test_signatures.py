@@ -1,7 +1,10 @@
 from collections import Counter
 from unittest import TestCase
 
-from sentry.similarity.signatures import MinHashSignatureBuilder
+import mmh3
+import pytest
+
+from sentry.similarity.signatures import HAS_NUMPY, MinHashSignatureBuilder, murmur3_32
 
 
 class MinHashSignatureBuilderTestCase(TestCase):
@@ -28,3 +31,30 @@ class MinHashSignatureBuilderTestCase(TestCase):
         self.assertAlmostEqual(
             similarity, estimation, delta=0.1  # totally made up constant, seems reasonable
         )
+
+    @pytest.mark.skipif(not HAS_NUMPY, reason="requires numpy")
+    def test_build_many(self):
+        get_signature = MinHashSignatureBuilder(16, 0xFFFF)
+        feature_sets = [
+            {"foo", "bar", "baz"},
+            "hello world",
+            [b"\x00", b"\xff" * 7, b"abcd", b"abcde"],
+            ["caf\xe9", "☃" * 9, ""],
+            ["a" * 1000, "b"],
+        ]
+        assert get_signature.build_many(feature_sets) == [
+            get_signature(features) for features in feature_sets
+        ]
+        assert get_signature.build_many([]) == []
+
+
+@pytest.mark.skipif(not HAS_NUMPY, reason="requires numpy")
+def test_murmur3_32():
+    values = [b"", b"a", b"ab", b"abc", b"abcd", b"\xff" * 7, "☃".encode() * 9, b"x" * 1000]
+    values += [bytes(range(i, 2 * i)) for i in range(64)]
+    seeds = [0, 1, 42, 0x7FFFFFFF, 0x80000000, 0xFFFFFFFF]
+
+    assert murmur3_32(values, seeds).tolist() == [
+        [mmh3.hash(value, seed) for value in values] for seed in seeds
+    ]
+    assert murmur3_32([], seeds).shape == (len(seeds), 0)
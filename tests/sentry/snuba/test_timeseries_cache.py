@@ -0,0 +1,129 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.core.cache import cache
+from freezegun import freeze_time
+from snuba_sdk import Column, Condition, Entity, Function, Granularity, Op, Query, Request
+
+from sentry.snuba.timeseries_cache import _get_time_range, bulk_timeseries_query, get_cache_key
+from sentry.testutils import TestCase
+from sentry.testutils.helpers import override_options
+
+ROLLUP = 3600
+NOW = datetime(2022, 6, 1, 12, 30, 17, tzinfo=timezone.utc)
+
+
+def make_request(start, end, project_id=1):
+    return Request(
+        dataset="discover",
+        app_id="default",
+        query=Query(
+            match=Entity("discover"),
+            select=[Function("count", [], "count")],
+            where=[
+                Condition(Column("timestamp"), Op.GTE, start),
+                Condition(Column("timestamp"), Op.LT, end),
+                Condition(Column("project_id"), Op.IN, [project_id]),
+            ],
+            groupby=[Column("time")],
+            granularity=Granularity(ROLLUP),
+        ),
+    )
+
+
+class FakeSnuba:
+    """
+    Counts events per bucket like Snuba would for ``make_request`` queries.
+    """
+
+    def __init__(self, timestamps):
+        self.timestamps = timestamps
+        self.queries = []
+
+    def __call__(self, requests, referrer=None):
+        results = []
+        for request in requests:
+            start, end = _get_time_range(request)
+            self.queries.append((start, end))
+            counts = Counter(
+                int(ts.timestamp()) // ROLLUP * ROLLUP
+                for ts in self.timestamps
+                if start <= ts < end
+            )
+            results.append(
+                {
+                    "data": [
+                        {
+                            "time": datetime.fromtimestamp(time, timezone.utc).isoformat(),
+                            "count": count,
+                        }
+                        for time, count in sorted(counts.items())
+                    ],
+                    "meta": [{"name": "count", "type": "UInt64"}],
+                }
+            )
+        return results
+
+
+@override_options({"snuba.timeseries-cache.commit-delay": 300})
+class TimeseriesCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.snuba = FakeSnuba([NOW - timedelta(minutes=7 * i) for i in range(24 * 60 // 7 * 3)])
+
+    def query(self, start, end, now=NOW):
+        with mock.patch("sentry.snuba.timeseries_cache.bulk_snql_query", self.snuba), freeze_time(
+            now
+        ):
+            return bulk_timeseries_query([make_request(start, end)], ROLLUP)[0]
+
+    def expected(self, start, end):
+        return FakeSnuba(self.snuba.timestamps)([make_request(start, end)])[0]
+
+    def test_cache_key_ignores_time_range(self):
+        assert get_cache_key(make_request(NOW - timedelta(days=1), NOW), ROLLUP) == get_cache_key(
+            make_request(NOW - timedelta(days=2), NOW - timedelta(hours=1)), ROLLUP
+        )
+        assert get_cache_key(make_request(NOW, NOW), ROLLUP) != get_cache_key(
+            make_request(NOW, NOW, project_id=2), ROLLUP
+        )
+        assert get_cache_key(make_request(NOW, NOW), ROLLUP) != get_cache_key(
+            make_request(NOW, NOW), 60
+        )
+
+    def test_sliding_window(self):
+        start = NOW - timedelta(days=1)
+        assert self.query(start, NOW) == self.expected(start, NOW)
+        assert self.snuba.queries == [(start, NOW)]
+
+        for minutes in (5, 50, 70, 185):
+            self.snuba.queries = []
+            shift = timedelta(minutes=minutes)
+            now = NOW + shift
+            assert self.query(start + shift, now, now) == self.expected(start + shift, now)
+
+            # Only the partial first bucket and the trailing buckets are queried
+            [head, tail] = self.snuba.queries
+            assert head[0] == start + shift
+            assert head[1] - head[0] < timedelta(seconds=ROLLUP)
+            assert tail[1] == now
+            assert tail[1] - tail[0] <= timedelta(seconds=ROLLUP + 300) + shift
+
+    def test_aligned_window(self):
+        end = NOW.replace(minute=0, second=0)
+        start = end - timedelta(days=1)
+        self.query(start, end)
+        self.snuba.queries = []
+
+        assert self.query(start, end) == self.expected(start, end)
+        # All buckets are complete, nothing is queried
+        assert self.snuba.queries == []
+
+    def test_window_before_cached_buckets(self):
+        self.query(NOW - timedelta(days=1), NOW)
+        self.snuba.queries = []
+
+        start = NOW - timedelta(days=2)
+        assert self.query(start, NOW) == self.expected(start, NOW)
+        assert self.snuba.queries == [(start, NOW)]
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from sentry.testutils.skips import requires_benchmark
+from sentry.tsdb.base import ONE_DAY, ONE_HOUR, TSDBModel
+from sentry.tsdb.redis import RedisTSDB
+
+
+# Roughly what ``_tsdb_record_all_metrics`` records for an event.
+EVENT_MODELS = [
+    TSDBModel.group,
+    TSDBModel.project,
+    TSDBModel.release,
+    TSDBModel.group_performance,
+]
+
+
+@pytest.fixture
+def tsdb():
+    tsdb = RedisTSDB(
+        rollups=((10, 360), (ONE_HOUR, 24 * 7), (ONE_DAY, 90)),
+    )
+    yield tsdb
+    with tsdb.cluster.all() as client:
+        client.flushdb()
+
+
+@requires_benchmark
+@pytest.mark.parametrize("scripted", [False, True], ids=["pipeline", "script"])
+def test_benchmark_incr_multi(tsdb, scripted, benchmark):
+    tsdb.enable_counter_scripts = scripted
+    now = timezone.now()
+    items = [(model, key) for model in EVENT_MODELS for key in range(1, 4)]
+
+    benchmark(tsdb.incr_multi, items, timestamp=now, environment_id=1)
+
+
+@requires_benchmark
+@pytest.mark.parametrize("scripted", [False, True], ids=["pipeline", "script"])
+def test_benchmark_get_range(tsdb, scripted, benchmark):
+    now = timezone.now()
+    keys = list(range(1, 101))
+    tsdb.incr_multi([(TSDBModel.group, key) for key in keys], timestamp=now)
+
+    tsdb.enable_counter_scripts = scripted
+    benchmark(tsdb.get_range, TSDBModel.group, keys, now - timedelta(days=1), now, rollup=ONE_HOUR)
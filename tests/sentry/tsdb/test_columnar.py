@@ -0,0 +1,60 @@
+from sentry.tsdb.base import ONE_HOUR, BaseTSDB
+from sentry.tsdb.columnar import ColumnarSeries
+
+POINTS = {
+    1: [(1368889980, 5), (1368890040, 10), (1368893640, 7)],
+    2: [(1368889980, 1)],
+}
+
+
+def test_from_points_roundtrip():
+    series = ColumnarSeries.from_points(POINTS, keys=[1, 2, 3])
+    assert series.keys == [1, 2, 3]
+    assert series.timestamps.tolist() == [1368889980, 1368890040, 1368893640]
+    assert series.to_points() == {
+        1: [(1368889980, 5), (1368890040, 10), (1368893640, 7)],
+        2: [(1368889980, 1), (1368890040, 0), (1368893640, 0)],
+        3: [(1368889980, 0), (1368890040, 0), (1368893640, 0)],
+    }
+    assert series[1].tolist() == [5, 10, 7]
+    assert 3 in series and 4 not in series
+
+
+def test_sums_and_totals():
+    series = ColumnarSeries.from_points(POINTS)
+    sums = series.sums()
+    assert sums == {1: 22, 2: 1}
+    assert all(type(value) is int for value in sums.values())
+    assert series.totals() == [(1368889980, 6), (1368890040, 10), (1368893640, 7)]
+
+
+def test_rollup_matches_base():
+    tsdb = BaseTSDB(rollups=((60, 10),))
+    rolled = ColumnarSeries.from_points(POINTS).rollup(ONE_HOUR).to_points()
+    assert [list(point) for point in rolled[1]] == tsdb.rollup(POINTS, ONE_HOUR)[1]
+    assert rolled[2] == [(1368889200, 1), (1368892800, 0)]
+
+
+def test_select():
+    series = ColumnarSeries.from_points(POINTS).select([3, 1])
+    assert series.keys == [3, 1]
+    assert series.values.tolist() == [[0, 0, 0], [5, 10, 7]]
+
+
+def test_merge():
+    a = ColumnarSeries.from_points({1: [(10, 1), (20, 2)]})
+    b = ColumnarSeries.from_points({2: [(20, 5)], 1: [(30, 3), (10, 4)]})
+    merged = ColumnarSeries.merge([a, b])
+    assert merged.keys == [1, 2]
+    assert merged.to_points() == {
+        1: [(10, 5), (20, 2), (30, 3)],
+        2: [(10, 0), (20, 5), (30, 0)],
+    }
+    assert ColumnarSeries.merge([]).to_points() == {}
+
+
+def test_empty():
+    series = ColumnarSeries.from_points({})
+    assert series.to_points() == {}
+    assert series.rollup(ONE_HOUR).to_points() == {}
+    assert series.sums() == {}
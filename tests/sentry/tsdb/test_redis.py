@@ -188,6 +188,81 @@ class RedisTSDBTest(TestCase):
         results = self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=1)
         assert results == {1: 0, 2: 0}
 
+    def test_counter_scripts(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(4)]
+        keys = [1, 2, "foo"]
+
+        def record():
+            self.db.incr(TSDBModel.project, 1, dts[0])
+            self.db.incr(TSDBModel.project, "foo", dts[1], count=2)
+            self.db.incr(TSDBModel.project, 1, dts[1], environment_id=1)
+            self.db.incr_multi(
+                [(TSDBModel.project, 1), (TSDBModel.project, 2, {"count": 5})],
+                dts[3],
+                count=3,
+                environment_id=1,
+            )
+
+        def query():
+            return [
+                self.db.get_range(TSDBModel.project, keys, dts[0], dts[-1]),
+                self.db.get_range(TSDBModel.project, keys, dts[0], dts[-1], environment_ids=[1]),
+                self.db.get_range(TSDBModel.project, keys, dts[0], dts[-1], rollup=ONE_MINUTE),
+            ]
+
+        def dump():
+            with self.db.cluster.all() as client:
+                keys = client.keys("ts:*")
+            return {host: sorted(host_keys) for host, host_keys in keys.value.items()}
+
+        record()
+        expected = query()
+        expected_keys = dump()
+
+        # the script reads what the pipelines have written
+        self.db.enable_counter_scripts = True
+        assert query() == expected
+
+        # and writes the same data
+        with self.db.cluster.all() as client:
+            client.flushdb()
+        record()
+        assert dump() == expected_keys
+        assert query() == expected
+
+        self.db.enable_counter_scripts = False
+        assert query() == expected
+
+        client = self.db.cluster.get_routing_client()
+        for host_keys in expected_keys.values():
+            for key in host_keys:
+                assert client.ttl(key) > 0
+
+    def test_get_range_columnar(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
+        dts = [now + timedelta(hours=i) for i in range(4)]
+
+        self.db.incr(TSDBModel.project, 1, dts[0])
+        self.db.incr(TSDBModel.project, 2, dts[1], count=2)
+        self.db.incr(TSDBModel.project, 1, dts[3], count=3, environment_id=1)
+
+        for environment_ids in (None, [1]):
+            expected = self.db.get_range(
+                TSDBModel.project, [1, 2, 3], dts[0], dts[-1], environment_ids=environment_ids
+            )
+            result = self.db.get_range_columnar(
+                TSDBModel.project, [1, 2, 3], dts[0], dts[-1], environment_ids=environment_ids
+            )
+            assert result.to_points() == expected
+            assert result.sums() == self.db.get_sums(
+                TSDBModel.project,
+                [1, 2, 3],
+                dts[0],
+                dts[-1],
+                environment_id=environment_ids[0] if environment_ids else None,
+            )
+
     def test_count_distinct(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
         dts = [now + timedelta(hours=i) for i in range(4)]
@@ -0,0 +1,50 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from sentry.testutils.performance_issues.event_generators import EVENTS
+from sentry.testutils.skips import requires_benchmark
+from sentry.utils.performance_issues.performance_detection import _detect_performance_problems
+
+
+def make_large_event(span_count):
+    """
+    Repeats the spans of an N+1 transaction until it has ``span_count``
+    spans, each copy starting after the previous one ended.
+    """
+    event = EVENTS["n-plus-one-in-django-index-view"]
+    template = event["spans"]
+    duration = max(span["timestamp"] for span in template) - event["start_timestamp"]
+
+    spans = []
+    for i in range(span_count):
+        copy, span = divmod(i, len(template))
+        offset = copy * duration
+        spans.append(
+            {
+                **template[span],
+                "span_id": "%016x" % i,
+                "start_timestamp": template[span]["start_timestamp"] + offset,
+                "timestamp": template[span]["timestamp"] + offset,
+            }
+        )
+    return {**event, "spans": spans}
+
+
+@pytest.fixture
+def detection_mocks():
+    with patch(
+        "sentry.models.ProjectOption.objects.get_value", lambda project, key, default: default
+    ), patch("sentry.models.Project.objects.get_from_cache"), patch(
+        "sentry.models.Organization.objects.get_from_cache"
+    ), patch(
+        "sentry.features.has", return_value=True
+    ):
+        yield
+
+
+@requires_benchmark
+@pytest.mark.parametrize("span_count", [1000, 10000])
+def test_benchmark_detect_performance_problems(detection_mocks, span_count, benchmark):
+    event = make_large_event(span_count)
+    benchmark(_detect_performance_problems, event, Mock())
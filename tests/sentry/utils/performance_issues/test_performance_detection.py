@@ -1,4 +1,5 @@
 import unittest
+from datetime import timedelta
 from unittest.mock import Mock, call, patch
 
 from sentry import projectoptions
@@ -19,8 +20,10 @@ from sentry.utils.performance_issues.performance_detection import (
     DetectorType,
     EventPerformanceProblem,
     PerformanceProblem,
+    SpanIndex,
     _detect_performance_problems,
     detect_performance_problems,
+    fingerprint_span,
     prepare_problem_for_grouping,
 )
 from sentry.utils.performance_issues.performance_span_issue import PerformanceSpanProblem
@@ -1089,3 +1092,34 @@ class EventPerformanceProblemTest(TestCase):
         assert [r.problem if r else None for r in result] == [
             problem for _, problem in all_event_problems
         ] + [None]
+
+
+class SpanIndexTest(unittest.TestCase):
+    def test_views(self):
+        spans = [
+            create_span("db", desc="SELECT 1"),
+            create_span("http.client"),
+            create_span("db.redis"),
+            create_span(None),
+            create_span("db", desc=None),
+        ]
+        index = SpanIndex(spans)
+
+        assert index.spans_with_op() == [spans[0], spans[1], spans[2], spans[4]]
+        assert index.spans_with_op(["db"]) == [spans[0], spans[4]]
+        assert index.spans_with_op_prefix(["db"]) == [spans[0], spans[2], spans[4]]
+        assert index.spans_with_op_prefix(["http", "db.redis"]) == [spans[1], spans[2]]
+        assert index.spans_with_op_prefix(["ui"]) == []
+        # Views are computed once
+        assert index.spans_with_op_prefix(["db"]) is index.spans_with_op_prefix(["db"])
+
+    def test_memoized_values(self):
+        span = create_span("db", duration=250.0)
+        index = SpanIndex([span])
+
+        assert index.get_duration(span) == timedelta(milliseconds=250)
+        assert index.get_fingerprint(span) == fingerprint_span(span)
+        # Spans that are not part of the index still work
+        other = create_span("db", duration=100.0, desc="SELECT 2")
+        assert index.get_duration(other) == timedelta(milliseconds=100)
+        assert index.get_fingerprint(other) == fingerprint_span(other)
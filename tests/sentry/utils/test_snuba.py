@@ -1,18 +1,26 @@
+import time
 import unittest
 from datetime import datetime, timedelta
 from unittest import mock
 
 import pytest
 import pytz
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 
+from sentry.locks import locks
 from sentry.models import GroupRelease, Project, Release
 from sentry.testutils import TestCase
+from sentry.testutils.helpers import override_options
+from sentry.utils import json
 from sentry.utils.snuba import (
     Dataset,
     SnubaQueryParams,
     UnqualifiedQueryError,
+    _apply_cache_and_build_results,
     _prepare_query_params,
+    get_cache_key,
     get_json_type,
     get_query_params_to_update_for_projects,
     get_snuba_column_name,
@@ -374,3 +382,92 @@ class QuantizeTimeTest(unittest.TestCase):
                 break
 
         assert i != j
+
+
+@override_options({"snuba.query-cache.coalescing": True})
+class CoalescingQueryCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.query = {
+            "dataset": "events",
+            "from_date": "2022-01-01T10:03:17+00:00",
+            "to_date": "2022-01-02T10:03:17+00:00",
+            "selected_columns": ["event_id"],
+        }
+
+    def run_query(self, query=None, referrer="search"):
+        params = (query or self.query, lambda x: x, lambda x: x)
+        return _apply_cache_and_build_results([params], referrer=referrer, use_cache=True)
+
+    def cache_key(self, query=None):
+        return f"{get_cache_key(query or self.query)}:c"
+
+    @mock.patch("sentry.utils.snuba._bulk_snuba_query", return_value=[{"data": [1]}])
+    def test_hit(self, bulk_query):
+        assert self.run_query() == [{"data": [1]}]
+        assert self.run_query() == [{"data": [1]}]
+        assert bulk_query.call_count == 1
+
+    @mock.patch("sentry.utils.snuba._revalidation_thread_pool")
+    @mock.patch("sentry.utils.snuba._bulk_snuba_query", return_value=[{"data": [2]}])
+    def test_stale_while_revalidate(self, bulk_query, pool):
+        stored_at = time.time() - settings.SENTRY_SNUBA_CACHE_TTL_SECONDS - 1
+        cache.set(self.cache_key(), json.dumps([stored_at, {"data": [1]}]))
+
+        with override_options({"snuba.query-cache.stale-while-revalidate": {"search": 60}}):
+            assert self.run_query() == [{"data": [1]}]
+        assert bulk_query.call_count == 0
+        assert pool.submit.call_count == 1
+
+        # The stale entry is refreshed in the background
+        func, *args = pool.submit.call_args[0]
+        func(*args)
+        assert self.run_query() == [{"data": [2]}]
+        assert bulk_query.call_count == 1
+
+    @mock.patch("sentry.utils.snuba._bulk_snuba_query", return_value=[{"data": [2]}])
+    def test_expired_without_stale_window(self, bulk_query):
+        stored_at = time.time() - settings.SENTRY_SNUBA_CACHE_TTL_SECONDS - 1
+        cache.set(self.cache_key(), json.dumps([stored_at, {"data": [1]}]))
+
+        assert self.run_query() == [{"data": [2]}]
+        assert bulk_query.call_count == 1
+
+    @mock.patch("sentry.utils.snuba._bulk_snuba_query", return_value=[{"data": [2]}])
+    def test_coalesced(self, bulk_query):
+        lock = locks.get(f"{self.cache_key()}:lock", duration=10, name="snuba_query_cache")
+        lock.acquire()
+
+        # Another process finishes the query while we're waiting for the lock
+        def store_result(seconds):
+            cache.set(self.cache_key(), json.dumps([time.time(), {"data": [1]}]))
+
+        with mock.patch("sentry.utils.snuba.time.sleep", side_effect=store_result):
+            assert self.run_query() == [{"data": [1]}]
+        assert bulk_query.call_count == 0
+        lock.release()
+
+    @mock.patch("sentry.utils.snuba._bulk_snuba_query", return_value=[{"data": [2]}])
+    def test_coalescing_leader_failed(self, bulk_query):
+        lock = locks.get(f"{self.cache_key()}:lock", duration=10, name="snuba_query_cache")
+        lock.acquire()
+
+        # The other process releases the lock without storing a result
+        with mock.patch("sentry.utils.snuba.time.sleep", side_effect=lambda _: lock.release()):
+            assert self.run_query() == [{"data": [2]}]
+        assert bulk_query.call_count == 1
+
+    @mock.patch("sentry.utils.snuba._bulk_snuba_query", return_value=[{"data": [1]}])
+    def test_time_buckets(self, bulk_query):
+        shifted = dict(
+            self.query,
+            from_date="2022-01-01T10:04:59+00:00",
+            to_date="2022-01-02T10:04:59+00:00",
+        )
+        with override_options({"snuba.query-cache.time-buckets": {"search": 300}}):
+            self.run_query()
+            self.run_query(shifted)
+        assert bulk_query.call_count == 1
+        [(query, _, _)] = bulk_query.call_args[0][0]
+        assert query["from_date"] == "2022-01-01T10:00:00+00:00"
+        assert query["to_date"] == "2022-01-02T10:00:00+00:00"
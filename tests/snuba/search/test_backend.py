@@ -27,7 +27,7 @@ from sentry.search.snuba.backend import (
     CdcEventsDatasetSnubaSearchBackend,
     EventsDatasetSnubaSearchBackend,
 )
-from sentry.search.snuba.executors import InvalidQueryForExecutor
+from sentry.search.snuba.executors import CandidatePlanner, InvalidQueryForExecutor
 from sentry.testutils import SnubaTestCase, TestCase, xfail_if_not_postgres
 from sentry.testutils.helpers.datetime import before_now, iso_format
 from sentry.testutils.helpers.faux import Any
@@ -1439,6 +1439,46 @@ class EventsSnubaSearchTest(SharedSnubaTest):
         finally:
             options.set("snuba.search.pre-snuba-candidates-optimizer", prev_optimizer_enabled)
 
+    def test_optimizer_skips_candidates(self):
+        with self.options(
+            {
+                "snuba.search.pre-snuba-candidates-optimizer": True,
+                "snuba.search.max-pre-snuba-candidates": 1,
+            }
+        ), mock.patch("sentry.search.snuba.executors.metrics.incr") as incr:
+            assert set(self.make_query()) == {self.group1, self.group2}
+            calls = incr.call_args_list
+            assert mock.call("snuba.search.too_many_candidates", skip_internal=False) in calls
+            incr.reset_mock()
+
+            # The candidate count is known now, and Postgres isn't queried again
+            assert set(self.make_query()) == {self.group1, self.group2}
+            calls = incr.call_args_list
+            assert mock.call("snuba.search.planner.skip_candidates", skip_internal=False) in calls
+            assert (
+                mock.call("snuba.search.planner.strategy", tags={"strategy": "postfilter"}) in calls
+            )
+
+    def test_planner_candidate_count_expires(self):
+        group_queryset = mock.Mock(query=f"SELECT {uuid.uuid4().hex}")
+        with self.options({"snuba.search.project-group-count-cache-time": 60}), mock.patch(
+            "sentry.search.snuba.executors.time"
+        ) as time_mock:
+            time_mock.time.return_value = 1000
+            planner = CandidatePlanner(group_queryset, max_candidates=1)
+            assert not planner.skip_candidates
+            planner.record_candidates(2)
+            planner.finish()
+
+            # Searches that skip the candidate query don't renew the count
+            time_mock.time.return_value = 1059
+            planner = CandidatePlanner(group_queryset, max_candidates=1)
+            assert planner.skip_candidates
+            planner.finish()
+
+            time_mock.time.return_value = 1060
+            assert not CandidatePlanner(group_queryset, max_candidates=1).skip_candidates
+
     def test_search_out_of_range(self):
         the_date = datetime(2000, 1, 1, 0, 0, 0, tzinfo=pytz.utc)
         results = self.make_query(
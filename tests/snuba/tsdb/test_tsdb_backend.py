@@ -9,6 +9,7 @@ from sentry.testutils.helpers.datetime import iso_format
 from sentry.testutils.perfomance_issues.store_transaction import PerfIssueTransactionTestMixin
 from sentry.testutils.silo import region_silo_test
 from sentry.tsdb.base import TSDBModel
+from sentry.tsdb.columnar import ColumnarSeries
 from sentry.tsdb.snuba import SnubaTSDB
 from sentry.types.issues import GroupType
 from sentry.utils.dates import to_datetime, to_timestamp
@@ -208,6 +209,19 @@ class SnubaTSDBTest(TestCase, SnubaTestCase):
 
         assert self.db.get_range(TSDBModel.group, [], dts[0], dts[-1], rollup=3600) == {}
 
+    def test_range_columnar(self):
+        dts = [self.now + timedelta(hours=i) for i in range(4)]
+        keys = [self.proj1group2.id, 0, self.proj1group1.id]
+        result = self.db.get_range_columnar(TSDBModel.group, keys, dts[0], dts[-1], rollup=3600)
+
+        assert result.keys == keys
+        assert result == ColumnarSeries.from_points(
+            self.db.get_range(TSDBModel.group, keys, dts[0], dts[-1], rollup=3600), keys=keys
+        )
+        # Groups without events are zero-filled
+        assert result[0].tolist() == [0, 0, 0, 0]
+        assert result[self.proj1group1.id].tolist() == [3, 3, 3, 3]
+
     def test_range_releases(self):
         dts = [self.now + timedelta(hours=i) for i in range(4)]
         assert self.db.get_range(